@@ -0,0 +1,181 @@
+"""
+Cylindrical (r, theta, z) view of field and chaining grids for the axisymmetric FRC geometry.
+
+The cylinder axis is along z. Everything that depends only on the grid, i.e. the radius, direction cosines and
+radial bin of every (x, y) column, is computed once per grid. Converting E/B/J to radial/azimuthal components and
+averaging over theta into (r, z) maps are then single vectorized passes that work on one frame or on whole
+(nframes, nx, ny, nz) stacks alike.
+
+Usage:
+    data = HDF5Reader('pFRC_f.hdf5', load_frames=False)
+    remap = CylindricalRemap(data)
+    rz = remap.series(data, ('Br', 'Btheta', 'Bz'))        # {name: (nFrames, nr, nz)}
+    psi = remap.flux(rz['Bz'])                              # poloidal flux at remap.r_edges[1:]
+    make_subplots(remap.rz_plot(psi[-1], title='psi (Wb)'))
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import numpy as np
+
+from NaviBaseClasses import ContourPlot
+from NaviKernels import radius_mask
+from ParticleBins import grid_geometry
+
+
+# Cylindrical components of each vector field, as names usable with average()/series()
+CYLINDRICAL = {f: (f + 'r', f + 'theta', f + 'z') for f in 'EBJ'}
+
+
+class CylindricalRemap:
+    """
+    Precomputed remap of an (nx, ny, nz) grid onto cylindrical coordinates about an axis parallel to z.
+
+    Methods:
+        __init__(self, grid, nr=None, rmax=None, center=(0.0, 0.0))
+        inside(self, rmax=None)
+        to_cylindrical(self, ax, ay)
+        frame_components(self, frame, field='B')
+        average(self, arr)
+        frame_average(self, frame, names=('Br', 'Btheta', 'Bz'))
+        series(self, reader, names=('Br', 'Btheta', 'Bz'))
+        flux(self, bz)
+        rz_plot(self, rz, ind=1, title='', cmap='viridis', levels=100)
+
+    Parameters:
+        grid:   Field/chaining HDF5Reader (or FrameClient) or (origin, dxdydz, dims) tuple of node positions.
+                Chaining data is cell centred, as HDF5Reader.grid_coords().
+        nr:     Number of radial bins. Default gives bins of min(dx, dy).
+        rmax:   Outer radius of the bins. Default is the largest circle about center that fits in the grid,
+                so every bin averages over full circles.
+        center: (x, y) of the axis. Default is (0, 0).
+
+    Attributes:
+        x, y, z:          Grid coordinates.
+        r, cos, sin:      (nx, ny) radius and direction cosines of every column about the axis.
+        r_edges, r_mid:   Radial bin edges and centres.
+        rbin:             (nx, ny) radial bin of every column, nr beyond rmax.
+        counts:           Columns per radial bin.
+    """
+    def __init__(self, grid, nr=None, rmax=None, center=(0.0, 0.0)):
+        origin, dxdydz, dims = grid_geometry(grid)
+        shift = 0.5 if getattr(grid, 'file_type', None) == 'c' else 0.0
+        self.x, self.y, self.z = (origin[k] + dxdydz[k] * (np.arange(dims[k]) + shift) for k in range(3))
+        self.dims = dims
+        self.center = center
+
+        dx = self.x[:, None] - center[0]
+        dy = self.y[None, :] - center[1]
+        self.r = np.sqrt(dx ** 2 + dy ** 2)
+        # Direction is undefined on the axis, any unit vector gives a zero azimuthal component there
+        safe = np.where(self.r > 0, self.r, 1.0)
+        self.cos = np.where(self.r > 0, dx / safe, 1.0)
+        self.sin = np.where(self.r > 0, dy / safe, 0.0)
+
+        if rmax is None:
+            rmax = min(center[0] - self.x[0], self.x[-1] - center[0], center[1] - self.y[0], self.y[-1] - center[1])
+        if rmax <= 0:
+            raise Exception('CylindricalRemap: The axis does not lie inside the grid.')
+        if nr is None:
+            nr = max(1, int(round(rmax / min(dxdydz[0], dxdydz[1]))))
+
+        self.nr = nr
+        self.rmax = rmax
+        self.r_edges = np.linspace(0.0, rmax, nr + 1)
+        self.r_mid = 0.5 * (self.r_edges[:-1] + self.r_edges[1:])
+
+        self.rbin = np.minimum((self.r / rmax * nr).astype(np.int64), nr)
+        self.rbin[self.r > rmax] = nr
+
+        # Columns inside rmax ordered by bin, so each bin is one contiguous run for np.add.reduceat
+        flat = self.rbin.ravel()
+        order = np.argsort(flat, kind='stable')
+        order = order[flat[order] < nr]
+        self.ix, self.iy = np.unravel_index(order, self.rbin.shape)
+
+        self.counts = np.bincount(flat, minlength=nr + 1)[:nr]
+        self.filled = np.flatnonzero(self.counts)
+        offsets = np.concatenate(([0], np.cumsum(self.counts)))
+        self.starts = offsets[self.filled]
+
+    def inside(self, rmax=None):
+        """
+        (nx, ny) mask of the columns within rmax of the axis. Default is the remap's rmax.
+        """
+        return radius_mask(self.x, self.y, self.rmax if rmax is None else rmax, self.center)
+
+    def to_cylindrical(self, ax, ay):
+        """
+        Radial and azimuthal components of an (..., nx, ny, nz) vector field given its x and y components.
+        """
+        cos = self.cos[:, :, None]
+        sin = self.sin[:, :, None]
+        return ax * cos + ay * sin, ay * cos - ax * sin
+
+    def frame_components(self, frame, field='B'):
+        """
+        Returns {'Br': ..., 'Btheta': ..., 'Bz': ...} full grids of one FieldFrame for field 'E', 'B' or 'J'.
+        """
+        r_name, t_name, z_name = CYLINDRICAL[field]
+        ar, at = self.to_cylindrical(getattr(frame, field + 'x'), getattr(frame, field + 'y'))
+        return {r_name: ar, t_name: at, z_name: getattr(frame, z_name)}
+
+    def average(self, arr):
+        """
+        Azimuthal average of (..., nx, ny, nz) data into (..., nr, nz). Every column inside a radial bin has the
+        same area, so this is the area weighted mean over each annulus. Empty bins are NaN.
+        """
+        arr = np.asarray(arr)
+        gathered = arr[..., self.ix, self.iy, :]
+
+        out = np.full(arr.shape[:-3] + (self.nr, arr.shape[-1]), np.nan)
+        if len(self.filled):
+            sums = np.add.reduceat(gathered, self.starts, axis=-2)
+            out[..., self.filled, :] = sums / self.counts[self.filled, None]
+        return out
+
+    def frame_average(self, frame, names=('Br', 'Btheta', 'Bz')):
+        """
+        Returns {name: (nr, nz)} azimuthal averages of one frame. Names are cylindrical components (Br, Etheta, ...)
+        or any frame attribute (Bz, e_nDensity, ...).
+        """
+        out = {}
+        components = {}
+        for name in names:
+            field = next((f for f, comps in CYLINDRICAL.items() if name in comps[:2]), None)
+            if field is None:
+                out[name] = self.average(getattr(frame, name))
+                continue
+            if field not in components:
+                components[field] = self.frame_components(frame, field)
+            out[name] = self.average(components[field][name])
+        return out
+
+    def series(self, reader, names=('Br', 'Btheta', 'Bz')):
+        """
+        Streams every selected frame of reader through frame_average().
+
+        Return:
+            Dict of {name: (nFrames, nr, nz)}.
+        """
+        out = {}
+        for i, frame in enumerate(reader.iter_frames()):
+            for name, rz in self.frame_average(frame, names).items():
+                if name not in out:
+                    out[name] = np.empty((reader.nFrames,) + rz.shape)
+                out[name][i] = rz
+        return out
+
+    def flux(self, bz):
+        """
+        Poloidal flux psi(r, z) = 2 pi int_0^r Bz r' dr' of azimuthally averaged Bz (..., nr, nz), at r_edges[1:].
+        """
+        dr = np.diff(self.r_edges)[:, None]
+        return np.cumsum(2.0 * np.pi * self.r_mid[:, None] * dr * bz, axis=-2)
+
+    def rz_plot(self, rz, ind=1, title='', cmap='viridis', levels=100):
+        """
+        ContourPlot of an (nr, nz) map with z horizontal and r vertical.
+        """
+        return ContourPlot(xdata=self.z, ydata=self.r_mid, zdata=rz, ind=ind, title=title,
+                           xlabel='z (m)', ylabel='r (m)', cmap=cmap, levels=levels)
@@ -0,0 +1,226 @@
+"""
+Append-only on-disk store of per frame diagnostics, kept next to a run's output.
+
+Each diagnostic is stored once per name and parameter set, together with the frame numbers and times it has
+been computed for. update() reopens the run's index, reduces only the frames that are not stored yet and
+appends them, so refreshing the time series of a growing run costs O(new frames).
+
+Usage:
+    store = DiagnosticStore('pFRC_p.hdf5')
+    times, temps = store.update('temperature', species=(1, 2))    # (nFrames, 2, 4) rows of [T, vx, vy, vz]
+    TC1, TC2 = temps[:, 0, 0], temps[:, 1, 0]
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import hashlib
+import json
+import os
+
+import h5py
+import numpy as np
+
+from HDF5Reader import HDF5Reader
+from RunCollection import REDUCERS
+from Timer import profiled
+
+
+def diagnostic_name(reducer):
+    """
+    Store name of a reducer: its REDUCERS key, or module.function for other module level functions.
+    """
+    if isinstance(reducer, str):
+        return reducer
+    for name, func in REDUCERS.items():
+        if func is reducer:
+            return name
+    return f'{reducer.__module__}.{reducer.__qualname__}'
+
+
+def params_key(params):
+    """
+    Canonical JSON of a parameter dict and a short hash of it, used as the group name of a parameter set.
+    """
+    text = json.dumps(params, sort_keys=True, default=lambda v: np.asarray(v).tolist())
+    return text, hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class DiagnosticStore:
+    """
+    Incremental store of per frame diagnostics of one run.
+
+    Methods:
+        __init__(self, data_path, store_path=None, **reader_kwargs)
+        open_reader(self)
+        group_path(self, reducer, params)
+        missing(self, reducer, reader=None, **kwargs)
+        update(self, reducer, recompute=False, flush_every=16, **kwargs)
+        read(self, reducer, **kwargs)
+        entries(self)
+        remove(self, reducer, **kwargs)
+
+    Parameters:
+        data_path:     hdf5/xdmf path of the run output.
+        store_path:    HDF5 file holding the diagnostics. Default is <data prefix>_diag.hdf5.
+        reader_kwargs: Frame selection passed to HDF5Reader, e.g. stride=4.
+
+    Store layout:
+        /<diagnostic>/<params hash>/frame_numbers, times, values   with attrs diagnostic, params and source.
+    """
+    def __init__(self, data_path, store_path=None, **reader_kwargs):
+        self.data_path = data_path
+        self.store_path = store_path if store_path is not None else os.path.splitext(data_path)[0] + '_diag.hdf5'
+        self.reader_kwargs = reader_kwargs
+
+    def open_reader(self):
+        """
+        Opens the run index only. Done on every update so frames written since the last one are seen.
+        """
+        return HDF5Reader(self.data_path, load_frames=False, **self.reader_kwargs)
+
+    def group_path(self, reducer, params):
+        name = diagnostic_name(reducer)
+        return f'{name}/{params_key(params)[1]}'
+
+    def _stored(self, reducer, params):
+        """
+        Returns (frame_numbers, times) already stored for reducer and params, empty if none.
+        """
+        if not os.path.isfile(self.store_path):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        with h5py.File(self.store_path, 'r') as store:
+            path = self.group_path(reducer, params)
+            if path not in store:
+                return np.zeros(0, dtype=np.int64), np.zeros(0)
+            return store[path]['frame_numbers'][:], store[path]['times'][:]
+
+    def missing(self, reducer, reader=None, **kwargs):
+        """
+        Returns the selected frame indices of the run whose diagnostic is not stored yet.
+        Raises if a stored frame's time no longer matches the run, i.e. the output was rewritten.
+        """
+        reader = self.open_reader() if reader is None else reader
+        numbers, times = self._stored(reducer, kwargs)
+        stored = dict(zip(numbers.tolist(), times.tolist()))
+
+        todo = []
+        for i, (n, t) in enumerate(zip(reader.frame_numbers, reader.times)):
+            if n not in stored:
+                todo.append(i)
+            elif not np.isclose(stored[n], t, rtol=1e-9, atol=0.0):
+                raise Exception(f'DiagnosticStore.missing(): Frame {n} of "{self.data_path}" is stored at t={stored[n]} '
+                                f'but the run has t={t}. Call update(..., recompute=True) to rebuild it.')
+        return todo
+
+    def _append(self, store, path, reducer, params_text, numbers, times, values):
+        values = np.asarray(values, dtype=np.float64)
+
+        if path not in store:
+            group = store.create_group(path)
+            group.attrs['diagnostic'] = diagnostic_name(reducer)
+            group.attrs['params'] = params_text
+            group.attrs['source'] = os.path.abspath(self.data_path)
+            group.create_dataset('frame_numbers', shape=(0,), maxshape=(None,), dtype=np.int64, chunks=(256,))
+            group.create_dataset('times', shape=(0,), maxshape=(None,), dtype=np.float64, chunks=(256,))
+            group.create_dataset('values', shape=(0,) + values.shape[1:], maxshape=(None,) + values.shape[1:],
+                                 dtype=np.float64, chunks=(64,) + values.shape[1:])
+
+        group = store[path]
+        if group['values'].shape[1:] != values.shape[1:]:
+            raise Exception(f'DiagnosticStore.update(): "{path}" holds values of shape {group["values"].shape[1:]}, '
+                            f'new frames gave {values.shape[1:]}.')
+
+        n0 = group['times'].shape[0]
+        for name, data in (('frame_numbers', numbers), ('times', times), ('values', values)):
+            group[name].resize(n0 + len(data), axis=0)
+            group[name][n0:] = data
+
+    @profiled('DiagnosticStore.update')
+    def update(self, reducer, recompute=False, flush_every=16, **kwargs):
+        """
+        Reduces the frames missing from the store and appends them.
+
+        Parameters:
+            reducer:     Name in REDUCERS or a module level function of (frame, reader, **kwargs).
+            recompute:   Drop the stored series first and rebuild it from every frame. Default is False.
+            flush_every: Frames reduced between appends, so an interrupted update keeps its progress.
+            kwargs:      Passed to reducer and part of the store key, e.g. species=(1, 2) for 'temperature'.
+
+        Return:
+            times, values of every stored frame of the current selection, ordered by frame number.
+        """
+        func = REDUCERS[reducer] if isinstance(reducer, str) else reducer
+        params_text, _ = params_key(kwargs)
+        path = self.group_path(reducer, kwargs)
+
+        if recompute:
+            self.remove(reducer, **kwargs)
+
+        reader = self.open_reader()
+        todo = self.missing(reducer, reader, **kwargs)
+
+        if todo:
+            with reader.open_file() as file, h5py.File(self.store_path, 'a') as store:
+                for k in range(0, len(todo), flush_every):
+                    batch = todo[k:k + flush_every]
+                    values = [func(reader.decode_frame(file, i), reader, **kwargs) for i in batch]
+                    self._append(store, path, reducer, params_text,
+                                 [reader.frame_numbers[i] for i in batch], [reader.times[i] for i in batch], values)
+                    store.flush()
+
+        numbers, times, values = self._read(reducer, kwargs)
+        keep = np.isin(numbers, reader.frame_numbers)
+        return times[keep], values[keep]
+
+    def read(self, reducer, **kwargs):
+        """
+        Return:
+            times, values of every stored frame of reducer and kwargs, ordered by frame number. Nothing is computed.
+        """
+        _, times, values = self._read(reducer, kwargs)
+        return times, values
+
+    def _read(self, reducer, kwargs):
+        if not os.path.isfile(self.store_path):
+            raise Exception(f'DiagnosticStore.read(): No store at "{self.store_path}".')
+
+        path = self.group_path(reducer, kwargs)
+        with h5py.File(self.store_path, 'r') as store:
+            if path not in store:
+                raise Exception(f'DiagnosticStore.read(): "{diagnostic_name(reducer)}" with {kwargs} is not stored.')
+            group = store[path]
+            numbers = group['frame_numbers'][:]
+            order = np.argsort(numbers, kind='stable')
+            return numbers[order], group['times'][:][order], group['values'][:][order]
+
+    def entries(self):
+        """
+        Returns a list of dicts with the diagnostic, params, number of frames and last time of every stored series.
+        """
+        if not os.path.isfile(self.store_path):
+            return []
+
+        out = []
+        with h5py.File(self.store_path, 'r') as store:
+            for name in store:
+                for key in store[name]:
+                    group = store[name][key]
+                    times = group['times'][:]
+                    out.append({'diagnostic': group.attrs['diagnostic'],
+                                'params': json.loads(group.attrs['params']),
+                                'nFrames': len(times),
+                                't_last': float(times.max()) if len(times) else None})
+        return out
+
+    def remove(self, reducer, **kwargs):
+        """
+        Deletes the stored series of reducer and kwargs, if any.
+        """
+        if not os.path.isfile(self.store_path):
+            return
+
+        path = self.group_path(reducer, kwargs)
+        with h5py.File(self.store_path, 'a') as store:
+            if path in store:
+                del store[path]
@@ -5,10 +5,8 @@ Edits:
  - 3/24/21, M. Lavell. Created File.
 """
 import numpy as np
-import matplotlib
-matplotlib.use('qt5agg')
 
-import matplotlib.pyplot as plt
+from NaviKernels import velocity_moments
 
 # constants (mks)
 Mi = 1.67262192e-27
@@ -19,17 +17,14 @@ MC = 6  # carbon
 MO = 16  # oxygen
 Kb = 1.38064852e-23
 eps0 = 8.8541878128e-12
+mu0 = 1.25663706212e-6
 tol = 1e-27
 
 
 # function returns temperature and velocity drift
 def getTempDrift(velx, mass):
     nparts = np.shape(velx)[0]
-    sumV2 = 0;
-    sumVDrift = np.zeros(3)
-    for p in range(nparts):
-        sumV2 += np.sum(velx[p] ** 2)
-        sumVDrift += velx[p]
+    sumV2, sumVDrift = velocity_moments(velx)
     temp = mass / (3 * Kb) * abs(sumV2 / nparts - np.sum((sumVDrift / nparts) ** 2))
     vdrift = sumVDrift / nparts
     return temp, vdrift
@@ -39,15 +34,15 @@ def getTempDrift(velx, mass):
 def getDebyeLength(ndens, atomNum, temp):
     rmin = (4.0 * np.pi * ndens / 3.0) ** (-1 / 3)  # min mean interatomic distance
     debyelength = (ndens * (qe * atomNum) ** 2 / (eps0 * Kb * temp)) ** (-0.5)
-    return max(rmin, debyelength)
+    return np.maximum(rmin, debyelength)
 
 
 # function returns Debye length for two species
 def getDebyeLengthTwoSpecies(ndens1, atomNum1, temp1, ndens2, atomNum2, temp2):
     # min mean interatomic distance
-    rmin = (4.0 * np.pi * max(ndens1, ndens2) / 3.0) ** (-1 / 3)
+    rmin = (4.0 * np.pi * np.maximum(ndens1, ndens2) / 3.0) ** (-1 / 3)
     ldm2 = (ndens1 * (qe * atomNum1) ** 2 / (eps0 * Kb * temp1) + ndens2 * (qe * atomNum2) ** 2 / (eps0 * Kb * temp2))
-    return max(rmin, ldm2 ** (-0.5))
+    return np.maximum(rmin, ldm2 ** (-0.5))
 
 
 # function returns plasma frequency
@@ -66,3 +61,28 @@ def getVelocityNorm(vec3, nsteps):
 # function returns thermal velocity
 def getThermalVelocity(temperature, mass):
     return np.sqrt(Kb * temperature / mass)
+
+
+# function returns total electric and magnetic field energy of a FieldFrame
+def getFieldEnergy(frame, dxdydz):
+    dV = dxdydz[0] * dxdydz[1] * dxdydz[2]
+    e2 = np.sum(frame.Ex ** 2) + np.sum(frame.Ey ** 2) + np.sum(frame.Ez ** 2)
+    b2 = np.sum(frame.Bx ** 2) + np.sum(frame.By ** 2) + np.sum(frame.Bz ** 2)
+    return 0.5 * eps0 * e2 * dV, 0.5 / mu0 * b2 * dV
+
+
+# function returns temperature and drift velocity rows [T, vx, vy, vz] for each species of a ParticleFrame
+def getSpeciesTemperatures(frame, species):
+    spid = frame.spid[:frame.particles_active]
+    out = np.full((len(species), 4), np.nan)
+    for i, sp in enumerate(species):
+        ids = np.flatnonzero(spid == sp)
+        if ids.size > 0:
+            out[i, 0], out[i, 1:] = getTempDrift(frame.velocity[ids], frame.mass[ids[0]])
+    return out
+
+
+# function returns the volume average of the given quantities (default all) of a ChainFrame, NaN for ones it lacks
+def getChainMeans(frame, components=None):
+    components = frame.components if components is None else components
+    return np.array([np.mean(getattr(frame, c)) if c in frame.components else np.nan for c in components])
@@ -0,0 +1,128 @@
+import numpy as np
+
+
+PYRAMID_FACTORS = (2, 4, 8)
+
+
+def block_average(arr, factor):
+    """
+    Downsamples an array by averaging non-overlapping blocks of size factor along every axis.
+    Partial blocks at the upper edges are averaged over the cells they contain, so no data is trimmed.
+
+    Parameters:
+        arr:    N-dimensional array to downsample.
+        factor: Integer block size. A factor of 1 returns the array unchanged.
+
+    Return:
+        out: Array with shape ceil(arr.shape / factor).
+    """
+    if factor == 1:
+        return arr
+
+    out = np.asarray(arr)
+    for axis, n in enumerate(out.shape):
+        starts = np.arange(0, n, factor)
+        counts = np.diff(np.append(starts, n))
+
+        count_shape = [1] * out.ndim
+        count_shape[axis] = len(counts)
+
+        out = np.add.reduceat(out, starts, axis=axis) / counts.reshape(count_shape)
+
+    return out
+
+
+class LODPyramid:
+    """
+    Level-of-detail pyramid of block averaged downsamples of a single field component.
+
+    Methods:
+        __init__(self, data, factors=PYRAMID_FACTORS, levels=None)
+        level(self, factor)
+        take(self, axis, index)
+        select(self, shape)
+        coords(self, coord, factor)
+
+    Parameters:
+        data:    Full resolution array (level 1).
+        factors: Downsampling factors to build. Default is (2, 4, 8).
+        levels:  Optional dict of prebuilt {factor: array} levels. Skips block averaging when supplied.
+    """
+    def __init__(self, data, factors=PYRAMID_FACTORS, levels=None):
+        if levels is None:
+            levels = {1: data}
+            levels.update({f: block_average(data, f) for f in factors})
+
+        self.levels = levels
+        self.factors = tuple(sorted(levels.keys()))
+        self.shape = np.shape(data)
+
+    def __getitem__(self, item):
+        return self.levels[1][item]
+
+    def level(self, factor):
+        return self.levels[factor]
+
+    def take(self, axis, index):
+        """
+        Slices every level at the same physical location, e.g. a midplane.
+
+        Parameters:
+            axis:  Axis to slice along.
+            index: Full resolution index along axis.
+
+        Return:
+            LODPyramid with one less dimension.
+        """
+        levels = {f: np.take(arr, index // f, axis=axis) for f, arr in self.levels.items()}
+        return LODPyramid(levels[1], levels=levels)
+
+    def select(self, shape):
+        """
+        Picks the coarsest level that still has at least one cell per output pixel.
+
+        Parameters:
+            shape: Tuple of pixel counts, one per array axis.
+
+        Return:
+            factor, array
+        """
+        best = 1
+        for f in self.factors:
+            if all(-(-n // f) >= px for n, px in zip(self.shape, shape)):
+                best = f
+
+        return best, self.levels[best]
+
+    @staticmethod
+    def coords(coord, factor):
+        """
+        Block averages a 1D coordinate array to match a pyramid level.
+        """
+        if coord is None or factor == 1:
+            return coord
+
+        return block_average(np.asarray(coord, dtype=float), factor)
+
+
+def axes_pixel_shape(ax):
+    """
+    Returns the (rows, columns) pixel extent of a matplotlib axes.
+    """
+    bbox = ax.get_window_extent()
+    return max(int(bbox.height), 1), max(int(bbox.width), 1)
+
+
+def select_level(xdata, ydata, zdata, ax):
+    """
+    Resolves ContourPlot style x/y/z data against the pixel size of ax.
+    Plain arrays are returned untouched, LODPyramids are swapped for their coarsest matching level.
+
+    Return:
+        xdata, ydata, zdata
+    """
+    if not isinstance(zdata, LODPyramid):
+        return xdata, ydata, zdata
+
+    factor, z = zdata.select(axes_pixel_shape(ax))
+    return LODPyramid.coords(xdata, factor), LODPyramid.coords(ydata, factor), z
@@ -1,52 +1,245 @@
 import numpy as np
 
+import argparse
+import collections
+import concurrent.futures
+import glob
 import shutil
 import os
+import re
 
+import h5py
 
-def reset_output_dirs(path):
-    shutil.rmtree(path)
-    os.makedirs(path)
-
-
-def load_field_npy(path):
-    store = []
+from XDMFWriter import frame_name, field_grid_xml, write_xdmf
 
-    if os.path.isdir(path):
-        n_files = sum(os.path.isfile(os.path.join(path, f)) for f in os.listdir(path))
-    else:
-        raise Exception('load_npy(): Not a valid path.')
+try:
+    import pandas
+except ImportError:
+    pandas = None
 
-    for n in range(n_files):
-        filename = path + f'/{path[-2:]}_{n}.npy'
 
-        try:
-            temp = np.load(filename)
-            store.append(temp)
-        except IOError:
-            print(f'Cannot read file "{filename}", continuing.')
-            continue
+# Component directories of a legacy run and the HDF5 vector each one fills
+LEGACY_COMPONENTS = {'E': ('Ex', 'Ey', 'Ez'),
+                     'B': ('Bx', 'By', 'Bz'),
+                     'J': ('Jx', 'Jy', 'Jz')}
 
-    return store
 
+def reset_output_dirs(path):
+    shutil.rmtree(path)
+    os.makedirs(path)
 
-def load_field_csv(path, shape=None):
-    store = []
-    prefix = path.split('/')[-1]
 
-    if os.path.isdir(path):
-        n_files = sum(os.path.isfile(os.path.join(path, f)) for f in os.listdir(path))
-    else:
-        raise Exception('load_csv(): Not a valid path.')
+def legacy_files(path, prefix, ext):
+    """
+    Returns the <prefix>_<n>.<ext> dumps of a legacy output directory sorted by n.
+    Stray files are ignored and a gap in n ends the series, as the old readers stopped at the first missing frame.
+    """
+    if not os.path.isdir(path):
+        raise Exception(f'legacy_files(): Not a valid path. "{path}"')
+
+    pattern = re.compile(re.escape(prefix) + r'_(\d+)\.' + ext + '$')
+    numbered = {}
+    for filename in glob.glob(os.path.join(glob.escape(path), f'{glob.escape(prefix)}_*.{ext}')):
+        match = pattern.search(os.path.basename(filename))
+        if match:
+            numbered[int(match.group(1))] = filename
+
+    files = []
+    while len(files) in numbered:
+        files.append(numbered[len(files)])
+    return files
+
+
+def parse_csv(filename, dtype=np.float32):
+    """
+    Parses one comma separated dump. Uses pandas' C parser when installed, else np.loadtxt.
+    Both are far faster than np.genfromtxt.
+    """
+    if pandas is not None:
+        return pandas.read_csv(filename, header=None, dtype=dtype, engine='c').to_numpy()
+    return np.loadtxt(filename, dtype=dtype, delimiter=',', ndmin=2)
+
+
+def read_field_npy(path, prefix=None, mmap=True):
+    """
+    Loads every <prefix>_<n>.npy dump of a legacy directory into one preallocated array.
+
+    Parameters:
+        path:   Directory of dumps.
+        prefix: File prefix. Default is the directory name.
+        mmap:   Memory map each file while copying so no intermediate array is allocated. Default is True.
+
+    Return:
+        Array shaped (nframes, *frame_shape).
+    """
+    prefix = os.path.basename(os.path.normpath(path)) if prefix is None else prefix
+    files = legacy_files(path, prefix, 'npy')
+    if not files:
+        raise Exception(f'read_field_npy(): No {prefix}_<n>.npy files in "{path}".')
+
+    mmap_mode = 'r' if mmap else None
+    first = np.load(files[0], mmap_mode=mmap_mode)
+    out = np.empty((len(files),) + first.shape, dtype=first.dtype)
+
+    for i, filename in enumerate(files):
+        out[i] = np.load(filename, mmap_mode=mmap_mode)
+
+    return out
+
+
+def read_field_csv(path, prefix=None, shape=None, dtype=np.float32, workers=None):
+    """
+    Parses every <prefix>_<n>.csv dump of a legacy directory in parallel into one preallocated array.
+
+    Parameters:
+        path:    Directory of dumps.
+        prefix:  File prefix. Default is the directory name.
+        shape:   Shape of each frame. Default flattens each frame.
+        dtype:   Output dtype. Default is float32, as load_field_csv.
+        workers: Parser processes. Default is one per CPU, 1 parses serially.
+
+    Return:
+        Array shaped (nframes, *shape).
+    """
+    prefix = os.path.basename(os.path.normpath(path)) if prefix is None else prefix
+    files = legacy_files(path, prefix, 'csv')
+    if not files:
+        raise Exception(f'read_field_csv(): No {prefix}_<n>.csv files in "{path}".')
+
+    first = parse_csv(files[0], dtype)
+    shape = (first.size,) if shape is None else tuple(shape)
+    out = np.empty((len(files),) + shape, dtype=dtype)
+    out[0] = first.reshape(shape)
+
+    # Parsing is CPU bound and holds the GIL, so fan out over processes
+    for i, arr in enumerate(_map(parse_csv, files[1:], workers, dtype=dtype), start=1):
+        out[i] = arr.reshape(shape)
+
+    return out
+
+
+def _map(func, items, workers, **kwargs):
+    """
+    Ordered map of func over items on a process pool, or serially for workers=1. Results are yielded as they
+    complete in order and never all held at once.
+    """
+    if workers == 1 or len(items) < 2:
+        for item in items:
+            yield func(item, **kwargs)
+        return
+
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        # Bounded window of work in flight, so at most 2 * workers parsed frames are held at once
+        pending = collections.deque()
+        for item in items:
+            pending.append(pool.submit(func, item, **kwargs))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
-    for n in range(n_files):
-        filename = path + f'/{prefix}_{n}.csv'
 
-        temp = np.genfromtxt(filename, dtype=np.float32, delimiter=',')
+def load_field_npy(path):
+    return list(read_field_npy(path, prefix=path[-2:]))
 
-        if shape is None:
-            store.append(temp.reshape(-1))
-        else:
-            store.append(temp.reshape(shape))
 
-    return store
+def load_field_csv(path, shape=None):
+    return list(read_field_csv(path, shape=shape))
+
+
+def _load_legacy_frame(n, run_dir, ext, npoints):
+    """
+    Reads the nine component dumps of frame n and packs them as the (npoints, 3) E/B/J vectors of the HDF5 layout.
+    Missing components are written as zeros.
+    """
+    vectors = {}
+    for name, comps in LEGACY_COMPONENTS.items():
+        vec = np.zeros((npoints, 3))
+        for k, comp in enumerate(comps):
+            filename = os.path.join(run_dir, comp, f'{comp}_{n}.{ext}')
+            if os.path.isfile(filename):
+                arr = np.load(filename, mmap_mode='r') if ext == 'npy' else parse_csv(filename, np.float64)
+                vec[:, k] = arr.reshape(-1)
+        vectors[name] = vec
+    return vectors
+
+
+def convert_legacy_fields(run_dir, output_prefix, dims, dxdydz, origin=(0.0, 0.0, 0.0), dt=1.0, times=None,
+                          ext='npy', order='F', workers=None):
+    """
+    One-time conversion of a legacy run (run_dir/Ex/Ex_<n>.npy ... run_dir/Jz/Jz_<n>.npy, or .csv) into the
+    <prefix>_f.hdf5/.xdmf pair HDF5Reader reads. Frames are parsed in parallel and written one at a time.
+
+    Parameters:
+        run_dir:       Directory holding the Ex ... Jz component directories. Missing components are written as zeros.
+        output_prefix: Output path without extension, should end in "_f".
+        dims:          Grid node counts (nx, ny, nz).
+        dxdydz:        Grid spacing (dx, dy, dz).
+        origin:        Grid origin (x, y, z).
+        dt:            Time between dumps in seconds, used when times is None.
+        times:         Optional list of frame times.
+        ext:           'npy' or 'csv'.
+        order:         Memory order of the flattened legacy dumps. 'F' means x varies fastest (the HDF5 layout),
+                       'C' means z varies fastest.
+        workers:       Parser processes. Default is one per CPU, 1 converts serially.
+
+    Return:
+        Path to the hdf5 file.
+    """
+    nframes = max((len(legacy_files(os.path.join(run_dir, c), c, ext))
+                   for comps in LEGACY_COMPONENTS.values() for c in comps
+                   if os.path.isdir(os.path.join(run_dir, c))), default=0)
+    if nframes == 0:
+        raise Exception(f'convert_legacy_fields(): No legacy .{ext} dumps found in "{run_dir}".')
+
+    nx, ny, nz = dims
+    npoints = nx * ny * nz
+    times = [n * dt for n in range(nframes)] if times is None else times
+    h5name = os.path.basename(output_prefix) + '.hdf5'
+
+    grids = []
+    with h5py.File(output_prefix + '.hdf5', 'w') as f:
+        data = f.create_group('H5fio_3DRectMesh')
+        frames = _map(_load_legacy_frame, list(range(nframes)), workers, run_dir=run_dir, ext=ext, npoints=npoints)
+
+        for n, vectors in enumerate(frames):
+            group = data.create_group(frame_name(n))
+            for name, vec in vectors.items():
+                if order == 'C':
+                    # z fastest -> x fastest
+                    vec = vec.reshape(nx, ny, nz, 3).transpose(2, 1, 0, 3).reshape(npoints, 3)
+                group.create_dataset(name, data=vec)
+
+            grids.append(field_grid_xml(n, dims, origin, dxdydz, times[n],
+                                        [(name, 'Vector', 'Node', f'{nz} {ny} {nx} 3') for name in LEGACY_COMPONENTS],
+                                        h5name))
+
+    write_xdmf(output_prefix + '.xdmf', grids)
+    return output_prefix + '.hdf5'
+
+
+def init_argparse():
+    parser = argparse.ArgumentParser(usage='./%(prog)s [OPTIONS] RUN_DIR OUTPUT_PREFIX', description='Convert legacy .npy/.csv field dumps to HDF5/XDMF.')
+    parser.add_argument('Path',           metavar='run_dir', type=str,                    help='Directory holding the Ex ... Jz dump directories')
+    parser.add_argument('Output',         metavar='prefix',  type=str,                    help='Output path without extension, e.g. run/legacy_f')
+    parser.add_argument('--dims',         action='store', type=int,   nargs=3, required=True, help='Grid node counts {nx ny nz}')
+    parser.add_argument('--dxdydz',       action='store', type=float, nargs=3, required=True, help='Grid spacing {dx dy dz}')
+    parser.add_argument('--origin',       action='store', type=float, nargs=3, default=(0.0, 0.0, 0.0), help='Grid origin {x y z}')
+    parser.add_argument('--dt',           action='store', type=float, default=1.0,         help='Time between dumps in seconds')
+    parser.add_argument('--ext',          action='store', type=str,   default='npy', choices=['npy', 'csv'], help='Dump format')
+    parser.add_argument('--order',        action='store', type=str,   default='F', choices=['F', 'C'], help='F if x varies fastest in the dumps, C if z does')
+    parser.add_argument('-w', '--workers', action='store', type=int,  default=None,        help='Parser processes. Default is one per CPU')
+
+    return parser
+
+
+def main():
+    args = init_argparse().parse_args()
+    path = convert_legacy_fields(args.Path, args.Output, tuple(args.dims), tuple(args.dxdydz), tuple(args.origin),
+                                 dt=args.dt, ext=args.ext, order=args.order, workers=args.workers)
+    print(f'Wrote {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+"""
+Shared memory frame server, so several notebooks on one node reuse one decoded copy of a run.
+
+The server process opens the run index, decodes each frame once on first request into a
+multiprocessing.shared_memory block and answers a small newline delimited JSON protocol on a local unix
+socket. FrameClient looks like an index-only HDF5Reader: read_frame()/iter_frames() return regular
+FieldFrame/ChainFrame/ParticleFrame objects whose arrays are read-only zero-copy views of the server's
+blocks, so node memory and decode time are paid once however many kernels attach.
+
+Usage:
+    python FrameServer.py run/pFRC_f.hdf5 --max-gb 16 --preload
+    then in any kernel on the node
+    data = FrameClient('run/pFRC_f.hdf5')
+    frame = data.read_frame(40)
+
+Protocol (one JSON object per line each way):
+    {"op": "index"}          -> reader metadata (file_type, times, frame_numbers, dims, origin, dxdydz, nParticles)
+    {"op": "frame", "i": 40} -> {"type", "shm", "arrays": {name: [offset, shape, dtype, order]}, "attrs", "caches"}
+    {"op": "stats"}          -> frames held, bytes held, hits and misses
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from HDF5Reader import HDF5Reader, FieldFrame, ChainFrame, ParticleFrame, open_hdf5
+
+
+FRAME_TYPES = {cls.__name__: cls for cls in (FieldFrame, ChainFrame, ParticleFrame)}
+
+# Per frame caches that are rebuilt empty on the client rather than shared
+CACHE_ATTRS = ('pyramids', 'spatial_indexes')
+
+# Byte alignment of each array inside a frame's block
+ALIGN = 64
+
+
+def init_argparse():
+    parser = argparse.ArgumentParser(usage='./%(prog)s [OPTIONS] PATH', description='Serve decoded frames of a TFLink output through shared memory.')
+    parser.add_argument('Path',            metavar='path', type=str,                    help='Path to the hdf5/xdmf file to serve')
+    parser.add_argument('-s', '--socket',  action='store', type=str,   default=None,    help='Unix socket path. Default is derived from the file path')
+    parser.add_argument('-m', '--max-gb',  action='store', type=float, default=None,    help='Shared memory budget in GiB. Least recently used frames are dropped beyond it')
+    parser.add_argument('--preload',       action='store_true',                         help='Decode every frame at start up')
+
+    return parser
+
+
+def socket_path(path_to_file):
+    """
+    Default socket of a run: one per output prefix, so the .hdf5 and .xdmf paths find the same server.
+    """
+    prefix = os.path.splitext(os.path.abspath(path_to_file))[0]
+    return os.path.join(tempfile.gettempdir(), f'tfnavi_{hashlib.sha1(prefix.encode()).hexdigest()[:12]}.sock')
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def _tuples(value):
+    # JSON turns the frames' tuples (dims, components, species quantities) into lists, turn them back
+    if isinstance(value, dict):
+        return {k: _tuples(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return tuple(_tuples(v) for v in value)
+    return value
+
+
+def _attach(name):
+    """
+    Attaches to an existing block without registering it with this process' resource tracker, which would
+    otherwise unlink the server's block when the client exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class SharedFrame:
+    """
+    One decoded frame copied into a single shared memory block.
+
+    Methods:
+        __init__(self, frame)
+        header(self)
+        close(self)
+    """
+    def __init__(self, frame):
+        if isinstance(frame, ChainFrame):
+            frame.load()
+
+        arrays = {k: v for k, v in vars(frame).items() if isinstance(v, np.ndarray)}
+        self.type = type(frame).__name__
+        self.attrs = {k: _jsonable(v) for k, v in vars(frame).items() if k not in arrays and k not in CACHE_ATTRS}
+        self.caches = [k for k in CACHE_ATTRS if k in vars(frame)]
+
+        self.layout = {}
+        offset = 0
+        for name, arr in arrays.items():
+            # Field and chaining arrays are transposed views with x fastest, keep that memory order
+            order = 'F' if arr.ndim > 1 and abs(arr.strides[0]) < abs(arr.strides[-1]) else 'C'
+            self.layout[name] = [offset, list(arr.shape), arr.dtype.str, order]
+            offset += -(-arr.nbytes // ALIGN) * ALIGN
+
+        self.nbytes = offset
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, arr in arrays.items():
+            start, shape, dtype, order = self.layout[name]
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=start, order=order)
+            view[...] = arr
+            del view
+
+    def header(self):
+        return {'type': self.type, 'shm': self.shm.name, 'arrays': self.layout, 'attrs': self.attrs, 'caches': self.caches}
+
+    def close(self):
+        """
+        Unlinks the block. Clients that already mapped it keep their views until they release them.
+        """
+        self.shm.close()
+        self.shm.unlink()
+
+
+class FrameServer:
+    """
+    asyncio unix socket server handing out shared memory frames of one output.
+
+    Methods:
+        __init__(self, path_to_file, address=None, max_bytes=None, preload=False)
+        run(self)
+        serve(self)
+        get_frame(self, i)
+        close(self)
+
+    Parameters:
+        path_to_file: Path to the hdf5/xdmf file to serve.
+        address:      Unix socket path. Default is socket_path(path_to_file).
+        max_bytes:    Shared memory budget. Least recently requested frames are unlinked beyond it. Default is no limit.
+        preload:      Decode every frame before accepting clients. Default is False.
+    """
+    def __init__(self, path_to_file, address=None, max_bytes=None, preload=False):
+        self.reader = HDF5Reader(path_to_file, load_frames=False)
+        self.address = socket_path(path_to_file) if address is None else address
+        self.max_bytes = max_bytes
+        self.preload = preload
+
+        self.frames = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.locks = collections.defaultdict(asyncio.Lock)
+
+        self.index = {'file_type': self.reader.file_type,
+                      'hdf5_path': self.reader.hdf5_path,
+                      'xdmf_path': self.reader.xdmf_path,
+                      'times': list(self.reader.times),
+                      'frame_numbers': list(self.reader.frame_numbers),
+                      'nFrames': self.reader.nFrames,
+                      'dims': self.reader.dims,
+                      'origin': self.reader.origin,
+                      'dxdydz': self.reader.dxdydz,
+                      'nParticles': self.reader.nParticles}
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self.close()
+
+    async def serve(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+        if self.preload:
+            for i in range(self.reader.nFrames):
+                await self.get_frame(i)
+
+        server = await asyncio.start_unix_server(self.handle_client, self.address)
+        print(f'Serving {self.reader.hdf5_path} on {self.address}')
+
+        async with server:
+            await server.serve_forever()
+
+    async def get_frame(self, i):
+        """
+        Returns the SharedFrame of frame i, decoding it on first request. Concurrent requests decode it once.
+        """
+        if not 0 <= i < self.reader.nFrames:
+            raise IndexError(f'frame {i} out of range for {self.reader.nFrames} frames')
+
+        async with self.locks[i]:
+            if i in self.frames:
+                self.hits += 1
+                self.frames.move_to_end(i)
+                return self.frames[i]
+
+            self.misses += 1
+            # Decoding blocks, keep it off the event loop
+            shared = await asyncio.to_thread(lambda: SharedFrame(self.reader.read_frame(i)))
+            self.frames[i] = shared
+            self.nbytes += shared.nbytes
+
+            while self.max_bytes is not None and self.nbytes > self.max_bytes and len(self.frames) > 1:
+                _, old = self.frames.popitem(last=False)
+                self.nbytes -= old.nbytes
+                old.close()
+
+            return shared
+
+    async def respond(self, request):
+        op = request.get('op')
+        if op == 'index':
+            return self.index
+        if op == 'frame':
+            return (await self.get_frame(int(request['i']))).header()
+        if op == 'stats':
+            return {'frames': list(self.frames), 'nbytes': self.nbytes, 'hits': self.hits, 'misses': self.misses}
+        return {'error': f'unknown op "{op}"'}
+
+    async def handle_client(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    reply = await self.respond(json.loads(line))
+                except (ValueError, KeyError, IndexError) as err:
+                    reply = {'error': str(err)}
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        """
+        Unlinks every block and the socket.
+        """
+        for shared in self.frames.values():
+            shared.close()
+        self.frames.clear()
+        self.nbytes = 0
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class FrameClient:
+    """
+    Index-only reader whose frames are zero-copy views of a FrameServer's shared memory.
+
+    Methods:
+        __init__(self, path_to_file=None, address=None, timeout=None)
+        request(self, **request)
+        read_frame(self, i)
+        iter_frames(self)
+        open_file(self)
+        stats(self)
+        release(self)
+        close(self)
+
+    Parameters:
+        path_to_file: Path of the served file, used to find the default socket.
+        address:      Unix socket path, overrides path_to_file.
+        timeout:      Socket timeout in seconds. Default waits for the server to decode.
+
+    Frames are plain FieldFrame/ChainFrame/ParticleFrame objects with read-only arrays, so Diagnostics, plotting
+    and RunCollection reducers work on them unchanged. Blocks stay mapped while a frame or array still uses them.
+    """
+    def __init__(self, path_to_file=None, address=None, timeout=None):
+        if address is None:
+            if path_to_file is None:
+                raise Exception('FrameClient: Pass the served file path or the socket address.')
+            address = socket_path(path_to_file)
+
+        self.address = address
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(address)
+        except OSError as err:
+            raise Exception(f'FrameClient: No frame server at "{address}". Start one with python FrameServer.py PATH.') from err
+        self.stream = self.sock.makefile('rb')
+
+        self.blocks = {}
+
+        index = self.request(op='index')
+        self.file_type = index['file_type']
+        self.hdf5_path = index['hdf5_path']
+        self.xdmf_path = index['xdmf_path']
+        self.times = index['times']
+        self.frame_numbers = index['frame_numbers']
+        self.nFrames = index['nFrames']
+        self.dims = _tuples(index['dims'])
+        self.origin = _tuples(index['origin'])
+        self.dxdydz = _tuples(index['dxdydz'])
+        self.nParticles = index['nParticles']
+        self.frames = []
+
+    def __iter__(self):
+        return self.iter_frames()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, **request):
+        self.sock.sendall(json.dumps(request).encode() + b'\n')
+        reply = json.loads(self.stream.readline())
+        if isinstance(reply, dict) and 'error' in reply:
+            raise Exception(f'FrameClient.request(): {reply["error"]}')
+        return reply
+
+    def read_frame(self, i):
+        """
+        Returns frame i, decoded by the server if no kernel has asked for it yet.
+        """
+        header = self.request(op='frame', i=i)
+
+        name = header['shm']
+        if name not in self.blocks:
+            self.blocks[name] = _attach(name)
+        buf = self.blocks[name].buf
+
+        cls = FRAME_TYPES[header['type']]
+        frame = cls.__new__(cls)
+        frame.__dict__.update(_tuples(header['attrs']))
+        for key in header['caches']:
+            setattr(frame, key, {})
+
+        for key, (offset, shape, dtype, order) in header['arrays'].items():
+            arr = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset, order=order)
+            arr.flags.writeable = False
+            setattr(frame, key, arr)
+
+        return frame
+
+    def iter_frames(self):
+        for i in range(self.nFrames):
+            yield self.read_frame(i)
+
+    def open_file(self):
+        """
+        Opens the served HDF5 file directly, for tools such as ParticleIndex that read selected rows themselves.
+        """
+        return open_hdf5(self.hdf5_path)
+
+    def stats(self):
+        return self.request(op='stats')
+
+    def release(self):
+        """
+        Unmaps every block no longer referenced by a frame or array of this kernel.
+        """
+        for name in list(self.blocks):
+            try:
+                self.blocks[name].close()
+            except BufferError:
+                continue
+            del self.blocks[name]
+
+    def close(self):
+        self.release()
+        self.stream.close()
+        self.sock.close()
+
+
+def main():
+    args = init_argparse().parse_args()
+
+    max_bytes = None if args.max_gb is None else int(args.max_gb * 2**30)
+    server = FrameServer(args.Path, address=args.socket, max_bytes=max_bytes, preload=args.preload)
+    # Exit through run()'s cleanup on kill too, so no block outlives the server
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
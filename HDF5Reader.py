@@ -1,26 +1,64 @@
 import os
+import re
 import h5py
 import xml.etree.ElementTree as ET
 import numpy as np
 
+from FieldPyramid import LODPyramid, PYRAMID_FACTORS
+from Timer import profiler, profiled
+from MemoryReport import MemoryReport, LoadTracker
+from ParticleBins import CellIndex, grid_geometry
+
 
 class HDF5Reader:
     """
     Class for reading data from HDF5 and XDMF files. Will automatically find both HDF5 and XDMF files.
 
     Methods:
-        __init__(self, path_to_file)
+        __init__(self, path_to_file, pyramid=False, track_memory=False, load_frames=True, frames=None, t_range=None, stride=1, swmr=False)
         check_paths(self, path_to_file)
+        open_file(self)
         load_field_xdmf(self)
         load_particle_xdmf(self)
         load_hdf5(self)
+        load_index(self, file)
+        refresh(self)
+        select_frames(self, nframes)
+        grid_coords(self)
+        chain_components(self)
         load_particle_hdf5(self, file)
         load_field_hdf5(self, file)
+        decode_frame(self, file, i)
+        read_frame(self, i)
+        iter_frames(self)
+        chain_reductions(self, species=None, chunk_size=2**22)
+        probe_weights(self, points=None, indices=None, interpolate=True)
+        probe(self, points=None, indices=None, fields='B', interpolate=True)
+        memory_report(self)
 
     Parameters:
         path_to_file: String containing relative or absolute path to hdf5/xdmf file
+        pyramid:      Build 2x/4x/8x block averaged preview levels for every field/chain frame. Default is False.
+        track_memory: Record peak allocation while loading with tracemalloc. Slows loading. Default is False.
+        load_frames:  Decode every frame up front. If False only the index is read and frames are decoded
+                      on demand through read_frame()/iter_frames(). Default is True.
+        frames:       Frames to keep: an int (e.g. -1 for the latest), a slice or a list of frame numbers. Default is all.
+        t_range:      (t0, t1) in seconds, keeps frames with t0 <= time <= t1. Either bound may be None.
+        stride:       Keep every stride-th frame of the selection. Default is 1.
+        swmr:         Open the HDF5 file in single-writer/multiple-reader mode, so an output the simulation is still
+                      writing can be read safely. refresh() then picks up frames appended since. Default is False.
+
+        Frame selection is resolved against the XDMF times before any data is read, so only the selected
+        frames are decoded. times/frames then hold the selection and frame_numbers the original frame numbers.
+
+    Usage:
+        data = HDF5Reader('pFRC_f.hdf5', t_range=(100e-9, 200e-9), stride=4)
+
+        live = HDF5Reader('pFRC_f.hdf5', load_frames=False, swmr=True)
+        for i in live.refresh():     # indices of the frames written since the last call
+            frame = live.read_frame(i)
     """
-    def __init__(self, path_to_file):
+    def __init__(self, path_to_file, pyramid=False, track_memory=False, load_frames=True, frames=None, t_range=None, stride=1, swmr=False):
         # Common Data
         self.xdmf_path = None
         self.hdf5_path = None
@@ -29,8 +67,23 @@ class HDF5Reader:
 
         self.times = []
         self.frames = []
+        self.frame_keys = []
+        self.frame_numbers = []
         self.nFrames = 0
 
+        # Every frame of the file, before selection
+        self.all_times = []
+        self.all_keys = []
+        # Byte offset in the XDMF file up to which refresh() has read step times
+        self.xdmf_offset = None
+        self.swmr = swmr
+        self._chain_components = None
+
+        # Frame selection
+        self.frame_selection = frames
+        self.t_range = t_range
+        self.stride = stride
+
         # Particle XDMF Data
         self.nParticles = None
 
@@ -39,10 +92,17 @@ class HDF5Reader:
         self.origin = None
         self.dxdydz = None
 
+        self.pyramid = pyramid
+
+        self.track_memory = track_memory
+        self.peak_load_bytes = None
+        self.load_tracker = None
+
+        self.load_frames = load_frames
         self.load_hdf5()
 
     def __iter__(self):
-        return iter(self.frames)
+        return self.iter_frames()
 
     def check_paths(self, path_to_file):
         prefix, ext = os.path.splitext(path_to_file)
@@ -74,6 +134,7 @@ class HDF5Reader:
         self.xdmf_path = path_to_xdmf
         self.hdf5_path = path_to_hdf5
 
+    @profiled('HDF5Reader.load_field_xdmf')
     def load_field_xdmf(self):
         tree = ET.parse(self.xdmf_path)
         root = tree.getroot()
@@ -94,6 +155,7 @@ class HDF5Reader:
         for g in grids:
             self.times.append(float(list(g)[2].attrib['Value']))
 
+    @profiled('HDF5Reader.load_particle_xdmf')
     def load_particle_xdmf(self):
         tree = ET.parse(self.xdmf_path)
         root = tree.getroot()
@@ -108,9 +170,26 @@ class HDF5Reader:
         for g in grids:
             self.times.append(float(list(g)[0].attrib['Value']))
 
+    @profiled('HDF5Reader.load_hdf5')
     def load_hdf5(self):
-        file = h5py.File(self.hdf5_path, 'r')
+        with self.open_file() as file:
+            if not self.load_frames:
+                # Index only, frames are decoded on demand by read_frame()/iter_frames()
+                self.load_index(file)
+                return
+
+            with LoadTracker(self.track_memory) as self.load_tracker:
+                self._load_file(file)
 
+        self.peak_load_bytes = self.load_tracker.peak
+
+    def open_file(self):
+        """
+        Opens the HDF5 file for reading, in SWMR mode if the reader was created with swmr=True.
+        """
+        return open_hdf5(self.hdf5_path, self.swmr)
+
+    def _load_file(self, file):
         if self.file_type == 'f':
             print('Loading HDF5 Field files.')
             self.load_field_hdf5(file)
@@ -126,51 +205,381 @@ class HDF5Reader:
         else:
             raise Exception('HDF5Reader.load_hdf5(): File does not contain "H5pio" or "H5fio" tags at top level.')
 
-    def load_field_hdf5(self, file):
-        self.load_field_xdmf()
+    def memory_report(self):
+        """
+        Returns a MemoryReport of the bytes held per frame, per component and per cache.
+        Call .print() on it for a table or .to_dict() for the raw numbers.
+        """
+        return MemoryReport(self)
+
+    def frame_group(self):
+        return 'H5pio' if self.file_type == 'p' else 'H5fio_3DRectMesh'
+
+    @profiled('HDF5Reader.load_index')
+    def load_index(self, file):
+        """
+        Reads the XDMF metadata and the HDF5 frame keys without decoding any frame data.
+        """
+        self.times = []
+
+        if self.file_type == 'p':
+            self.load_particle_xdmf()
+        else:
+            self.load_field_xdmf()
+
+        self.all_times = self.times
+        self.all_keys = list(file[self.frame_group()].keys())
+        self._apply_selection()
+
+        # Chaining data is cell centred
+        if self.file_type == 'c':
+            self.dims = (self.dims[0] - 1, self.dims[1] - 1, self.dims[2] - 1)
+
+    def _apply_selection(self):
+        self.frame_numbers = self.select_frames(len(self.all_keys))
+        self.frame_keys = [self.all_keys[n] for n in self.frame_numbers]
+        self.times = [self.all_times[n] for n in self.frame_numbers]
+        self.nFrames = len(self.frame_keys)
+
+    @profiled('HDF5Reader.refresh')
+    def refresh(self):
+        """
+        Picks up frames the simulation appended since the index was read, without rebuilding the reader.
+        Only the XDMF bytes written since the last refresh are read, and a frame only counts once both its HDF5 group
+        and its XDMF time exist. The frames/t_range/stride selection is re-applied, so frames=-1 follows the latest
+        frame. With load_frames=True the new frames are decoded, already decoded ones are kept.
+
+        Return:
+            List of the selected frame indices that are new.
+        """
+        if self.xdmf_offset is None or os.path.getsize(self.xdmf_path) < self.xdmf_offset:
+            # First refresh, or the XDMF was rewritten from scratch
+            self.all_times, self.xdmf_offset = scan_xdmf_times(self.xdmf_path)
+        else:
+            times, self.xdmf_offset = scan_xdmf_times(self.xdmf_path, self.xdmf_offset)
+            self.all_times = self.all_times + times
+
+        previous = set(self.frame_numbers)
+        decoded = dict(zip(self.frame_numbers, self.frames))
+
+        with self.open_file() as file:
+            self.all_keys = list(file[self.frame_group()].keys())
+            self._apply_selection()
+
+            if self.load_frames:
+                self.frames = [decoded[n] if n in decoded else self.decode_frame(file, i)
+                               for i, n in enumerate(self.frame_numbers)]
+
+        return [i for i, n in enumerate(self.frame_numbers) if n not in previous]
+
+    def grid_coords(self):
+        """
+        Returns physical (x, y, z) coordinate arrays of field or chaining data. Chaining data is cell centred.
+        """
+        shift = 0.5 if self.file_type == 'c' else 0.0
+        return [self.origin[k] + self.dxdydz[k] * (np.arange(self.dims[k]) + shift) for k in range(3)]
+
+    def chain_components(self):
+        """
+        Returns the ChainFrame attribute names of the file's first frame, e.g. ('Cu_nDensity', ...). Used as the fixed
+        column list of per frame chaining diagnostics, since later frames may add or drop species.
+        """
+        if self.file_type != 'c':
+            raise Exception('HDF5Reader.chain_components(): Only available for chaining (_c) files.')
+
+        if self._chain_components is None:
+            with self.open_file() as file:
+                self._chain_components = tuple(chain_quantities(file[self.frame_group()][self.all_keys[0]]))
+        return self._chain_components
+
+    def select_frames(self, nframes):
+        """
+        Resolves the frames/t_range/stride selection against the XDMF times.
+
+        Return:
+            List of the selected original frame numbers.
+        """
+        numbers = list(range(min(nframes, len(self.all_times))))
+
+        if self.frame_selection is not None:
+            if isinstance(self.frame_selection, slice):
+                numbers = numbers[self.frame_selection]
+            # Indices past the frames written so far select nothing yet, refresh() picks them up once they exist
+            elif np.ndim(self.frame_selection) == 0:
+                numbers = [numbers[self.frame_selection]] if -len(numbers) <= self.frame_selection < len(numbers) else []
+            else:
+                numbers = [numbers[n] for n in self.frame_selection if -len(numbers) <= n < len(numbers)]
+
+        if self.t_range is not None:
+            t0, t1 = self.t_range
+            numbers = [n for n in numbers if (t0 is None or self.all_times[n] >= t0) and (t1 is None or self.all_times[n] <= t1)]
+
+        return numbers[::self.stride]
+
+    def decode_frame(self, file, i, zrange=None):
+        """
+        Decodes the i-th selected frame of an open HDF5 file into a ParticleFrame, FieldFrame or ChainFrame.
+        zrange=(z0, z1) decodes only that slab of z planes of field/chaining data.
+        """
+        data = file[self.frame_group()][self.frame_keys[i]]
+
+        if self.file_type == 'p':
+            return ParticleFrame(frame=data,
+                                 num_active=data.attrs['nParticles_active'][0],
+                                 time=self.times[i],
+                                 frame_num=self.frame_numbers[i])
 
-        data = file['H5fio_3DRectMesh']
-        frame_keys = list(data.keys())
+        if self.file_type == 'f':
+            frame = FieldFrame(frame=data, dims=self.dims, time=self.times[i], frame_num=self.frame_numbers[i], zrange=zrange)
+        else:
+            frame = ChainFrame(frame=data, dims=self.dims, time=self.times[i], frame_num=self.frame_numbers[i], zrange=zrange)
+
+        if self.pyramid:
+            frame.build_pyramid()
+
+        return frame
+
+    def read_frame(self, i, zrange=None):
+        """
+        Returns frame i, decoding it from disk if the frames were not loaded up front or only a z slab is wanted.
+        """
+        if self.frames and zrange is None:
+            return self.frames[i]
+
+        with self.open_file() as file:
+            return self.decode_frame(file, i, zrange)
+
+    def iter_frames(self):
+        """
+        Yields frames in order. Without loaded frames each one is decoded on demand and can be dropped after use.
+        """
+        if self.frames:
+            yield from self.frames
+            return
+
+        with self.open_file() as file:
+            for i in range(self.nFrames):
+                yield self.decode_frame(file, i)
+
+    @profiled('HDF5Reader.chain_reductions')
+    def chain_reductions(self, species=None, chunk_size=2**22):
+        """
+        Whole run reductions of chaining data, streamed straight from the datasets in chunks of chunk_size cells
+        so no frame is ever decoded or held in full.
+
+        Parameters:
+            species:    Species names to reduce, e.g. ['e']. Default is every species with nDensity and temperature
+                        in any frame. Frames missing a species give NaN for it.
+            chunk_size: Cells read per chunk.
+
+        Return:
+            Dict of {species: {'T_mean': ..., 'N_total': ..., 'T_weighted': ...}}, each an array of nFrames values:
+                T_mean:     Volume averaged temperature.
+                N_total:    Total particle count, sum of nDensity times the cell volume.
+                T_weighted: Density weighted temperature, sum(n T) / sum(n).
+        """
+        if self.file_type != 'c':
+            raise Exception('HDF5Reader.chain_reductions(): Only available for chaining (_c) files.')
+
+        dV = self.dxdydz[0] * self.dxdydz[1] * self.dxdydz[2]
+
+        with self.open_file() as file:
+            groups = [file[self.frame_group()][key] for key in self.frame_keys]
+
+            if species is None:
+                # Union over every frame, species can appear or vanish during a run
+                found = set()
+                for group in groups:
+                    found |= {name.rpartition('.')[0] for name in group.keys()
+                              if name.endswith('.nDensity') and name.replace('.nDensity', '.temperature') in group}
+                species = sorted(found)
+
+            out = {sp: {'T_mean': np.full(self.nFrames, np.nan),
+                        'N_total': np.full(self.nFrames, np.nan),
+                        'T_weighted': np.full(self.nFrames, np.nan)} for sp in species}
+
+            for i, group in enumerate(groups):
+                for sp, res in out.items():
+                    # Frames without the species stay NaN
+                    if f'{sp}.nDensity' not in group or f'{sp}.temperature' not in group:
+                        continue
+
+                    dens = group[f'{sp}.nDensity']
+                    temp = group[f'{sp}.temperature']
+
+                    sum_t = sum_n = sum_nt = 0.0
+                    for start in range(0, dens.shape[0], chunk_size):
+                        n = dens[start:start + chunk_size]
+                        t = temp[start:start + chunk_size]
+                        profiler.add_bytes(n.nbytes + t.nbytes)
+
+                        sum_t += np.sum(t)
+                        sum_n += np.sum(n)
+                        sum_nt += np.dot(n, t)
+
+                    res['T_mean'][i] = sum_t / dens.shape[0]
+                    res['N_total'][i] = sum_n * dV
+                    res['T_weighted'][i] = sum_nt / sum_n if sum_n > 0 else np.nan
+
+        return out
+
+    def probe_weights(self, points=None, indices=None, interpolate=True):
+        """
+        Resolves probe locations to the dataset rows they need and the weights combining those rows.
+
+        Parameters:
+            points:      (nprobes, 3) physical (x, y, z) positions in m.
+            indices:     (nprobes, 3) integer (ix, iy, iz) grid indices. Used instead of points.
+            interpolate: Trilinear interpolation between the 8 surrounding nodes. If False the nearest node is used.
+
+        Return:
+            rows, weights. rows are the sorted unique dataset rows, weights an (nprobes, len(rows)) matrix so that
+            probe values = weights @ dataset[rows].
+        """
+        if self.file_type == 'p':
+            raise Exception('HDF5Reader.probe_weights(): Particle data has no grid to probe.')
+
+        dims = np.array(self.dims)
+        if indices is not None:
+            frac = np.atleast_2d(np.asarray(indices, dtype=float))
+        elif points is not None:
+            origin = np.array([c[0] for c in self.grid_coords()])
+            frac = (np.atleast_2d(np.asarray(points, dtype=float)) - origin) / np.array(self.dxdydz)
+        else:
+            raise Exception('HDF5Reader.probe_weights(): Give either points or indices.')
 
-        self.nFrames = len(frame_keys)
+        if np.any(frac < -0.5) or np.any(frac > dims - 0.5):
+            raise Exception('HDF5Reader.probe_weights(): Probe outside of the grid.')
 
-        for i, frame in enumerate(frame_keys):
-            self.frames.append(FieldFrame(frame=data[frame],
-                                          dims=self.dims,
-                                          time=self.times[i],
-                                          frame_num=i))
+        if interpolate and indices is None:
+            lo = np.clip(np.floor(frac).astype(int), 0, np.maximum(dims - 2, 0))
+            t = np.clip(frac - lo, 0.0, 1.0)
+            corners = np.array([(c & 1, c >> 1 & 1, c >> 2 & 1) for c in range(8)])
+            nodes = np.minimum(lo[:, None, :] + corners, dims - 1)
+            node_weights = np.prod(np.where(corners, t[:, None, :], 1.0 - t[:, None, :]), axis=-1)
+        else:
+            nodes = np.clip(np.rint(frac).astype(int), 0, dims - 1)[:, None, :]
+            node_weights = np.ones((len(frac), 1))
+
+        # x varies fastest on disk
+        flat = nodes[..., 0] + dims[0] * (nodes[..., 1] + dims[1] * nodes[..., 2])
+        rows, inverse = np.unique(flat, return_inverse=True)
+
+        weights = np.zeros((len(frac), len(rows)))
+        np.add.at(weights, (np.repeat(np.arange(len(frac)), flat.shape[1]), inverse.reshape(-1)), node_weights.reshape(-1))
+        return rows, weights
+
+    @profiled('HDF5Reader.probe')
+    def probe(self, points=None, indices=None, fields='B', interpolate=True):
+        """
+        Time histories at fixed points. Only the rows around each probe are read from every selected frame.
+
+        Parameters:
+            points, indices, interpolate: See probe_weights().
+            fields: Dataset name or tuple of names. 'E', 'B', 'J' for field data, e.g. 'e.nDensity' or
+                    'e_nDensity' for chaining data.
+
+        Return:
+            (nFrames, nprobes, 3) array for vector datasets or (nFrames, nprobes) for scalar ones.
+            A dict of {field: array} when fields is a tuple.
+
+        Usage:
+            Bprobe = data.probe(points=[(0.0, 0.0, z) for z in (-0.2, 0.0, 0.2)], fields='B')
+        """
+        names = (fields,) if isinstance(fields, str) else tuple(fields)
+        rows, weights = self.probe_weights(points, indices, interpolate)
+
+        out = {}
+        with self.open_file() as file:
+            for i, key in enumerate(self.frame_keys):
+                group = file[self.frame_group()][key]
+                for name in names:
+                    dataset = group[name.replace('_', '.', 1) if self.file_type == 'c' and name not in group else name]
+                    # Point selection, rows must be increasing
+                    values = dataset[rows]
+                    profiler.add_bytes(values.nbytes)
+
+                    if name not in out:
+                        out[name] = np.empty((self.nFrames, weights.shape[0]) + values.shape[1:])
+                    out[name][i] = np.tensordot(weights, values, axes=1)
+
+        return out[names[0]] if isinstance(fields, str) else out
+
+    def _decode_all(self, file):
+        for i in range(self.nFrames):
+            self.frames.append(self.decode_frame(file, i))
+            self.frames[-1].load_peak_bytes = self.load_tracker.frame_peak()
+
+    @profiled('HDF5Reader.load_field_hdf5')
+    def load_field_hdf5(self, file):
+        self.load_index(file)
+        self._decode_all(file)
 
+    @profiled('HDF5Reader.load_particle_hdf5')
     def load_particle_hdf5(self, file):
-        self.load_particle_xdmf()
+        self.load_index(file)
+        self._decode_all(file)
 
-        data = file['H5pio']
-        frame_keys = list(data.keys())
+    @profiled('HDF5Reader.load_chain_hdf5')
+    def load_chain_hdf5(self, file):
+        self.load_index(file)
+        self._decode_all(file)
+
+
+def open_hdf5(path, swmr=False):
+    """
+    Opens an HDF5 file read only, as a SWMR reader if swmr is True.
+    """
+    if swmr:
+        return h5py.File(path, 'r', libver='latest', swmr=True)
+    return h5py.File(path, 'r')
 
-        self.nFrames = len(frame_keys)
 
-        for i, frame in enumerate(frame_keys):
-            self.frames.append(ParticleFrame(frame=data[frame],
-                                             num_active=data[frame].attrs['nParticles_active'][0],
-                                             time=self.times[i],
-                                             frame_num=i))
+_XDMF_TIME = re.compile(rb'<Time[^>]*Value="([^"]*)"')
 
-    def load_chain_hdf5(self, file):
-        self.load_field_xdmf()
 
-        data = file['H5fio_3DRectMesh']
-        frame_keys = list(data.keys())
+def scan_xdmf_times(path, offset=0):
+    """
+    Reads the time of every complete step grid of an XDMF file from byte offset on. A step still being written
+    (no closing </Grid> yet) is left for the next scan.
+
+    Return:
+        times, byte offset just past the last complete step grid, where the next scan starts.
+    """
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        text = file.read()
+
+    times = []
+    end = 0
+    for match in _XDMF_TIME.finditer(text):
+        close = text.find(b'</Grid>', match.end())
+        if close < 0:
+            break
+        times.append(float(match.group(1)))
+        end = close + len(b'</Grid>')
+
+    return times, offset + end
+
 
-        self.nFrames = len(frame_keys)
-        self.dims = (self.dims[0] - 1, self.dims[1] - 1, self.dims[2] - 1)
+def _read_rows(dataset, zrange, dims):
+    """
+    Reads a whole dataset, or for zrange=(z0, z1) only the rows of those z planes. x varies fastest on disk,
+    so a z slab is one contiguous hyperslab.
+    """
+    if zrange is None:
+        return np.asarray(dataset)
+
+    plane = dims[0] * dims[1]
+    return dataset[zrange[0] * plane:zrange[1] * plane]
 
-        for i, frame in enumerate(frame_keys):
-            self.frames.append(ChainFrame(frame=data[frame],
-                                          dims=self.dims,
-                                          time=self.times[i],
-                                          frame_num=i))
+
+def _slab_dims(dims, zrange):
+    return dims if zrange is None else (dims[0], dims[1], zrange[1] - zrange[0])
 
 
 class ParticleFrame:
+    @profiled('ParticleFrame.decode')
     def __init__(self, frame, num_active, time, frame_num):
         self.charge = np.asarray(frame['charge'])
         self.mass = np.asarray(frame['mass'])
@@ -180,18 +589,40 @@ class ParticleFrame:
 
         self.spid = np.asarray(frame['spid'])
 
+        profiler.add_bytes(self.charge.nbytes + self.mass.nbytes + self.location.nbytes +
+                           self.velocity.nbytes + self.spid.nbytes)
+
         self.particles_active = num_active
         self.time = time
         self.frame_num = frame_num
 
+        self.spatial_indexes = {}
+
+    def spatial_index(self, grid):
+        """
+        Returns the CellIndex of the active particles on grid (a field HDF5Reader or (origin, dxdydz, dims)),
+        building it on first use and caching it on the frame.
+        """
+        key = grid_geometry(grid)
+        if key not in self.spatial_indexes:
+            n = self.particles_active
+            self.spatial_indexes[key] = CellIndex(self.location[:n], key, self.spid[:n])
+        return self.spatial_indexes[key]
+
 
 class FieldFrame:
-    def __init__(self, frame, dims, time, frame_num):
-        e_field = np.asarray(frame['E'])
-        b_field = np.asarray(frame['B'])
-        j_field = np.asarray(frame['J'])
+    components = ('Ex', 'Ey', 'Ez', 'Bx', 'By', 'Bz', 'Jx', 'Jy', 'Jz')
+
+    @profiled('FieldFrame.decode')
+    def __init__(self, frame, dims, time, frame_num, zrange=None):
+        e_field = _read_rows(frame['E'], zrange, dims)
+        b_field = _read_rows(frame['B'], zrange, dims)
+        j_field = _read_rows(frame['J'], zrange, dims)
+        dims = _slab_dims(dims, zrange)
         reshape_dims = dims[::-1]
 
+        profiler.add_bytes(e_field.nbytes + b_field.nbytes + j_field.nbytes)
+
         # Assuming X and Z are swapped
         self.Ex = e_field[:, 0].reshape(reshape_dims).T
         self.Ey = e_field[:, 1].reshape(reshape_dims).T
@@ -208,16 +639,95 @@ class FieldFrame:
         self.time = time
         self.dims = dims
         self.frame_num = frame_num
+        self.zrange = zrange
+
+        self.pyramids = {}
+
+    @profiled('FieldFrame.build_pyramid')
+    def build_pyramid(self, factors=PYRAMID_FACTORS):
+        """
+        Builds block averaged preview levels for every component. Access with frame.pyramids['Bz'].
+        """
+        self.pyramids = {c: LODPyramid(getattr(self, c), factors) for c in self.components}
+
+
+def chain_quantities(frame):
+    """
+    Returns the chaining datasets of an HDF5 frame group as {attribute name: dataset name},
+    e.g. {'Cu_nDensity': 'Cu.nDensity'}. Datasets are named <species>.<quantity>.
+    """
+    return {name.replace('.', '_'): name for name in frame.keys() if isinstance(frame[name], h5py.Dataset)}
 
 
 class ChainFrame:
-    def __init__(self, frame, dims, time, frame_num):
-        reshape_dims = dims[::-1]
-        self.Cu_nDensity    = np.asarray(frame['Cu.nDensity']).reshape(reshape_dims).T
-        self.Cu_temperature = np.asarray(frame['Cu.temperature']).reshape(reshape_dims).T
-        self.e_nDensity    = np.asarray(frame['e.nDensity']).reshape(reshape_dims).T
-        self.e_temperature = np.asarray(frame['e.temperature']).reshape(reshape_dims).T
+    """
+    Chaining (species moment) data of one frame. The species quantities present in the frame are discovered
+    from its datasets, e.g. Cu.nDensity -> frame.Cu_nDensity, and each one is only read from disk on first access.
 
-        self.dims = dims
+    Attributes:
+        components: Attribute names of every quantity in the frame.
+        species:    Dict of {species: (quantity, ...)}, e.g. {'Cu': ('nDensity', 'temperature')}.
+    """
+    @profiled('ChainFrame.decode')
+    def __init__(self, frame, dims, time, frame_num, zrange=None):
+        self.datasets = chain_quantities(frame)
+        self.components = tuple(self.datasets)
+        self.itemsizes = {n: frame[ds].dtype.itemsize for n, ds in self.datasets.items()}
+
+        self.species = {}
+        for name in self.datasets.values():
+            sp, _, quantity = name.rpartition('.')
+            self.species.setdefault(sp, ())
+            self.species[sp] += (quantity,)
+
+        # Only the location is kept so the frame can be read later, after the file is closed, or pickled
+        self.hdf5_path = frame.file.filename
+        self.group_name = frame.name
+        self.swmr = frame.file.swmr_mode
+        self.full_dims = dims
+
+        self.dims = _slab_dims(dims, zrange)
         self.time = time
         self.frame_num = frame_num
+        self.zrange = zrange
+
+        self.pyramids = {}
+
+    def __getattr__(self, name):
+        # Only called for attributes not yet in __dict__, i.e. quantities that have not been read
+        if name in self.__dict__.get('datasets', {}):
+            self.load([name])
+            return self.__dict__[name]
+        raise AttributeError(f"'ChainFrame' object has no attribute '{name}'")
+
+    @profiled('ChainFrame.load')
+    def load(self, names=None):
+        """
+        Reads the named quantities (default all) not already loaded, opening the file once.
+        """
+        names = [n for n in (self.components if names is None else names) if n not in self.__dict__]
+        if not names:
+            return
+
+        reshape_dims = self.dims[::-1]
+        with open_hdf5(self.hdf5_path, self.swmr) as file:
+            group = file[self.group_name]
+            for n in names:
+                arr = _read_rows(group[self.datasets[n]], self.zrange, self.full_dims).reshape(reshape_dims).T
+                profiler.add_bytes(arr.nbytes)
+                setattr(self, n, arr)
+
+    def pending_nbytes(self):
+        """
+        Bytes the quantities not read yet will hold once they are loaded.
+        """
+        ncells = int(np.prod(self.dims))
+        return sum(ncells * self.itemsizes[n] for n in self.components if n not in self.__dict__)
+
+    @profiled('ChainFrame.build_pyramid')
+    def build_pyramid(self, factors=PYRAMID_FACTORS):
+        """
+        Builds block averaged preview levels for every species quantity. Access with frame.pyramids['e_nDensity'].
+        """
+        self.load()
+        self.pyramids = {c: LODPyramid(getattr(self, c), factors) for c in self.components}
@@ -0,0 +1,201 @@
+import tracemalloc
+
+import numpy as np
+
+
+def array_owner(arr):
+    """
+    Follows .base back to the array that owns the memory arr points into.
+    """
+    owner = arr
+    while isinstance(owner.base, np.ndarray):
+        owner = owner.base
+    return owner
+
+
+def frame_nbytes(frame):
+    """
+    Bytes held by a frame's arrays and caches, counting shared buffers once.
+    """
+    owners = {}
+    for value in vars(frame).values():
+        for arr in _cache_arrays(value):
+            owner = array_owner(arr)
+            owners[id(owner)] = owner.nbytes
+    return sum(owners.values())
+
+
+def _cache_arrays(obj, seen=None):
+    """
+    Yields every ndarray held inside a cache object: dicts, lists, tuples and the attributes of any other object
+    (LODPyramid levels, CellIndex arrays, ...). Each container is visited once, so reference cycles end.
+    """
+    if isinstance(obj, np.ndarray):
+        yield obj
+        return
+
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+
+    if isinstance(obj, dict):
+        for value in obj.values():
+            yield from _cache_arrays(value, seen)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            yield from _cache_arrays(value, seen)
+    elif hasattr(obj, '__dict__'):
+        yield from _cache_arrays(vars(obj), seen)
+
+
+class MemoryReport:
+    """
+    Memory footprint of an HDF5Reader and its frames. Views are counted against the buffer
+    they point into, so arrays sharing one buffer (e.g. Ex/Ey/Ez) are only counted once.
+
+    Methods:
+        __init__(self, reader)
+        to_dict(self)
+        print(self, file=None)
+
+    Attributes:
+        frames:          List of per frame dicts with components, caches and owned bytes.
+        caches:          Reader level caches {name: bytes}.
+        total_bytes:     Bytes actually held by the reader, frames and caches.
+        logical_bytes:   Sum of nbytes over every array, counting views separately.
+        peak_load_bytes: Peak traced allocation while loading, None unless the reader was opened with track_memory=True.
+    """
+    def __init__(self, reader):
+        self.seen = set()
+        self.frames = []
+        self.caches = {}
+        self.total_bytes = 0
+        self.logical_bytes = 0
+        self.peak_load_bytes = getattr(reader, 'peak_load_bytes', None)
+
+        for frame in reader.frames:
+            self.frames.append(self._frame_report(frame))
+
+        for name, value in vars(reader).items():
+            if name == 'frames' or not isinstance(value, (np.ndarray, dict, list, tuple)):
+                continue
+            nbytes = self._count(_cache_arrays(value))
+            if nbytes:
+                self.caches[name] = nbytes
+
+    def _count(self, arrays):
+        """
+        Adds the owners of arrays not already counted and returns the new bytes.
+        """
+        nbytes = 0
+        for arr in arrays:
+            self.logical_bytes += arr.nbytes
+            owner = array_owner(arr)
+            if id(owner) not in self.seen:
+                self.seen.add(id(owner))
+                nbytes += owner.nbytes
+
+        self.total_bytes += nbytes
+        return nbytes
+
+    def _frame_report(self, frame):
+        components = {}
+        caches = {}
+        owned = 0
+
+        for name, value in vars(frame).items():
+            if isinstance(value, np.ndarray):
+                owner = array_owner(value)
+                components[name] = {'nbytes': value.nbytes,
+                                    'view': owner is not value,
+                                    'owner_nbytes': owner.nbytes,
+                                    'dtype': str(value.dtype),
+                                    'shape': value.shape}
+                owned += self._count([value])
+
+            elif isinstance(value, (dict, list, tuple)):
+                nbytes = self._count(_cache_arrays(value))
+                if nbytes:
+                    caches[name] = nbytes
+                    owned += nbytes
+
+        return {'frame_num': getattr(frame, 'frame_num', None),
+                'time': getattr(frame, 'time', None),
+                'total_bytes': owned,
+                'load_peak_bytes': getattr(frame, 'load_peak_bytes', None),
+                'components': components,
+                'caches': caches}
+
+    def to_dict(self):
+        return {'total_bytes': self.total_bytes,
+                'logical_bytes': self.logical_bytes,
+                'peak_load_bytes': self.peak_load_bytes,
+                'caches': self.caches,
+                'frames': self.frames}
+
+    def print(self, file=None):
+        mb = 2 ** 20
+
+        print("#" * 60, file=file)
+        print(f'{"Frame":<8s} {"Owned MB":>12s} {"Views":>6s} {"Caches MB":>12s} {"Load peak MB":>14s}', file=file)
+        print("-" * 60, file=file)
+
+        for fr in self.frames:
+            views = sum(c['view'] for c in fr['components'].values())
+            cache_mb = sum(fr['caches'].values()) / mb
+            peak = '' if fr['load_peak_bytes'] is None else f'{fr["load_peak_bytes"] / mb:14.2f}'
+            print(f'{fr["frame_num"]!s:<8s} {fr["total_bytes"] / mb:>12.2f} {views:>6d} {cache_mb:>12.2f} {peak:>14s}',
+                  file=file)
+
+        print("-" * 60, file=file)
+        for name, nbytes in self.caches.items():
+            print(f'{"cache " + name:<30s} {nbytes / mb:>12.2f} MB', file=file)
+        print(f'{"Total held":<30s} {self.total_bytes / mb:>12.2f} MB', file=file)
+        print(f'{"Total logical (views + owners)":<30s} {self.logical_bytes / mb:>12.2f} MB', file=file)
+        if self.peak_load_bytes is not None:
+            print(f'{"Peak during load":<30s} {self.peak_load_bytes / mb:>12.2f} MB', file=file)
+        print("#" * 60, file=file)
+
+
+class LoadTracker:
+    """
+    Tracks peak traced allocation while frames load. Does nothing unless enabled, since tracemalloc slows allocation.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = False
+        self.peak = None
+        self.window_start = 0
+
+    def __enter__(self):
+        if self.enabled:
+            self.started = not tracemalloc.is_tracing()
+            if self.started:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self.peak = 0
+            self.window_start = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def frame_peak(self):
+        """
+        Returns the peak bytes allocated above the previous frame's resident memory and starts a new window.
+        """
+        if not self.enabled:
+            return None
+
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        frame_peak = peak - self.window_start
+
+        tracemalloc.reset_peak()
+        self.window_start = current
+        return frame_peak
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            if self.started:
+                tracemalloc.stop()
+        return False
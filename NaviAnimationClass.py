@@ -2,9 +2,12 @@ import matplotlib.pyplot as plt
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 
 from NaviBaseClasses import *
+from FieldPyramid import select_level
+from Timer import profiled
 import os
 
 
+@profiled()
 def make_mp4():
     os.system("ffmpeg -framerate 24 -r 24 -i ./outputs/images/anim_%d.png -vf format=yuv420p output.mp4")
 
@@ -41,6 +44,7 @@ class AnimatedSubplot:
     def __del__(self):
         plt.show(block=True)
 
+    @profiled('AnimatedSubplot.create')
     def _create_anim(self, nrows, ncols):
         plt.ion()
 
@@ -94,7 +98,8 @@ class AnimatedSubplot:
             # ContourPlot
             elif isinstance(cur_plot, ContourPlot):
                 ax.set_aspect(aspect=1)
-                ax.contourf(cur_plot.xdata, cur_plot.ydata, cur_plot.zdata, cmap=cur_plot.cmap, levels=cur_plot.levels)
+                xdata, ydata, zdata = select_level(cur_plot.xdata, cur_plot.ydata, cur_plot.zdata, ax)
+                ax.contourf(xdata, ydata, zdata, cmap=cur_plot.cmap, levels=cur_plot.levels)
 
             else:
                 raise Exception('Invalid Plotting Class.')
@@ -102,6 +107,7 @@ class AnimatedSubplot:
         if self.save_anim:
             self.fig.savefig(f'./outputs/images/anim_{self.frame_number}.png')
 
+    @profiled('AnimatedSubplot.update')
     def update(self):
         """
         Updates subplots.
@@ -132,7 +138,8 @@ class AnimatedSubplot:
                 # clear current axes
                 ax.cla()
                 # replot contour
-                ax.contourf(cur_plot.xdata, cur_plot.ydata, cur_plot.zdata, cmap=cur_plot.cmap, levels=cur_plot.levels)
+                xdata, ydata, zdata = select_level(cur_plot.xdata, cur_plot.ydata, cur_plot.zdata, ax)
+                ax.contourf(xdata, ydata, zdata, cmap=cur_plot.cmap, levels=cur_plot.levels)
 
         self.frame_number += 1
         self.fig_text_ptr.set_text(f'Frame {self.frame_number}')
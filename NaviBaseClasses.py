@@ -84,7 +84,7 @@ class ContourPlot(SubplotInfo):
     Parameters:
         xdata:   Optional. Sets x-axis range
         ydata:   Optional. Sets y-axis range
-        zdata:   List of data to be plotted.
+        zdata:   List of data to be plotted. An LODPyramid plots the coarsest level matching the axes pixel size.
         ind:     Positional index in subplot. 1 <= index <= number of subplots.
         title:   Subplot title. Default is none.
         xlabel:  Subplot x-axis label. Default is none.
@@ -120,3 +120,38 @@ class ContourPlot(SubplotInfo):
         self.levels = levels
         self.vmin = vmin
         self.vmax = vmax
+
+
+class ImagePlot(SubplotInfo):
+    """
+    Image Plot class used for storing rasterized data, e.g. particle densities from particle_raster().
+
+    Methods:
+        __init__(self, image, extent=None, ind=1, title='', xlabel='', ylabel='', cmap='viridis', clabel='', labels=(), colors=())
+
+    Parameters:
+        image:   (ny, nx) values scaled to [0, 1] with NaN for empty pixels, drawn through cmap, or an (ny, nx, 4) RGBA image.
+        extent:  (x0, x1, y0, y1) covered by the image. Default is pixel indices.
+        ind:     Positional index in subplot. 1 <= index <= number of subplots.
+        title:   Subplot title. Default is none.
+        xlabel:  Subplot x-axis label. Default is none.
+        ylabel:  Subplot y-axis label. Default is none.
+        cmap:    Colormap of a scalar image. Default is 'viridis'.
+        clabel:  Colorbar label of a scalar image.
+        labels:  Species names of an RGBA image, shown as a legend.
+        colors:  Colours matching labels.
+    """
+    def __init__(self, image=None, extent=None, ind=1, title='', xlabel='', ylabel='',
+                 cmap='viridis', clabel='', labels=(), colors=()):
+
+        if image is None:
+            raise Exception('No image supplied to ImagePlot.')
+
+        super().__init__(ind, title, xlabel, ylabel)
+
+        self.image = image
+        self.extent = extent if extent is not None else (0, image.shape[1], 0, image.shape[0])
+        self.cmap = cmap
+        self.clabel = clabel
+        self.labels = labels
+        self.colors = colors
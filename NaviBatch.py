@@ -0,0 +1,339 @@
+"""
+Headless batch post-processing of whole run directories ("tfnavi batch").
+
+Each run directory is searched for <prefix>_f/_p/_c.hdf5 outputs. A JSON job spec declares the
+products to make; every HDF5 frame is decoded once and handed to all products that need it.
+Runs are processed in parallel across a process pool.
+
+Usage:
+    python NaviBatch.py RUN_DIR [RUN_DIR ...] --spec job.json --output post --workers 8
+
+Job spec:
+    {
+      "slices":      [{"component": "Bz", "axis": "y", "index": "mid", "every": 4}],
+      "movies":      [{"component": "Ex", "axis": "z", "zlims": [-6e5, 6e5]}],
+      "diagnostics": [{"name": "field_energy"},
+                      {"name": "temperature", "species": {"e": -1, "H": 0}},
+                      {"name": "chain_mean"}]
+    }
+
+Slices and movies default to field ("f") data, set "file": "c" for chaining quantities.
+Set "fast": true on a slice to draw it as a pcolormesh rather than filled contours.
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import abc
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import time
+import traceback
+
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+
+from HDF5Reader import HDF5Reader
+from NaviBaseClasses import ContourPlot
+from PlottingFuncs import FigureTemplate, animate_contour, get_hot_desaturated
+import Diagnostics
+
+
+AXES = {'x': 0, 'y': 1, 'z': 2}
+
+
+def init_argparse():
+    parser = argparse.ArgumentParser(usage='./%(prog)s [OPTIONS] RUN_DIR [RUN_DIR ...]', description='Headless batch post-processing of TFLink runs.')
+    parser.add_argument('Runs',            metavar='run_dir', type=str, nargs='+',           help='Run directories containing *_f/_p/_c.hdf5 outputs')
+    parser.add_argument('-s', '--spec',    action='store', type=str, required=True,          help='JSON job spec')
+    parser.add_argument('-o', '--output',  action='store', type=str, default='tfnavi_output', help='Output directory')
+    parser.add_argument('-w', '--workers', action='store', type=int, default=None,           help='Number of worker processes. Default is one per CPU')
+    parser.add_argument('--writer',        action='store', type=str, default='ffmpeg',       help='Matplotlib animation writer for movies')
+
+    return parser
+
+
+def take_slice(arr, axis, index):
+    ax = AXES[axis]
+    i = arr.shape[ax] // 2 if index == 'mid' else int(index)
+    return np.take(arr, i, axis=ax)
+
+
+class Product(abc.ABC):
+    """
+    Base class for batch products. consume() is called once per decoded frame, finish() once at the end.
+    """
+    def __init__(self, spec, file_type):
+        self.spec = spec
+        self.file_type = spec.get('file', file_type)
+        self.outputs = []
+
+    @abc.abstractmethod
+    def consume(self, frame, reader, outdir):
+        pass
+
+    def finish(self, reader, outdir):
+        return self.outputs
+
+
+class SliceProduct(Product):
+    """
+    Saves a contour image of one component on a plane for every "every"-th frame.
+    """
+    def __init__(self, spec):
+        super().__init__(spec, 'f')
+        self.component = spec['component']
+        self.axis = spec.get('axis', 'z')
+        self.index = spec.get('index', 'mid')
+        self.every = spec.get('every', 1)
+        self.template = None
+
+    def plane(self, reader):
+        coords = reader.grid_coords()
+        rows, cols = [k for k in range(3) if k != AXES[self.axis]]
+        names = 'xyz'
+        return coords[cols], coords[rows], f'{names[cols]} (m)', f'{names[rows]} (m)'
+
+    def consume(self, frame, reader, outdir):
+        if frame.frame_num % self.every:
+            return
+
+        xdata, ydata, xlabel, ylabel = self.plane(reader)
+        zdata = take_slice(getattr(frame, self.component), self.axis, self.index)
+
+        plot = ContourPlot(xdata=xdata, ydata=ydata, zdata=zdata, xlabel=xlabel, ylabel=ylabel,
+                           title=f'{self.component} @ {self.axis}={self.index}, t={1e9 * frame.time:.4f} ns',
+                           cmap=get_hot_desaturated(), vmin=self.spec.get('vmin'), vmax=self.spec.get('vmax'),
+                           levels=self.spec.get('levels', 100))
+
+        filename = os.path.join(outdir, 'slices', f'{self.component}_{self.axis}{self.index}_{frame.frame_num:04d}.png')
+
+        # Laid out once on the first frame, later frames only swap in their data
+        if self.template is None:
+            self.template = FigureTemplate(plot, figsize=self.spec.get('figsize', (10, 8)), fast=self.spec.get('fast', False))
+            self.template.save(filename)
+        else:
+            self.template.render(plot, filename=filename)
+        self.outputs.append(filename)
+
+
+class MovieProduct(SliceProduct):
+    """
+    Collects one plane per frame and renders them with animate_contour at the end.
+    """
+    def __init__(self, spec, writer='ffmpeg'):
+        super().__init__(spec)
+        self.writer = writer
+        self.slices = []
+        self.times = []
+
+    def consume(self, frame, reader, outdir):
+        if frame.frame_num % self.every:
+            return
+
+        self.slices.append(np.array(take_slice(getattr(frame, self.component), self.axis, self.index)))
+        self.times.append(1e9 * frame.time)
+
+    def finish(self, reader, outdir):
+        if not self.slices:
+            return self.outputs
+
+        xdata, ydata, xlabel, ylabel = self.plane(reader)
+        ext = 'mp4' if self.writer == 'ffmpeg' else 'gif'
+        filename = os.path.join(outdir, 'movies', self.spec.get('filename', f'{self.component}_{self.axis}{self.index}.{ext}'))
+
+        animate_contour(xdata=xdata, ydata=ydata, zdata=self.slices, times=self.times, timescale='ns',
+                        title=f'{self.component} @ {self.axis}={self.index}', xlabel=xlabel, ylabel=ylabel,
+                        zlims=self.spec.get('zlims'), levels=self.spec.get('levels', 100),
+                        save=True, filename=filename, writer=self.writer)
+        plt.close('all')
+
+        self.outputs.append(filename)
+        return self.outputs
+
+
+class DiagnosticProduct(Product):
+    """
+    Reduces every frame to one row of scalars and writes them as <name>.csv.
+
+    Diagnostics:
+        field_energy: Electric and magnetic field energy (J) from _f data.
+        temperature:  Temperature (K) and drift velocity per species from _p data. "species" maps names to spid,
+                      default is every spid active in the first frame.
+        chain_mean:   Volume average of every chaining quantity from _c data. "components" lists the quantities,
+                      default is those of the first frame.
+    """
+    file_types = {'field_energy': 'f', 'temperature': 'p', 'chain_mean': 'c'}
+
+    def __init__(self, spec):
+        if spec['name'] not in self.file_types:
+            raise Exception(f'DiagnosticProduct: Unknown diagnostic "{spec["name"]}".')
+
+        super().__init__(spec, self.file_types[spec['name']])
+        self.name = spec['name']
+        self.species = spec.get('species')
+        self.components = spec.get('components')
+        self.columns = None
+        self.rows = []
+
+    def consume(self, frame, reader, outdir):
+        if self.name == 'field_energy':
+            columns = ['time', 'W_E', 'W_B']
+            row = [frame.time, *Diagnostics.getFieldEnergy(frame, reader.dxdydz)]
+
+        elif self.name == 'temperature':
+            # Species are fixed by the first frame so every row has the same columns, absent species are NaN
+            if not self.species:
+                self.species = {f'spid{s}': int(s) for s in np.unique(frame.spid[:frame.particles_active])}
+
+            columns = ['time']
+            for name in self.species:
+                columns += [f'T_{name}', f'vx_{name}', f'vy_{name}', f'vz_{name}']
+            row = [frame.time, *Diagnostics.getSpeciesTemperatures(frame, list(self.species.values())).reshape(-1)]
+
+        else:
+            # Quantities are fixed by the first frame like the temperature species, missing ones are NaN
+            if not self.components:
+                self.components = list(frame.components)
+
+            columns = ['time', *self.components]
+            row = [frame.time, *Diagnostics.getChainMeans(frame, self.components)]
+
+        self.columns = columns
+        self.rows.append(row)
+
+    def finish(self, reader, outdir):
+        if not self.rows:
+            return self.outputs
+
+        filename = os.path.join(outdir, f'{self.name}.csv')
+        np.savetxt(filename, np.array(self.rows, dtype=float), delimiter=',', header=','.join(self.columns), comments='')
+        self.outputs.append(filename)
+        return self.outputs
+
+
+def build_products(spec, writer='ffmpeg'):
+    products = [SliceProduct(s) for s in spec.get('slices', [])]
+    products += [MovieProduct(s, writer) for s in spec.get('movies', [])]
+    products += [DiagnosticProduct(s) for s in spec.get('diagnostics', [])]
+    return products
+
+
+def discover_runs(run_dir):
+    """
+    Groups the <prefix>_f/_p/_c.hdf5 files of a run directory by prefix.
+
+    Return:
+        Dict of {prefix: {file_type: hdf5_path}}
+    """
+    runs = {}
+    for path in sorted(glob.glob(os.path.join(run_dir, '*_[fpc].hdf5'))):
+        prefix, file_type = os.path.basename(path)[:-len('.hdf5')].rsplit('_', 1)
+        runs.setdefault(prefix, {})[file_type] = path
+
+    return runs
+
+
+def run_job(name, paths, spec, outdir, writer='ffmpeg'):
+    """
+    Produces every product of spec for one run. Each file is streamed once and each frame is
+    shared by all products reading that file.
+
+    Return:
+        Dict summarising the job.
+    """
+    # Batch jobs are always headless. Set here rather than on import so importing NaviBatch keeps the user's
+    # backend, and here rather than in main() so spawned worker processes get it too
+    matplotlib.use('Agg')
+
+    t0 = time.perf_counter()
+    summary = {'run': name, 'frames_read': {}, 'outputs': [], 'error': None}
+
+    try:
+        products = build_products(spec, writer)
+        for sub in ('slices', 'movies'):
+            os.makedirs(os.path.join(outdir, sub), exist_ok=True)
+
+        for file_type, path in paths.items():
+            wanted = [p for p in products if p.file_type == file_type]
+            if not wanted:
+                continue
+
+            reader = HDF5Reader(path, load_frames=False)
+            nread = 0
+            for frame in reader.iter_frames():
+                for product in wanted:
+                    product.consume(frame, reader, outdir)
+                nread += 1
+
+            summary['frames_read'][file_type] = nread
+            for product in wanted:
+                summary['outputs'] += product.finish(reader, outdir)
+
+        missing = {p.file_type for p in products} - set(paths)
+        if missing:
+            summary['skipped_file_types'] = sorted(missing)
+
+    except Exception:
+        summary['error'] = traceback.format_exc()
+
+    summary['seconds'] = time.perf_counter() - t0
+    return summary
+
+
+def plan_jobs(run_dirs, output):
+    jobs = []
+    for run_dir in run_dirs:
+        run_name = os.path.basename(os.path.normpath(run_dir))
+        for prefix, paths in discover_runs(run_dir).items():
+            jobs.append((f'{run_name}/{prefix}', paths, os.path.join(output, run_name, prefix)))
+
+    return jobs
+
+
+def run_batch(run_dirs, spec, output, workers=None, writer='ffmpeg'):
+    """
+    Runs spec over every run found in run_dirs across a process pool.
+
+    Return:
+        List of job summaries.
+    """
+    jobs = plan_jobs(run_dirs, output)
+    if not jobs:
+        raise Exception('run_batch(): No *_f/_p/_c.hdf5 files found in the given run directories.')
+
+    if workers == 1:
+        return [run_job(name, paths, spec, outdir, writer) for name, paths, outdir in jobs]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_job, name, paths, spec, outdir, writer) for name, paths, outdir in jobs]
+        return [f.result() for f in futures]
+
+
+def main():
+    args = init_argparse().parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+
+    summaries = run_batch(args.Runs, spec, args.output, args.workers, args.writer)
+
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, 'batch_summary.json'), 'w') as f:
+        json.dump(summaries, f, indent=2)
+
+    failed = [s for s in summaries if s['error']]
+    for s in summaries:
+        status = 'FAILED' if s['error'] else 'ok'
+        print(f'{s["run"]:<40.40s} {status:>6s} {s["seconds"]:10.2f} s  frames read {s["frames_read"]}')
+    for s in failed:
+        print(f'\n{s["run"]}:\n{s["error"]}')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,342 @@
+"""
+Benchmark suite for the TFNavi readers, diagnostics, kernels and renderers.
+Writes synthetic _f/_p/_c runs with SyntheticData, times each stage with Timer and
+dumps the results as JSON so runs can be compared across versions.
+
+Usage:
+    python NaviBenchmark.py --dims 64 64 128 --particles 100000 --frames 10 -o bench.json
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import h5py
+import matplotlib
+
+# Seconds a fresh interpreter may spend on "import TFNavi; TFNavi.HDF5Reader"
+IMPORT_BUDGET = 0.5
+
+# Benchmarks are always headless
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+import Diagnostics
+import NaviKernels
+
+from Timer import Timer
+from HDF5Reader import HDF5Reader
+from NaviBaseClasses import ContourPlot
+from NaviAnimationClass import AnimatedSubplot, make_mp4
+from PlottingFuncs import animate_contour
+from SyntheticData import write_field_data, write_particle_data, write_chain_data, SPECIES
+
+
+BENCHMARKS = ('import', 'reader', 'diagnostics', 'kernels', 'animated_subplot', 'animate_contour', 'make_mp4')
+
+
+def init_argparse():
+    parser = argparse.ArgumentParser(usage='./%(prog)s [OPTIONS]', description='Benchmark TFNavi on synthetic data.')
+    parser.add_argument('-d', '--dims',      action='store', type=int, nargs=3, default=[64, 64, 128], help='Field grid node counts {nx ny nz}')
+    parser.add_argument('-p', '--particles', action='store', type=int, default=100000,                 help='Number of particles per frame')
+    parser.add_argument('-f', '--frames',    action='store', type=int, default=10,                     help='Number of frames per run')
+    parser.add_argument('-r', '--repeat',    action='store', type=int, default=3,                      help='Repetitions of each reader benchmark')
+    parser.add_argument('-o', '--output',    action='store', type=str, default='navi_benchmarks.json', help='JSON results file')
+    parser.add_argument('-w', '--workdir',   action='store', type=str, default=None,                   help='Directory for synthetic data. Default is a temporary directory')
+    parser.add_argument('--only',            action='store', type=str, nargs='+', choices=BENCHMARKS,  help='Only run the listed benchmarks')
+    parser.add_argument('--keep',            action='store_true',                                      help='Keep the synthetic data after running')
+
+    return parser
+
+
+def time_calls(name, func, calls, per=1, **params):
+    """
+    Times func() calls times with a Timer, one split per call.
+
+    Parameters:
+        name:   Benchmark name.
+        func:   Callable taking the call number.
+        calls:  Number of calls.
+        per:    Work items per call, e.g. frames. Per item times are split / per.
+        params: Extra values stored with the result.
+
+    Return:
+        Dict of the benchmark result.
+    """
+    timer = Timer(name)
+    for i in range(calls):
+        # Start each lap fresh so setup between calls is not timed, splits accumulate one per call
+        timer.update_time([time.process_time(), time.perf_counter()])
+        func(i)
+        timer.elapsed()
+
+    cpu = np.array([s[0] for s in timer.splits]) / per
+    wall = np.array([s[1] for s in timer.splits]) / per
+
+    result = {'name': name,
+              'params': params,
+              'calls': calls,
+              'items_per_call': per,
+              'cpu': cpu.tolist(),
+              'wall': wall.tolist(),
+              'cpu_mean': float(cpu.mean()),
+              'wall_mean': float(wall.mean()),
+              'wall_min': float(wall.min()),
+              'wall_max': float(wall.max())}
+
+    print(f'{name:<32.32s} {result["wall_mean"]:>12.6f} s/item  ({calls} x {per})')
+    return result
+
+
+def bench_import(repeat):
+    """
+    Times a reader-only import of TFNavi in fresh interpreters and checks it against IMPORT_BUDGET.
+    """
+    code = ('import sys, time; t = time.perf_counter(); import TFNavi; TFNavi.HDF5Reader; '
+            'print(time.perf_counter() - t, "matplotlib" in sys.modules)')
+    src_dir = os.path.dirname(os.path.realpath(__file__))
+
+    wall = []
+    loaded = False
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=src_dir, check=True)
+        seconds, mpl = out.stdout.split()
+        wall.append(float(seconds))
+        loaded = loaded or mpl == 'True'
+
+    result = {'name': 'import_reader_only',
+              'calls': repeat,
+              'wall': wall,
+              'wall_mean': float(np.mean(wall)),
+              'wall_min': float(np.min(wall)),
+              'budget': IMPORT_BUDGET,
+              'within_budget': bool(np.min(wall) <= IMPORT_BUDGET),
+              'matplotlib_loaded': loaded}
+
+    status = 'ok' if result['within_budget'] and not loaded else 'OVER BUDGET'
+    print(f'{"import_reader_only":<32.32s} {result["wall_min"]:>12.6f} s       (budget {IMPORT_BUDGET} s, {status})')
+    return [result]
+
+
+def bench_readers(paths, repeat):
+    results = []
+    for kind, path in paths.items():
+        nframes = HDF5Reader(path).nFrames
+        results.append(time_calls(f'reader_open_{kind}', lambda i: HDF5Reader(path), repeat, per=nframes,
+                                  path=os.path.basename(path)))
+
+    return results
+
+
+def bench_diagnostics(particle_path):
+    reader = HDF5Reader(particle_path)
+    spid = reader.frames[0].spid
+    index = {s[0]: np.flatnonzero(spid == s[0]) for s in SPECIES}
+
+    def run(i):
+        frame = reader.frames[i]
+        for ids in index.values():
+            Diagnostics.getTempDrift(frame.velocity[ids], frame.mass[ids[0]])
+
+    return [time_calls('getTempDrift', run, reader.nFrames, nparticles=int(spid.size), nspecies=len(index))]
+
+
+def kernel_inputs(dims, nparticles, seed=0):
+    """
+    Identical synthetic inputs for every kernel backend: velocities, positions spilling past the grid and grid axes.
+    """
+    rng = np.random.default_rng(seed)
+    origin = (-1.0, -1.0, -2.0)
+    dxdydz = tuple(2.0 * abs(o) / d for o, d in zip(origin, dims))
+    location = rng.uniform(1.1 * np.array(origin), -1.1 * np.array(origin), size=(nparticles, 3))
+    x = origin[0] + dxdydz[0] * np.arange(dims[0])
+    y = origin[1] + dxdydz[1] * np.arange(dims[1])
+
+    return {'velocity_moments': (rng.normal(0.0, 1e5, size=(nparticles, 3)),),
+            'cell_ids': (location, origin, dxdydz, dims),
+            'radius_mask': (x, y, 0.8, (0.0, 0.0))}
+
+
+def bench_kernels(dims, nparticles, repeat):
+    """
+    Times every NaviKernels kernel under each available backend on the same inputs. The first call of each backend
+    is timed on its own as warmup (JIT compile, or loading the on-disk cache) and results are checked against NumPy.
+    """
+    inputs = kernel_inputs(dims, nparticles)
+    active = NaviKernels.backend()
+    results = []
+
+    try:
+        NaviKernels.set_backend('numpy')
+        reference = {name: kernel(*inputs[name]) for name, kernel in NaviKernels.KERNELS.items()}
+
+        for backend in NaviKernels.available_backends():
+            NaviKernels.set_backend(backend)
+            for name, kernel in NaviKernels.KERNELS.items():
+                args = inputs[name]
+                warmup = time_calls(f'{name}_{backend}_warmup', lambda i: kernel(*args), 1, backend=backend)
+
+                out = kernel(*args)
+                expected = reference[name]
+                if name == 'velocity_moments':
+                    match = np.isclose(out[0], expected[0], rtol=1e-10) and np.allclose(out[1], expected[1], rtol=1e-10)
+                else:
+                    match = np.array_equal(out, expected)
+
+                result = time_calls(f'{name}_{backend}', lambda i: kernel(*args), repeat, backend=backend,
+                                    nparticles=nparticles, dims=list(dims))
+                result['warmup'] = warmup['wall_mean']
+                result['matches_numpy'] = bool(match)
+                if not match:
+                    print(f'{name} ({backend}) does not match the NumPy backend')
+                results.append(result)
+    finally:
+        NaviKernels.set_backend(active)
+
+    if 'numba' not in NaviKernels.available_backends():
+        print(f'{"kernels_numba":<32.32s} skipped, numba not installed')
+
+    return results
+
+
+def midplanes(field_path):
+    reader = HDF5Reader(field_path)
+    iz = reader.dims[2] // 2
+    return [frame.Bz[:, :, iz] for frame in reader.frames]
+
+
+def bench_animated_subplot(slices):
+    plot = ContourPlot(zdata=slices[0], title='Bz')
+    anim = AnimatedSubplot(plot, save=True)
+
+    def run(i):
+        plot.zdata = slices[i % len(slices)]
+        anim.update()
+
+    result = time_calls('AnimatedSubplot.update', run, len(slices), shape=list(slices[0].shape))
+
+    plt.close(anim.fig)
+    return [result]
+
+
+def bench_animate_contour(slices):
+    writer = 'ffmpeg' if shutil.which('ffmpeg') else 'pillow'
+    filename = 'bench_contour.mp4' if writer == 'ffmpeg' else 'bench_contour.gif'
+
+    def run(i):
+        animate_contour(zdata=slices, save=True, filename=filename, writer=writer)
+        plt.close('all')
+
+    return [time_calls('animate_contour', run, 1, per=len(slices), writer=writer, shape=list(slices[0].shape))]
+
+
+def bench_make_mp4(nframes):
+    if shutil.which('ffmpeg') is None:
+        print(f'{"make_mp4":<32.32s} skipped, ffmpeg not found')
+        return [{'name': 'make_mp4', 'skipped': 'ffmpeg not found'}]
+
+    def run(i):
+        if os.path.isfile('output.mp4'):
+            os.remove('output.mp4')
+        make_mp4()
+
+    return [time_calls('make_mp4', run, 1, per=nframes)]
+
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.realpath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(dims, nparticles, nframes, repeat, workdir, only=BENCHMARKS):
+    """
+    Generates the synthetic runs in workdir and runs the selected benchmarks.
+
+    Return:
+        List of benchmark result dicts.
+    """
+    workdir = os.path.abspath(workdir)
+    paths = {'field': write_field_data(os.path.join(workdir, 'bench_f'), dims=dims, nframes=nframes),
+             'particle': write_particle_data(os.path.join(workdir, 'bench_p'), nparticles=nparticles, nframes=nframes),
+             'chain': write_chain_data(os.path.join(workdir, 'bench_c'), dims=dims, nframes=nframes)}
+
+    results = []
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    os.makedirs('./outputs/images', exist_ok=True)
+
+    try:
+        with warnings.catch_warnings():
+            # Agg cannot show figures, AnimatedSubplot still asks it to
+            warnings.simplefilter('ignore', UserWarning)
+
+            if 'import' in only:
+                results += bench_import(repeat)
+            if 'reader' in only:
+                results += bench_readers(paths, repeat)
+            if 'diagnostics' in only:
+                results += bench_diagnostics(paths['particle'])
+            if 'kernels' in only:
+                results += bench_kernels(dims, nparticles, repeat)
+
+            if {'animated_subplot', 'animate_contour', 'make_mp4'} & set(only):
+                slices = midplanes(paths['field'])
+                if 'animated_subplot' in only or 'make_mp4' in only:
+                    results += bench_animated_subplot(slices)
+                if 'animate_contour' in only:
+                    results += bench_animate_contour(slices)
+                if 'make_mp4' in only:
+                    results += bench_make_mp4(nframes)
+    finally:
+        os.chdir(cwd)
+
+    return results
+
+
+def main():
+    args = init_argparse().parse_args()
+
+    workdir = args.workdir if args.workdir is not None else tempfile.mkdtemp(prefix='navi_bench_')
+    os.makedirs(workdir, exist_ok=True)
+
+    only = args.only if args.only else BENCHMARKS
+
+    try:
+        results = run_benchmarks(tuple(args.dims), args.particles, args.frames, args.repeat, workdir, only)
+    finally:
+        if not args.keep and args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+              'git_revision': git_revision(),
+              'python': sys.version.split()[0],
+              'platform': platform.platform(),
+              'versions': {'numpy': np.__version__, 'h5py': h5py.__version__, 'matplotlib': matplotlib.__version__,
+                           'numba': NaviKernels.backend_info()['numba']},
+              'kernels': NaviKernels.backend_info(),
+              'config': {'dims': args.dims, 'particles': args.particles, 'frames': args.frames, 'repeat': args.repeat},
+              'results': results}
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f'Results written to {args.output}.')
+
+
+if __name__ == '__main__':
+    main()
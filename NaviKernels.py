@@ -0,0 +1,211 @@
+"""
+Kernel layer for TFNavi's loop shaped hot paths: per particle velocity moments (getTempDrift), particle to cell
+binning (CellIndex) and radius masks (CylindricalRemap, quiver_plot.py).
+
+Every kernel has a NumPy implementation and, when Numba is installed, a parallel Numba implementation compiled with
+cache=True, so the JIT cost is paid once per machine and later sessions load the compiled kernel from __pycache__.
+Numba is only imported, and the backend chosen, on the first kernel call (or backend()/set_backend()/backend_info()):
+Numba if available unless the TFNAVI_KERNELS environment variable is 'numpy'.
+
+Usage:
+    import NaviKernels
+    print(NaviKernels.backend_info())
+    sum_v2, sum_v = NaviKernels.velocity_moments(frame.velocity[ids])
+    NaviKernels.set_backend('numpy')      # e.g. to compare against the fallback
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import os
+
+import numpy as np
+
+
+# Numba is imported and the kernels compiled on first use, so importing the readers never pays for it
+_numba = None
+_numba_checked = False
+_compiled = None
+_backend = None
+
+# Loop bodies below use prange, swapped for numba.prange before they are compiled
+prange = range
+
+
+def _import_numba():
+    """
+    Returns the numba module, importing it on the first call, or None if it is not installed.
+    """
+    global _numba, _numba_checked
+    if not _numba_checked:
+        try:
+            import numba
+        except ImportError:
+            numba = None
+        _numba = numba
+        _numba_checked = True
+    return _numba
+
+
+def _numba_kernels():
+    """
+    Compiles the Numba kernels on first use. cache=True loads them from __pycache__ after the first session.
+    """
+    global _compiled, prange
+    if _compiled is None:
+        numba = _import_numba()
+        prange = numba.prange
+        jit = numba.njit(parallel=True, cache=True)
+        _compiled = {'velocity_moments': jit(_velocity_moments_loop),
+                     'cell_ids': jit(_cell_ids_loop),
+                     'radius_mask': jit(_radius_mask_loop)}
+    return _compiled
+
+
+def available_backends():
+    """ Backends usable here, importing numba to find out. """
+    return ('numba', 'numpy') if _import_numba() is not None else ('numpy',)
+
+
+def backend():
+    """
+    Returns the active backend, choosing it on the first call: Numba if installed, unless TFNAVI_KERNELS=numpy.
+    """
+    global _backend
+    if _backend is None:
+        forced = os.environ.get('TFNAVI_KERNELS', '').lower() == 'numpy'
+        _backend = 'numba' if not forced and _import_numba() is not None else 'numpy'
+    return _backend
+
+
+def set_backend(name):
+    """
+    Selects 'numba' or 'numpy' for every kernel.
+    """
+    global _backend
+    if name not in available_backends():
+        raise Exception(f'NaviKernels.set_backend(): Backend "{name}" is not available. '
+                        f'Available: {available_backends()}.')
+    _backend = name
+
+
+def backend_info():
+    """
+    Returns a dict with the active backend, the available ones and the Numba version and thread count.
+    """
+    numba = _import_numba()
+    return {'backend': backend(),
+            'available': list(available_backends()),
+            'numba': None if numba is None else numba.__version__,
+            'threads': None if numba is None else numba.get_num_threads()}
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Velocity moments
+
+
+def _velocity_moments_numpy(vel):
+    return float(np.einsum('ij,ij->', vel, vel)), vel.sum(axis=0)
+
+
+def _velocity_moments_loop(vel):
+    sum_v2 = 0.0
+    sum_x = 0.0
+    sum_y = 0.0
+    sum_z = 0.0
+    for p in prange(vel.shape[0]):
+        vx = vel[p, 0]
+        vy = vel[p, 1]
+        vz = vel[p, 2]
+        sum_v2 += vx * vx + vy * vy + vz * vz
+        sum_x += vx
+        sum_y += vy
+        sum_z += vz
+    return sum_v2, np.array([sum_x, sum_y, sum_z])
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Particle to cell binning
+
+
+def _cell_ids_numpy(location, origin, dxdydz, dims):
+    f = (location - np.asarray(origin)) / np.asarray(dxdydz)
+    # Float comparisons so NaN positions also land outside
+    inside = np.all((f >= 0) & (f < np.asarray(dims)), axis=1)
+    ijk = np.where(inside[:, None], f, 0).astype(np.int64)
+    cells = ijk[:, 0] + dims[0] * (ijk[:, 1] + dims[1] * ijk[:, 2])
+    return np.where(inside, cells, dims[0] * dims[1] * dims[2])
+
+
+def _cell_ids_loop(location, ox, oy, oz, dx, dy, dz, nx, ny, nz, out):
+    outside = nx * ny * nz
+    for p in prange(location.shape[0]):
+        fx = (location[p, 0] - ox) / dx
+        fy = (location[p, 1] - oy) / dy
+        fz = (location[p, 2] - oz) / dz
+        if 0.0 <= fx < nx and 0.0 <= fy < ny and 0.0 <= fz < nz:
+            out[p] = int(fx) + nx * (int(fy) + ny * int(fz))
+        else:
+            out[p] = outside
+    return out
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Radius masks
+
+
+def _radius_mask_numpy(x, y, rmax, cx, cy):
+    return (x[:, None] - cx) ** 2 + (y[None, :] - cy) ** 2 < rmax ** 2
+
+
+def _radius_mask_loop(x, y, rmax, cx, cy, out):
+    r2 = rmax * rmax
+    for i in prange(x.shape[0]):
+        dx2 = (x[i] - cx) * (x[i] - cx)
+        for j in range(y.shape[0]):
+            out[i, j] = dx2 + (y[j] - cy) * (y[j] - cy) < r2
+    return out
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# Public kernels
+
+
+def velocity_moments(vel):
+    """
+    Returns (sum of |v|^2, (3,) sum of v) over an (n, 3) velocity array.
+    """
+    vel = np.ascontiguousarray(vel, dtype=np.float64)
+    if backend() == 'numba':
+        sum_v2, sum_v = _numba_kernels()['velocity_moments'](vel)
+        return float(sum_v2), sum_v
+    return _velocity_moments_numpy(vel)
+
+
+def cell_ids(location, origin, dxdydz, dims):
+    """
+    Linear cell id (x fastest) of every (n, 3) position on the grid, or nx * ny * nz for positions outside it.
+    """
+    location = np.ascontiguousarray(location, dtype=np.float64)
+    dims = tuple(int(d) for d in dims)
+    if backend() == 'numba':
+        out = np.empty(len(location), dtype=np.int64)
+        kernel = _numba_kernels()['cell_ids']
+        return kernel(location, *(float(o) for o in origin), *(float(d) for d in dxdydz), *dims, out)
+    return _cell_ids_numpy(location, origin, dxdydz, dims)
+
+
+def radius_mask(x, y, rmax, center=(0.0, 0.0)):
+    """
+    (nx, ny) mask of the points of the x, y coordinate grid within rmax of center.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    if backend() == 'numba':
+        out = np.empty((len(x), len(y)), dtype=np.bool_)
+        return _numba_kernels()['radius_mask'](x, y, float(rmax), float(center[0]), float(center[1]), out)
+    return _radius_mask_numpy(x, y, rmax, center[0], center[1])
+
+
+KERNELS = {'velocity_moments': velocity_moments,
+           'cell_ids': cell_ids,
+           'radius_mask': radius_mask}
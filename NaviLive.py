@@ -0,0 +1,369 @@
+"""
+Live dashboard for a running TFLink simulation.
+
+Follows a growing HDF5Reader output, decodes every new frame exactly once and pushes a downsampled
+y midplane of each component plus scalar diagnostics to every connected browser over HTTP
+server-sent events. Only the standard library is used for serving, so nothing beyond the reader's
+own dependencies needs to be installed on the compute node.
+
+Usage:
+    python NaviLive.py run/pFRC_f.hdf5 --port 8765 --factor 4
+    then open http://localhost:8765 (or forward the port with ssh -L 8765:localhost:8765 node)
+
+Endpoints:
+    /        Dashboard page.
+    /events  Server-sent event stream. Sends a "history" event on connect and a "frame" event per new frame.
+    /latest  Most recent frame payload as JSON.
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+
+import numpy as np
+
+from HDF5Reader import HDF5Reader
+from FieldPyramid import block_average
+import Diagnostics
+
+
+def init_argparse():
+    parser = argparse.ArgumentParser(usage='./%(prog)s [OPTIONS] PATH', description='Serve a live dashboard of a running TFLink output.')
+    parser.add_argument('Path',             metavar='path', type=str,                        help='Path to the hdf5/xdmf file being written')
+    parser.add_argument('--host',           action='store', type=str,   default='127.0.0.1', help='Interface to listen on. Default is localhost only')
+    parser.add_argument('-p', '--port',     action='store', type=int,   default=8765,        help='Port to listen on')
+    parser.add_argument('-s', '--sleep',    action='store', type=float, default=1.0,         help='How often to check for new frames in seconds')
+    parser.add_argument('-f', '--factor',   action='store', type=int,   default=2,           help='Block average factor applied to the midplane slices')
+    parser.add_argument('-c', '--components', action='store', type=str, nargs='+', default=None, help='Components to stream. Default is every component')
+
+    return parser
+
+
+def encode_slice(arr):
+    """
+    Packs a 2D slice as base64 little endian float32, which a browser decodes with a Float32Array.
+    """
+    arr = np.ascontiguousarray(arr, dtype='<f4')
+    return {'shape': arr.shape,
+            'min': float(np.min(arr)),
+            'max': float(np.max(arr)),
+            'data': base64.b64encode(arr.tobytes()).decode('ascii')}
+
+
+def frame_scalars(frame, reader):
+    """
+    Scalar diagnostics of one frame as {name: value}.
+    """
+    if reader.file_type == 'f':
+        w_e, w_b = Diagnostics.getFieldEnergy(frame, reader.dxdydz)
+        return {'W_E': w_e, 'W_B': w_b}
+
+    if reader.file_type == 'c':
+        return dict(zip(frame.components, Diagnostics.getChainMeans(frame).tolist()))
+
+    species = np.unique(frame.spid[:frame.particles_active])
+    temps = Diagnostics.getSpeciesTemperatures(frame, species)
+    return {f'T_spid{int(s)}': float(t) for s, t in zip(species, temps[:, 0])}
+
+
+def summarize_frame(frame, reader, factor=2, components=None):
+    """
+    Builds the JSON payload sent to clients for one frame: block averaged y midplanes (x vs z, as in FilePlot)
+    of field/chaining components and the frame's scalar diagnostics. Particle frames only carry scalars.
+    """
+    slices = {}
+    if reader.file_type != 'p':
+        for c in components or frame.components:
+            arr = getattr(frame, c)
+            plane = arr[:, arr.shape[1] // 2, :]
+            slices[c] = encode_slice(block_average(plane, factor))
+
+    return {'frame_num': frame.frame_num,
+            'time': frame.time,
+            'scalars': frame_scalars(frame, reader),
+            'slices': slices}
+
+
+class FrameTail:
+    """
+    Follows an HDF5Reader output that the simulation is still appending frames to.
+
+    Methods:
+        __init__(self, path_to_file, max_failures=60)
+        poll(self)
+
+    Parameters:
+        path_to_file: Path to hdf5/xdmf file.
+        max_failures: Consecutive failed polls before the error is raised instead of retried. A file caught mid
+                      write reads fine on a later poll, one that keeps failing is broken.
+    """
+    def __init__(self, path_to_file, max_failures=60):
+        self.path = path_to_file
+        self.reader = None
+        self.visited = 0
+        self.max_failures = max_failures
+        self.failures = 0
+
+    def poll(self):
+        """
+        Picks up frames appended since the last poll and returns them, each decoded once.
+        A file caught mid write is skipped until the next poll.
+        """
+        new = []
+        try:
+            if self.reader is None:
+                prefix = os.path.splitext(self.path)[0]
+                if not (os.path.isfile(prefix + '.hdf5') and os.path.isfile(prefix + '.xdmf')):
+                    # Simulation has not written its first frame yet
+                    return new
+                self.reader = HDF5Reader(self.path, load_frames=False, swmr=True)
+            else:
+                # Only reads the XDMF tail and the HDF5 frame list, frames need both their group and time
+                self.reader.refresh()
+
+            for i in range(self.visited, self.reader.nFrames):
+                new.append(self.reader.read_frame(i))
+                self.visited = i + 1
+
+            self.failures = 0
+
+        # ET.ParseError (a SyntaxError) for a half written XDMF, OSError/KeyError for a half written HDF5
+        except (OSError, KeyError, IndexError, SyntaxError) as e:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                raise Exception(f'FrameTail.poll(): "{self.path}" failed {self.failures} polls in a row.') from e
+            if self.failures == 1:
+                print(f'FrameTail.poll(): Could not read "{self.path}", retrying. {type(e).__name__}: {e}')
+
+        return new
+
+
+class LiveServer:
+    """
+    asyncio server broadcasting new frames of one output to any number of browsers.
+    A single producer task reads each frame once and encodes its payload once; clients only receive copies.
+
+    Methods:
+        __init__(self, path_to_file, host='127.0.0.1', port=8765, sleep=1.0, factor=2, components=None, queue_size=4)
+        run(self)
+        serve(self)
+
+    Parameters:
+        path_to_file: Path to the hdf5/xdmf file being written.
+        host, port:   Address to listen on. Default is localhost only.
+        sleep:        Seconds between checks for new frames.
+        factor:       Block average factor for the midplane slices.
+        components:   Components to stream. Default is every component of the file type.
+        queue_size:   Frames buffered per client. A client that falls further behind skips to the newest frames.
+    """
+    def __init__(self, path_to_file, host='127.0.0.1', port=8765, sleep=1.0, factor=2, components=None, queue_size=4):
+        self.tail = FrameTail(path_to_file)
+        self.host = host
+        self.port = port
+        self.sleep = sleep
+        self.factor = factor
+        self.components = components
+        self.queue_size = queue_size
+
+        self.clients = set()
+        self.latest = None
+        self.history = []
+        self.frames_read = 0
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        print(f'Serving {self.tail.path} on http://{self.host}:{self.port}')
+
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.produce())
+
+    async def produce(self):
+        while True:
+            # Reading and decoding block, keep them off the event loop
+            payloads = await asyncio.to_thread(self._read_new)
+            for payload in payloads:
+                self.broadcast(payload)
+            await asyncio.sleep(self.sleep)
+
+    def _read_new(self):
+        payloads = []
+        for frame in self.tail.poll():
+            summary = summarize_frame(frame, self.tail.reader, self.factor, self.components)
+            self.frames_read += 1
+            payloads.append((summary, json.dumps(summary)))
+        return payloads
+
+    def broadcast(self, payload):
+        summary, message = payload
+        self.latest = message
+        self.history.append({'frame_num': summary['frame_num'], 'time': summary['time'], 'scalars': summary['scalars']})
+
+        for queue in self.clients:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def handle_client(self, reader, writer):
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+            path = request.split(b' ', 2)[1].decode() if request.count(b' ') >= 2 else '/'
+
+            if path == '/events':
+                await self.stream_events(writer)
+            elif path == '/latest':
+                await self.respond(writer, 'application/json', (self.latest or 'null').encode())
+            elif path == '/':
+                await self.respond(writer, 'text/html; charset=utf-8', DASHBOARD_HTML.encode())
+            else:
+                await self.respond(writer, 'text/plain', b'Not found', status='404 Not Found')
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def respond(writer, content_type, body, status='200 OK'):
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n'
+                     f'Connection: close\r\n\r\n'.encode() + body)
+        await writer.drain()
+
+    async def stream_events(self, writer):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+                     b'Connection: keep-alive\r\n\r\n')
+        history = json.dumps({'file_type': self.tail.reader.file_type if self.tail.reader else None,
+                              'history': self.history})
+        writer.write(f'event: history\ndata: {history}\n\n'.encode())
+        if self.latest is not None:
+            writer.write(f'event: frame\ndata: {self.latest}\n\n'.encode())
+        await writer.drain()
+
+        self.clients.add(queue)
+        try:
+            while True:
+                message = await queue.get()
+                writer.write(f'event: frame\ndata: {message}\n\n'.encode())
+                await writer.drain()
+        finally:
+            self.clients.discard(queue)
+
+
+DASHBOARD_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>TFNavi Live</title>
+<style>
+  body { font-family: sans-serif; margin: 1em; }
+  #slices { display: flex; flex-wrap: wrap; }
+  .panel { margin: 0.5em; }
+  canvas { image-rendering: pixelated; width: 320px; border: 1px solid #888; }
+  table { border-collapse: collapse; }
+  td, th { padding: 0.2em 0.8em; text-align: right; }
+</style>
+</head>
+<body>
+<h2 id="title">Waiting for frames...</h2>
+<table id="scalars"></table>
+<div id="slices"></div>
+<script>
+// Approximation of cm_hot_desaturated
+const stops = [[0, [71, 71, 219]], [0.143, [0, 0, 91]], [0.285, [0, 255, 255]], [0.429, [0, 127, 0]],
+               [0.571, [255, 255, 0]], [0.714, [255, 96, 0]], [0.857, [107, 0, 0]], [1, [224, 76, 76]]];
+
+function color(v) {
+  for (let k = 1; k < stops.length; k++) {
+    if (v <= stops[k][0]) {
+      const [a, ca] = stops[k - 1], [b, cb] = stops[k];
+      const t = (v - a) / (b - a);
+      return ca.map((c, i) => c + t * (cb[i] - c));
+    }
+  }
+  return stops[stops.length - 1][1];
+}
+
+function draw(name, s) {
+  let canvas = document.getElementById('c_' + name);
+  if (!canvas) {
+    const div = document.createElement('div');
+    div.className = 'panel';
+    div.innerHTML = '<div>' + name + ' <span id="r_' + name + '"></span></div><canvas id="c_' + name + '"></canvas>';
+    document.getElementById('slices').appendChild(div);
+    canvas = document.getElementById('c_' + name);
+  }
+  // Slice is (nx, nz) x major, draw z across and x up as in FilePlot
+  const [nx, nz] = s.shape;
+  const bytes = Uint8Array.from(atob(s.data), c => c.charCodeAt(0));
+  const data = new Float32Array(bytes.buffer);
+  canvas.width = nz; canvas.height = nx;
+  const ctx = canvas.getContext('2d');
+  const img = ctx.createImageData(nz, nx);
+  const span = (s.max - s.min) || 1;
+  for (let i = 0; i < nx; i++) {
+    for (let k = 0; k < nz; k++) {
+      const rgb = color((data[i * nz + k] - s.min) / span);
+      const p = 4 * ((nx - 1 - i) * nz + k);
+      img.data[p] = rgb[0]; img.data[p + 1] = rgb[1]; img.data[p + 2] = rgb[2]; img.data[p + 3] = 255;
+    }
+  }
+  ctx.putImageData(img, 0, 0);
+  document.getElementById('r_' + name).textContent = '[' + s.min.toExponential(2) + ', ' + s.max.toExponential(2) + ']';
+}
+
+const history = [];
+
+function showScalars() {
+  const rows = history.slice(-10);
+  if (!rows.length) return;
+  const names = Object.keys(rows[0].scalars);
+  let html = '<tr><th>frame</th><th>t (ns)</th>' + names.map(n => '<th>' + n + '</th>').join('') + '</tr>';
+  for (const r of rows) {
+    html += '<tr><td>' + r.frame_num + '</td><td>' + (1e9 * r.time).toFixed(4) + '</td>' +
+            names.map(n => '<td>' + Number(r.scalars[n]).toExponential(4) + '</td>').join('') + '</tr>';
+  }
+  document.getElementById('scalars').innerHTML = html;
+}
+
+const events = new EventSource('/events');
+events.addEventListener('history', e => {
+  history.length = 0;
+  history.push(...JSON.parse(e.data).history);
+  showScalars();
+});
+events.addEventListener('frame', e => {
+  const f = JSON.parse(e.data);
+  if (!history.length || history[history.length - 1].frame_num !== f.frame_num) {
+    history.push({frame_num: f.frame_num, time: f.time, scalars: f.scalars});
+  }
+  document.getElementById('title').textContent = 'Frame ' + f.frame_num + ', ' + (1e9 * f.time).toFixed(4) + ' ns';
+  for (const name in f.slices) draw(name, f.slices[name]);
+  showScalars();
+});
+</script>
+</body>
+</html>
+"""
+
+
+def main():
+    args = init_argparse().parse_args()
+
+    server = LiveServer(args.Path, host=args.host, port=args.port, sleep=args.sleep,
+                        factor=args.factor, components=args.components)
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
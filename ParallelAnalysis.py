@@ -0,0 +1,322 @@
+"""
+Frame- and subdomain-parallel analysis of HDF5Reader outputs.
+
+Every rank opens its own HDF5 handle and reads only its share: whole frames with map_frames(),
+or a slab of z planes of every frame with map_subdomains(). Results are reduced back to rank 0.
+Runs under MPI when mpi4py is installed and the job was started with mpiexec, otherwise
+run_local() stands in with one multiprocessing process per rank.
+
+Usage:
+    mpiexec -n 8 python ParallelAnalysis.py run/pFRC_f.hdf5 field_energy --mode subdomains
+    python ParallelAnalysis.py run/pFRC_f.hdf5 field_energy --ranks 4
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import argparse
+import multiprocessing
+import queue
+import traceback
+
+import numpy as np
+
+from HDF5Reader import HDF5Reader
+from RunCollection import REDUCERS
+
+try:
+    from mpi4py import MPI
+except ImportError:
+    MPI = None
+
+
+class SerialComm:
+    """
+    Single rank communicator used when neither MPI nor run_local() is in charge.
+    """
+    rank = 0
+    size = 1
+
+    def gather(self, obj, root=0):
+        return [obj]
+
+    def bcast(self, obj, root=0):
+        return obj
+
+    def barrier(self):
+        pass
+
+
+class MPIComm:
+    """
+    Thin wrapper over an mpi4py communicator exposing the same methods as SerialComm.
+    """
+    def __init__(self, comm=None):
+        self.comm = MPI.COMM_WORLD if comm is None else comm
+        self.rank = self.comm.Get_rank()
+        self.size = self.comm.Get_size()
+
+    def gather(self, obj, root=0):
+        return self.comm.gather(obj, root=root)
+
+    def bcast(self, obj, root=0):
+        return self.comm.bcast(obj, root=root)
+
+    def barrier(self):
+        self.comm.Barrier()
+
+
+class QueueComm:
+    """
+    multiprocessing stand-in for MPI on one machine. Collectives are rooted at rank 0.
+    """
+    def __init__(self, rank, size, inboxes):
+        self.rank = rank
+        self.size = size
+        self.inboxes = inboxes
+        self.seq = 0
+        self.pending = {}
+
+    def _recv(self, seq, src):
+        # Messages from a later collective can overtake this one, park them until asked for
+        while (seq, src) not in self.pending:
+            msg_seq, msg_src, obj = self.inboxes[self.rank].get()
+            self.pending[(msg_seq, msg_src)] = obj
+        return self.pending.pop((seq, src))
+
+    def gather(self, obj, root=0):
+        if root != 0:
+            raise Exception('QueueComm.gather(): Only root=0 is supported.')
+
+        self.seq += 1
+        if self.rank != 0:
+            self.inboxes[0].put((self.seq, self.rank, obj))
+            return None
+
+        return [obj] + [self._recv(self.seq, src) for src in range(1, self.size)]
+
+    def bcast(self, obj, root=0):
+        if root != 0:
+            raise Exception('QueueComm.bcast(): Only root=0 is supported.')
+
+        self.seq += 1
+        if self.rank == 0:
+            for dst in range(1, self.size):
+                self.inboxes[dst].put((self.seq, 0, obj))
+            return obj
+
+        return self._recv(self.seq, 0)
+
+    def barrier(self):
+        self.bcast(self.gather(None))
+
+
+def get_comm():
+    """
+    Returns an MPIComm when running under mpiexec with more than one rank, else a SerialComm.
+    """
+    if MPI is not None and MPI.COMM_WORLD.Get_size() > 1:
+        return MPIComm()
+    return SerialComm()
+
+
+def _local_rank(target, rank, size, inboxes, result, args, kwargs):
+    comm = QueueComm(rank, size, inboxes)
+    try:
+        out = target(comm, *args, **kwargs)
+    except Exception:
+        # Report failures from any rank, otherwise rank 0 would wait forever in a collective
+        result.put((rank, False, traceback.format_exc()))
+        return
+
+    if rank == 0:
+        result.put((rank, True, out))
+
+
+# Seconds run_local() waits on the result queue between checks for dead ranks
+POLL_SECONDS = 1.0
+
+
+def run_local(target, nranks, *args, **kwargs):
+    """
+    Runs target(comm, *args, **kwargs) on nranks local processes and returns rank 0's result.
+    target must be a module level function. Raises if a rank dies without reporting, e.g. killed by a signal.
+    """
+    ctx = multiprocessing.get_context()
+    inboxes = [ctx.Queue() for _ in range(nranks)]
+    result = ctx.Queue()
+
+    procs = [ctx.Process(target=_local_rank, args=(target, rank, nranks, inboxes, result, args, kwargs))
+             for rank in range(nranks)]
+    for p in procs:
+        p.start()
+
+    while True:
+        try:
+            rank, ok, out = result.get(timeout=POLL_SECONDS)
+            break
+        except queue.Empty:
+            # A rank killed by a signal never reports, so check for dead ranks instead of waiting forever
+            dead = [(r, p.exitcode) for r, p in enumerate(procs) if p.exitcode not in (None, 0)]
+            if dead or procs[0].exitcode == 0:
+                # A result put just after the timeout, before the exit was seen, still counts
+                try:
+                    rank, ok, out = result.get_nowait()
+                    break
+                except queue.Empty:
+                    pass
+
+                for p in procs:
+                    p.terminate()
+                rank, code = dead[0] if dead else (0, 0)
+                raise Exception(f'run_local(): Rank {rank} exited with code {code} without reporting a result.')
+
+    if not ok:
+        for p in procs:
+            p.terminate()
+        raise Exception(f'run_local(): Rank {rank} failed.\n{out}')
+
+    for p in procs:
+        p.join()
+
+    return out
+
+
+def split_range(n, rank, size):
+    """
+    Contiguous block of range(n) owned by rank.
+    """
+    bounds = np.linspace(0, n, size + 1).astype(int)
+    return bounds[rank], bounds[rank + 1]
+
+
+REDUCE_OPS = {'sum': np.sum, 'max': np.max, 'min': np.min}
+
+# How slab results of each REDUCERS entry combine into the whole-domain value
+SUBDOMAIN_OPS = {'field_energy': 'sum', 'chain_mean': 'mean'}
+
+
+class ParallelReader:
+    """
+    Rank-local view of an HDF5Reader output for frame- or subdomain-parallel analysis.
+
+    Methods:
+        __init__(self, path_to_file, comm=None)
+        my_frames(self)
+        my_zrange(self)
+        map_frames(self, func, **kwargs)
+        map_subdomains(self, func, op='sum', **kwargs)
+
+    Parameters:
+        path_to_file: Path to hdf5/xdmf file. Every rank opens it independently.
+        comm:         Communicator. Default is get_comm().
+    """
+    def __init__(self, path_to_file, comm=None):
+        self.comm = get_comm() if comm is None else comm
+        self.reader = HDF5Reader(path_to_file, load_frames=False)
+
+    def my_frames(self):
+        start, stop = split_range(self.reader.nFrames, self.comm.rank, self.comm.size)
+        return range(start, stop)
+
+    def my_zrange(self):
+        return split_range(self.reader.dims[2], self.comm.rank, self.comm.size)
+
+    def map_frames(self, func, **kwargs):
+        """
+        Applies func(frame, reader, **kwargs) to this rank's frames and gathers the results in frame order.
+
+        Return:
+            On rank 0 an array shaped (nFrames, ...). None on other ranks.
+        """
+        local = [(i, func(self.reader.read_frame(i), self.reader, **kwargs)) for i in self.my_frames()]
+        gathered = self.comm.gather(local)
+
+        if gathered is None:
+            return None
+
+        ordered = sorted((item for part in gathered for item in part), key=lambda item: item[0])
+        return np.asarray([value for _, value in ordered])
+
+    def map_subdomains(self, func, op='sum', **kwargs):
+        """
+        Applies func(slab_frame, reader, **kwargs) to this rank's z slab of every frame and reduces the
+        partial results across ranks with op: 'sum', 'max', 'min', or 'mean' for volume averages (weighted by slab size).
+
+        Return:
+            On rank 0 an array shaped (nFrames, ...). None on other ranks.
+        """
+        if self.reader.file_type == 'p':
+            raise Exception('ParallelReader.map_subdomains(): Particle data has no grid to split, use map_frames().')
+
+        z0, z1 = self.my_zrange()
+        if z1 > z0:
+            local = np.asarray([func(self.reader.read_frame(i, zrange=(z0, z1)), self.reader, **kwargs)
+                                for i in range(self.reader.nFrames)])
+        else:
+            # More ranks than z planes
+            local = None
+
+        gathered = self.comm.gather((z1 - z0, local))
+        if gathered is None:
+            return None
+
+        weights = np.array([w for w, part in gathered if part is not None], dtype=float)
+        parts = np.stack([part for _, part in gathered if part is not None])
+
+        if op == 'mean':
+            weights = weights.reshape((-1,) + (1,) * (parts.ndim - 1))
+            return np.sum(parts * weights, axis=0) / weights.sum()
+
+        return REDUCE_OPS[op](parts, axis=0)
+
+
+def analyse(comm, path, reducer, mode='frames', op=None, **kwargs):
+    """
+    Runs one REDUCERS entry over a file in parallel. Module level so run_local() can start it on every rank.
+    """
+    preader = ParallelReader(path, comm)
+    func = REDUCERS[reducer]
+
+    if mode == 'frames':
+        values = preader.map_frames(func, **kwargs)
+    else:
+        if op is None:
+            op = SUBDOMAIN_OPS.get(reducer, 'sum')
+        values = preader.map_subdomains(func, op=op, **kwargs)
+
+    if values is None:
+        return None
+    return np.asarray(preader.reader.times), values
+
+
+def init_argparse():
+    parser = argparse.ArgumentParser(usage='./%(prog)s [OPTIONS] PATH REDUCER', description='Frame or subdomain parallel TFNavi analysis.')
+    parser.add_argument('Path',          metavar='path',    type=str,                                     help='Path to hdf5/xdmf file')
+    parser.add_argument('Reducer',       metavar='reducer', type=str, choices=sorted(REDUCERS),           help='Diagnostic to compute')
+    parser.add_argument('-m', '--mode',  action='store',    type=str, default='frames', choices=['frames', 'subdomains'], help='Split frames or z slabs across ranks')
+    parser.add_argument('-n', '--ranks', action='store',    type=int, default=2,                          help='Local processes when not started by mpiexec')
+    parser.add_argument('-o', '--output', action='store',   type=str, default=None,                       help='Save times and values to this .npz file')
+
+    return parser
+
+
+def main():
+    args = init_argparse().parse_args()
+
+    comm = get_comm()
+    if comm.size > 1:
+        out = analyse(comm, args.Path, args.Reducer, args.mode)
+    else:
+        out = run_local(analyse, args.ranks, args.Path, args.Reducer, args.mode)
+
+    if out is None:
+        return
+
+    times, values = out
+    print(f'{args.Reducer}: {values.shape[0]} frames, values shape {values.shape[1:]}')
+    if args.output is not None:
+        np.savez(args.output, times=times, values=values)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Cell binned spatial index of particle locations on a field grid.
+
+Particles are counting sorted by the grid cell they sit in, so each cell's particles are one contiguous
+run of the sort order. Region queries only visit the cells overlapping the region and test the particles
+in them, so their cost follows the size of the selection rather than the number of particles.
+
+Usage:
+    field = HDF5Reader('pFRC_f.hdf5', load_frames=False)
+    frame = HDF5Reader('pFRC_p.hdf5', load_frames=False).read_frame(40)
+    index = frame.spatial_index(field)
+    rows = index.cylinder(0.045, zlim=(-0.01, 0.01), spid=1)
+    carbon_v = frame.velocity[rows]
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import numpy as np
+
+from NaviKernels import cell_ids
+from Timer import profiled
+
+
+def grid_geometry(grid):
+    """
+    Returns (origin, dxdydz, dims) of a field/chaining HDF5Reader or of an (origin, dxdydz, dims) tuple.
+    """
+    if hasattr(grid, 'dxdydz'):
+        return tuple(grid.origin), tuple(grid.dxdydz), tuple(grid.dims)
+    origin, dxdydz, dims = grid
+    return tuple(origin), tuple(dxdydz), tuple(dims)
+
+
+def _concat_ranges(starts, stops):
+    """
+    Concatenation of range(start, stop) over every pair, without a Python loop.
+    """
+    lengths = stops - starts
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    ends = np.cumsum(lengths)
+    steps = np.ones(ends[-1], dtype=np.int64)
+    steps[0] = starts[0]
+    steps[ends[:-1]] = starts[1:] - (starts[:-1] + lengths[:-1] - 1)
+    return np.cumsum(steps)
+
+
+class CellIndex:
+    """
+    Particles of one frame counting sorted by grid cell.
+
+    Methods:
+        __init__(self, location, grid, spid=None)
+        cell_rows(self, ix, iy, iz)
+        iter_cells(self)
+        box(self, lo, hi, spid=None)
+        cylinder(self, radius, zlim=None, center=(0.0, 0.0), spid=None)
+        sphere(self, center, radius, spid=None)
+        counts(self)
+
+    Parameters:
+        location: (n, 3) active particle positions.
+        grid:     Field HDF5Reader or (origin, dxdydz, dims) tuple. Cells span [origin + i dx, origin + (i + 1) dx).
+                  Queries only see particles inside the grid.
+        spid:     Optional (n,) species ids, used by the spid= filter of the queries.
+
+    Attributes:
+        order:   Particle rows sorted by cell.
+        offsets: order[offsets[c]:offsets[c + 1]] are the rows in linear cell c (x fastest). The last bin holds
+                 particles outside the grid.
+    """
+    @profiled('CellIndex.build')
+    def __init__(self, location, grid, spid=None):
+        self.origin, self.dxdydz, self.dims = grid_geometry(grid)
+        self.location = location
+        self.spid = spid
+
+        self.ncells = int(np.prod(self.dims))
+        cells = self.cell_of(location)
+
+        # Counting sort: cell sizes give the offsets, a stable sort on cell ids gives the order within them
+        counts = np.bincount(cells, minlength=self.ncells + 1)
+        self.offsets = np.zeros(self.ncells + 2, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.order = np.argsort(cells, kind='stable')
+
+    def cell_of(self, location):
+        """
+        Linear cell id (x fastest) of every position, or ncells for positions outside the grid.
+        """
+        return cell_ids(location, self.origin, self.dxdydz, self.dims)
+
+    def counts(self):
+        """ (nx, ny, nz) particle count per cell. """
+        return np.diff(self.offsets[:-1]).reshape(self.dims[::-1]).T
+
+    def cell_rows(self, ix, iy, iz):
+        c = ix + self.dims[0] * (iy + self.dims[1] * iz)
+        return self.order[self.offsets[c]:self.offsets[c + 1]]
+
+    def iter_cells(self):
+        """
+        Yields ((ix, iy, iz), rows) for every non-empty cell.
+        """
+        nx, ny = self.dims[0], self.dims[1]
+        for c in np.flatnonzero(np.diff(self.offsets[:-1])):
+            yield (c % nx, c // nx % ny, c // (nx * ny)), self.order[self.offsets[c]:self.offsets[c + 1]]
+
+    def _candidates(self, lo, hi):
+        """
+        Rows of every particle in the cells overlapping the box [lo, hi].
+        """
+        top = np.array(self.dims) - 1
+        f0 = np.floor((np.asarray(lo, dtype=float) - self.origin) / self.dxdydz)
+        f1 = np.floor((np.asarray(hi, dtype=float) - self.origin) / self.dxdydz)
+        if np.any(f1 < 0) or np.any(f0 > top) or np.any(f1 < f0):
+            return np.zeros(0, dtype=np.int64)
+        i0 = np.clip(f0, 0, top).astype(np.int64)
+        i1 = np.clip(f1, 0, top).astype(np.int64)
+
+        # Cells ix0..ix1 of one (iy, iz) row are contiguous in the sort order
+        iy, iz = np.meshgrid(np.arange(i0[1], i1[1] + 1), np.arange(i0[2], i1[2] + 1), indexing='ij')
+        row_start = self.dims[0] * (iy.ravel() + self.dims[1] * iz.ravel())
+        return self.order[_concat_ranges(self.offsets[row_start + i0[0]], self.offsets[row_start + i1[0] + 1])]
+
+    def _filter(self, rows, keep, spid):
+        rows = rows[keep]
+        if spid is not None:
+            rows = rows[self.spid[rows] == spid]
+        return np.sort(rows)
+
+    @profiled('CellIndex.query')
+    def box(self, lo, hi, spid=None):
+        """
+        Sorted rows of the particles with lo <= location <= hi, optionally only of species spid.
+        """
+        rows = self._candidates(lo, hi)
+        loc = self.location[rows]
+        return self._filter(rows, np.all((loc >= lo) & (loc <= hi), axis=1), spid)
+
+    @profiled('CellIndex.query')
+    def cylinder(self, radius, zlim=None, center=(0.0, 0.0), spid=None):
+        """
+        Sorted rows of the particles within radius of the z axis through center (x, y), optionally only within
+        zlim=(z0, z1) and of species spid.
+        """
+        z0, z1 = zlim if zlim is not None else (-np.inf, np.inf)
+        rows = self._candidates((center[0] - radius, center[1] - radius, z0), (center[0] + radius, center[1] + radius, z1))
+        loc = self.location[rows]
+        r2 = (loc[:, 0] - center[0]) ** 2 + (loc[:, 1] - center[1]) ** 2
+        return self._filter(rows, (r2 < radius ** 2) & (loc[:, 2] >= z0) & (loc[:, 2] <= z1), spid)
+
+    @profiled('CellIndex.query')
+    def sphere(self, center, radius, spid=None):
+        """
+        Sorted rows of the particles within radius of center, optionally only of species spid.
+        """
+        center = np.asarray(center, dtype=float)
+        rows = self._candidates(center - radius, center + radius)
+        d2 = np.sum((self.location[rows] - center) ** 2, axis=1)
+        return self._filter(rows, d2 < radius ** 2, spid)
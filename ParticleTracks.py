@@ -0,0 +1,216 @@
+"""
+Particle trajectories across the frames of an HDF5Reader particle (_p) output.
+
+Particles are identified by an ID dataset when the output has one, otherwise by species and the order
+of the active particles of that species (spid plus active ordering), which is stable as long as the pusher
+does not reorder or remove particles. Only the rows of the tracked particles are read from each frame.
+
+Usage:
+    data = HDF5Reader('pFRC_p.hdf5', load_frames=False)
+    tracks = track_particles(data, n=10000, species=-1)
+    plt.plot(tracks['location'][:, :10, 0])
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import numpy as np
+
+from Timer import profiler, profiled
+
+
+# Dataset names checked, in order, for a stored particle ID
+ID_DATASETS = ('id', 'pid', 'particle_id', 'ID')
+
+# Fallback IDs pack (spid, ordinal within species) into one int64
+SPID_SHIFT = 40
+SPID_OFFSET = 2 ** 15
+
+
+def make_ids(spid, ordinal):
+    """ Packs species ids and per species ordinals into int64 particle IDs. """
+    return ((np.asarray(spid, dtype=np.int64) + SPID_OFFSET) << SPID_SHIFT) | np.asarray(ordinal, dtype=np.int64)
+
+
+def split_ids(ids):
+    """ Returns (spid, ordinal) of IDs made by make_ids(). """
+    ids = np.asarray(ids, dtype=np.int64)
+    return (ids >> SPID_SHIFT) - SPID_OFFSET, ids & ((1 << SPID_SHIFT) - 1)
+
+
+def read_rows(dataset, rows, max_waste=64, max_runs=100):
+    """
+    Reads the given rows of a dataset as a few contiguous hyperslabs. Sorted rows are grouped into runs, where
+    neighbouring runs are merged when the rows between them hold at most max_waste bytes. Every run costs one h5py
+    call, so when there are more than max_runs the smallest remaining gaps are merged as well, keeping the
+    max_runs - 1 largest gaps as the only breaks. Dense subsets then read little more than their rows, sparse ones
+    read at most the span they cover in max_runs calls, which beats a per row (fancy) selection of many rows.
+
+    Return:
+        Array of dataset[rows] in the order of rows.
+    """
+    rows = np.asarray(rows)
+    out = np.empty((len(rows),) + dataset.shape[1:], dtype=dataset.dtype)
+    if len(rows) == 0:
+        return out
+
+    rowsize = dataset.dtype.itemsize * int(np.prod(dataset.shape[1:]))
+    max_step = max_waste // rowsize + 1
+
+    order = np.argsort(rows, kind='stable')
+    srows = rows[order]
+    steps = np.diff(srows)
+    breaks = np.flatnonzero(steps > max_step)
+    if len(breaks) >= max_runs:
+        largest = np.argpartition(steps[breaks], len(breaks) - (max_runs - 1))[len(breaks) - (max_runs - 1):]
+        breaks = np.sort(breaks[largest])
+
+    for run in np.split(np.arange(len(srows)), breaks + 1):
+        r0, r1 = srows[run[0]], srows[run[-1]] + 1
+        block = dataset[r0:r1]
+        profiler.add_bytes(block.nbytes)
+        out[order[run]] = block[srows[run] - r0]
+
+    return out
+
+
+class ParticleIndex:
+    """
+    ID to row lookup for every selected frame of a particle reader. Each frame's lookup is built from its IDs
+    whenever it is needed, and only kept between calls with cache=True.
+
+    Methods:
+        __init__(self, reader, id_dataset=None, cache=False)
+        frame_ids(self, i)
+        group(self, file, i)
+        rows(self, ids)
+
+    Parameters:
+        reader:     HDF5Reader of a _p file, ideally opened with load_frames=False.
+        id_dataset: Name of the dataset holding particle IDs. Default is the first of ID_DATASETS present,
+                    else IDs are made from spid and the active ordering.
+        cache:      Keep each frame's lookup after it is built, (sorted_ids, rows) int64 arrays of every active
+                    particle. Only worth it when rows() is called repeatedly with different IDs. Default is False.
+    """
+    def __init__(self, reader, id_dataset=None, cache=False):
+        if reader.file_type != 'p':
+            raise Exception('ParticleIndex: Only particle (_p) files can be tracked.')
+
+        self.reader = reader
+        self.cache = cache
+        self.lookups = {}
+
+        with reader.open_file() as file:
+            group = file[reader.frame_group()][reader.frame_keys[0]]
+            if id_dataset is None:
+                id_dataset = next((name for name in ID_DATASETS if name in group), None)
+        self.id_dataset = id_dataset
+
+    def group(self, file, i):
+        """ Returns the HDF5 group of selected frame i. """
+        return file[self.reader.frame_group()][self.reader.frame_keys[i]]
+
+    def _lookup(self, file, i):
+        """
+        Returns (sorted_ids, rows) of frame i so rows[searchsorted(sorted_ids, id)] is the row of id.
+        """
+        if i in self.lookups:
+            return self.lookups[i]
+
+        group = self.group(file, i)
+        nactive = int(group.attrs['nParticles_active'][0])
+
+        if self.id_dataset is not None:
+            ids = group[self.id_dataset][:nactive].astype(np.int64)
+        else:
+            spid = group['spid'][:nactive]
+            # Ordinal of each particle within its species, in active order
+            order = np.argsort(spid, kind='stable')
+            sorted_spid = spid[order]
+            starts = np.flatnonzero(np.r_[True, sorted_spid[1:] != sorted_spid[:-1]])
+            ordinal = np.empty(nactive, dtype=np.int64)
+            ordinal[order] = np.arange(nactive) - np.repeat(starts, np.diff(np.r_[starts, nactive]))
+            ids = make_ids(spid, ordinal)
+
+        profiler.add_bytes(ids.nbytes)
+        rows = np.argsort(ids, kind='stable')
+        lookup = (ids[rows], rows)
+
+        if self.cache:
+            self.lookups[i] = lookup
+        return lookup
+
+    def frame_ids(self, i):
+        """
+        Returns the IDs of the active particles of frame i, in row order.
+        """
+        with self.reader.open_file() as file:
+            sorted_ids, rows = self._lookup(file, i)
+
+        ids = np.empty_like(sorted_ids)
+        ids[rows] = sorted_ids
+        return ids
+
+    @profiled('ParticleIndex.rows')
+    def rows(self, ids):
+        """
+        Return:
+            (nFrames, len(ids)) int64 array of the row of each ID in each frame, -1 where the particle is not active.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        out = np.full((self.reader.nFrames, len(ids)), -1, dtype=np.int64)
+
+        with self.reader.open_file() as file:
+            for i in range(self.reader.nFrames):
+                sorted_ids, rows = self._lookup(file, i)
+                pos = np.clip(np.searchsorted(sorted_ids, ids), 0, max(len(sorted_ids) - 1, 0))
+                found = (sorted_ids[pos] == ids) if len(sorted_ids) else np.zeros(len(ids), dtype=bool)
+                out[i, found] = rows[pos[found]]
+
+        return out
+
+
+@profiled('track_particles')
+def track_particles(reader, ids=None, n=None, species=None, fields=('location', 'velocity'), index=None, seed=0):
+    """
+    Gathers trajectories of a subset of particles, reading only their rows from every selected frame.
+
+    Parameters:
+        reader:  HDF5Reader of a _p file, ideally opened with load_frames=False.
+        ids:     Particle IDs to track. Default picks n particles of the first frame at random.
+        n:       Number of particles to pick when ids is None. Default is every particle.
+        species: Only pick particles with this spid when ids is None.
+        fields:  Per particle vector datasets to gather.
+        index:   Existing ParticleIndex to reuse. Default builds one.
+        seed:    Random seed for picking particles.
+
+    Return:
+        Dict with 'ids', 'times', 'rows' (nFrames, ntracked) and one (nFrames, ntracked, 3) array per field.
+        Entries of particles that are not active in a frame are NaN.
+    """
+    index = ParticleIndex(reader) if index is None else index
+
+    if ids is None:
+        ids = index.frame_ids(0)
+        if species is not None:
+            with reader.open_file() as file:
+                spid = index.group(file, 0)['spid'][:len(ids)]
+            ids = ids[spid == species]
+        if n is not None and n < len(ids):
+            ids = np.sort(np.random.default_rng(seed).choice(ids, n, replace=False))
+
+    ids = np.asarray(ids, dtype=np.int64)
+    rows = index.rows(ids)
+
+    out = {'ids': ids, 'times': np.asarray(reader.times), 'rows': rows}
+    with reader.open_file() as file:
+        for i in range(reader.nFrames):
+            group = index.group(file, i)
+            active = rows[i] >= 0
+
+            for name in fields:
+                dataset = group[name]
+                if name not in out:
+                    out[name] = np.full((reader.nFrames, len(ids)) + dataset.shape[1:], np.nan)
+                out[name][i, active] = read_rows(dataset, rows[i, active])
+
+    return out
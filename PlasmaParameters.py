@@ -0,0 +1,211 @@
+"""
+Vectorized plasma parameters. Every function broadcasts over scalars, 3D grids and (nframes, nx, ny, nz)
+stacks alike, and takes out=/dtype= so large maps can be computed in place in float32.
+
+Usage:
+    chain = HDF5Reader('pFRC_c.hdf5', load_frames=False)
+    field = HDF5Reader('pFRC_f.hdf5', load_frames=False)
+    maps = parameter_maps(chain.read_frame(10), field.read_frame(10), dtype=np.float32)
+    print(resolution_check(maps['e']['debye_length'], chain.dxdydz))
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import numpy as np
+
+from Diagnostics import Me, Mi, qe, Kb, eps0, mu0
+
+
+# name -> (charge state, mass) of the chaining species
+SPECIES = {'e': (1, Me),
+           'H': (1, Mi),
+           'Cu': (1, 63.546 * Mi)}
+
+
+def _buffer(shape, out, dtype):
+    """
+    Returns out, or a new array of shape and dtype (default float64) to compute into.
+    """
+    if out is not None:
+        return out
+    return np.empty(shape, dtype=np.float64 if dtype is None else dtype)
+
+
+# function returns plasma frequency (rad/s)
+def plasma_frequency(ndens, Z, mass, out=None, dtype=None):
+    out = _buffer(np.shape(ndens), out, dtype)
+    np.multiply(ndens, (Z * qe) ** 2 / (eps0 * mass), out=out, casting='unsafe')
+    return np.sqrt(out, out=out)
+
+
+# function returns Debye length (m), floored at the mean interparticle distance as Diagnostics.getDebyeLength
+def debye_length(ndens, Z, temp, floor=True, out=None, dtype=None):
+    out = _buffer(np.broadcast_shapes(np.shape(ndens), np.shape(temp)), out, dtype)
+    np.multiply(temp, eps0 * Kb / (Z * qe) ** 2, out=out, casting='unsafe')
+    with np.errstate(divide='ignore'):
+        np.divide(out, ndens, out=out, casting='unsafe')
+    np.sqrt(out, out=out)
+
+    if floor:
+        rmin = np.multiply(ndens, 4.0 * np.pi / 3.0, dtype=out.dtype)
+        with np.errstate(divide='ignore'):
+            np.power(rmin, -1.0 / 3.0, out=rmin)
+        np.maximum(out, rmin, out=out)
+
+    return out
+
+
+# function returns the combined Debye length (m) of two species, as Diagnostics.getDebyeLengthTwoSpecies
+def debye_length_two_species(ndens1, Z1, temp1, ndens2, Z2, temp2, floor=True, out=None, dtype=None):
+    shape = np.broadcast_shapes(np.shape(ndens1), np.shape(temp1), np.shape(ndens2), np.shape(temp2))
+    out = _buffer(shape, out, dtype)
+
+    with np.errstate(divide='ignore'):
+        # 1 / lambda_D^2 = sum n Z^2 qe^2 / (eps0 Kb T)
+        np.divide(ndens1, temp1, out=out, casting='unsafe')
+        out *= (Z1 * qe) ** 2 / (eps0 * Kb)
+        out += np.divide(ndens2, temp2, dtype=out.dtype) * ((Z2 * qe) ** 2 / (eps0 * Kb))
+        np.power(out, -0.5, out=out)
+
+        if floor:
+            rmin = np.maximum(ndens1, ndens2, dtype=out.dtype)
+            rmin *= 4.0 * np.pi / 3.0
+            np.power(rmin, -1.0 / 3.0, out=rmin)
+            np.maximum(out, rmin, out=out)
+
+    return out
+
+
+# function returns thermal speed sqrt(Kb T / m) (m/s), the convention of Diagnostics.getThermalVelocity
+def thermal_speed(temp, mass, out=None, dtype=None):
+    out = _buffer(np.shape(temp), out, dtype)
+    np.multiply(temp, Kb / mass, out=out, casting='unsafe')
+    return np.sqrt(out, out=out)
+
+
+# function returns gyro frequency (rad/s)
+def gyro_frequency(Z, bmag, mass, out=None, dtype=None):
+    out = _buffer(np.shape(bmag), out, dtype)
+    return np.multiply(bmag, Z * qe / mass, out=out, casting='unsafe')
+
+
+# function returns gyro radius (m). vperp defaults to the thermal speed of temp.
+def gyro_radius(Z, bmag, mass, temp=None, vperp=None, out=None, dtype=None):
+    if vperp is None:
+        vperp = thermal_speed(temp, mass, dtype=dtype)
+
+    out = _buffer(np.broadcast_shapes(np.shape(bmag), np.shape(vperp)), out, dtype)
+    np.multiply(vperp, mass / (Z * qe), out=out, casting='unsafe')
+    with np.errstate(divide='ignore'):
+        return np.divide(out, bmag, out=out, casting='unsafe')
+
+
+# function returns plasma beta, thermal over magnetic pressure
+def plasma_beta(ndens, temp, bmag, out=None, dtype=None):
+    out = _buffer(np.broadcast_shapes(np.shape(ndens), np.shape(temp), np.shape(bmag)), out, dtype)
+    np.multiply(ndens, temp, out=out, casting='unsafe')
+    out *= 2.0 * mu0 * Kb
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out /= np.square(bmag, dtype=out.dtype)
+    return out
+
+
+def node_to_cell(arr, dtype=None):
+    """
+    Averages the 8 nodes around each cell of a node centred (FieldFrame) grid onto the cell centred (ChainFrame) grid.
+    Works on the last three axes, so frame stacks are handled too.
+    """
+    arr = np.asarray(arr, dtype=dtype)
+    out = np.zeros(arr.shape[:-3] + tuple(n - 1 for n in arr.shape[-3:]), dtype=arr.dtype)
+    for cx in (0, 1):
+        for cy in (0, 1):
+            for cz in (0, 1):
+                out += arr[..., cx:arr.shape[-3] - 1 + cx, cy:arr.shape[-2] - 1 + cy, cz:arr.shape[-1] - 1 + cz]
+    out *= 0.125
+    return out
+
+
+def field_magnitude(frame, field='B', dtype=None):
+    """
+    |E|, |B| or |J| of a FieldFrame, optionally in float32.
+    """
+    x, y, z = (np.asarray(getattr(frame, field + c), dtype=dtype) for c in 'xyz')
+    out = np.square(x)
+    out += np.square(y)
+    out += np.square(z)
+    return np.sqrt(out, out=out)
+
+
+def parameter_maps(chain_frame, field_frame=None, species=None, dtype=np.float32):
+    """
+    Plasma parameter maps over the cell centred grid of a ChainFrame.
+
+    Parameters:
+        chain_frame: ChainFrame with <species>_nDensity and <species>_temperature quantities.
+        field_frame: Optional FieldFrame of the same step. |B| is averaged onto the cells for beta, gyro radius
+                     and gyro frequency.
+        species:     Dict of {name: (Z, mass)}. Default is every chain species found in SPECIES.
+        dtype:       Computation dtype. Default is float32.
+
+    Return:
+        Dict of {species: {parameter: map}} with debye_length, plasma_frequency, thermal_speed and, given a field
+        frame, gyro_frequency, gyro_radius and plasma_beta.
+    """
+    if species is None:
+        species = {sp: SPECIES[sp] for sp in chain_frame.species if sp in SPECIES}
+
+    bmag = None
+    if field_frame is not None:
+        bmag = node_to_cell(field_magnitude(field_frame, 'B', dtype), dtype)
+
+    maps = {}
+    for sp, (Z, mass) in species.items():
+        ndens = getattr(chain_frame, f'{sp}_nDensity')
+        temp = getattr(chain_frame, f'{sp}_temperature')
+
+        out = {'debye_length': debye_length(ndens, Z, temp, dtype=dtype),
+               'plasma_frequency': plasma_frequency(ndens, Z, mass, dtype=dtype),
+               'thermal_speed': thermal_speed(temp, mass, dtype=dtype)}
+
+        if bmag is not None:
+            out['gyro_frequency'] = gyro_frequency(Z, bmag, mass, dtype=dtype)
+            out['gyro_radius'] = gyro_radius(Z, bmag, mass, vperp=out['thermal_speed'], dtype=dtype)
+            out['plasma_beta'] = plasma_beta(ndens, temp, bmag, dtype=dtype)
+
+        maps[sp] = out
+
+    return maps
+
+
+def resolution_check(debye, dxdydz):
+    """
+    Grid resolution against a Debye length map.
+
+    Return:
+        Dict with the fraction of cells where dx, dy, dz or the largest spacing exceed lambda_D, the smallest
+        lambda_D and the fewest cells per lambda_D.
+    """
+    debye = np.asarray(debye)
+    dmax = max(dxdydz)
+    report = {f'frac_{name}_gt_debye': float(np.mean(d > debye)) for name, d in zip(('dx', 'dy', 'dz'), dxdydz)}
+    report['frac_gt_debye'] = float(np.mean(dmax > debye))
+    report['min_debye'] = float(np.min(debye))
+    report['min_cells_per_debye'] = float(np.min(debye) / dmax)
+    return report
+
+
+def check_run_resolution(chain_reader, species='e', dtype=np.float32):
+    """
+    Streams every frame of a chaining reader once and checks the grid spacing against the species' Debye length.
+
+    Return:
+        Dict of {key: array over frames} with the resolution_check() keys.
+    """
+    Z = SPECIES[species][0]
+    rows = []
+    for frame in chain_reader.iter_frames():
+        frame.load([f'{species}_nDensity', f'{species}_temperature'])
+        debye = debye_length(getattr(frame, f'{species}_nDensity'), Z, getattr(frame, f'{species}_temperature'), dtype=dtype)
+        rows.append(resolution_check(debye, chain_reader.dxdydz))
+
+    return {key: np.array([r[key] for r in rows]) for key in rows[0]} if rows else {}
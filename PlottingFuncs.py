@@ -2,11 +2,17 @@ import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation, PillowWriter
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from matplotlib.cm import ScalarMappable
-from matplotlib.colors import Normalize, LinearSegmentedColormap
+from matplotlib.colors import Normalize, LinearSegmentedColormap, to_rgba
+from matplotlib.patches import Patch
+from matplotlib.figure import Figure
 
+import collections
+import functools
 import os.path
 
 from NaviBaseClasses import *
+from FieldPyramid import LODPyramid, axes_pixel_shape, select_level
+from Timer import profiled
 
 
 def rgb_to_dec(value):
@@ -29,9 +35,24 @@ def get_continuous_cmap(rgb_file):
 
 
 cmp_fname = os.path.dirname(os.path.realpath(__file__)) + '/hot_desaturated.gp'
-cm_hot_desaturated = get_continuous_cmap(cmp_fname)
 
 
+@functools.lru_cache(maxsize=None)
+def get_hot_desaturated():
+    """
+    Returns the hot desaturated colormap, parsing hot_desaturated.gp on first use only.
+    """
+    return get_continuous_cmap(cmp_fname)
+
+
+def __getattr__(name):
+    # cm_hot_desaturated is built lazily so importing this module stays cheap
+    if name == 'cm_hot_desaturated':
+        return get_hot_desaturated()
+    raise AttributeError(f"module 'PlottingFuncs' has no attribute '{name}'")
+
+
+@profiled()
 def plot_lines(line_obj, fig, pos=(1, 1, 1)):
     """
     Plotting method for histograms.
@@ -65,6 +86,7 @@ def plot_lines(line_obj, fig, pos=(1, 1, 1)):
     return fig
 
 
+@profiled()
 def plot_histogram(hist_obj, fig, pos=(1, 1, 1)):
     """
     Plotting method for histograms.
@@ -93,6 +115,7 @@ def plot_histogram(hist_obj, fig, pos=(1, 1, 1)):
     return fig
 
 
+@profiled()
 def plot_contour(cont_obj, fig, pos=(1, 1, 1)):
     ax = fig.add_subplot(*pos)
 
@@ -102,7 +125,10 @@ def plot_contour(cont_obj, fig, pos=(1, 1, 1)):
     ax.set_ylabel(cont_obj.ylabel, fontsize=24)
     ax.tick_params(labelsize=20)
 
-    im = ax.contourf(cont_obj.xdata, cont_obj.ydata, cont_obj.zdata,
+    # Swap LODPyramid data for the coarsest level that still fills the axes
+    xdata, ydata, zdata = select_level(cont_obj.xdata, cont_obj.ydata, cont_obj.zdata, ax)
+
+    im = ax.contourf(*grid_mesh(xdata, ydata), zdata,
                      cmap=cont_obj.cmap, vmin=cont_obj.vmin, vmax=cont_obj.vmax, levels=cont_obj.levels)
 
     cb = fig.colorbar(im, ax=ax)
@@ -111,12 +137,47 @@ def plot_contour(cont_obj, fig, pos=(1, 1, 1)):
     return fig
 
 
+@profiled()
+def plot_image(image_obj, fig, pos=(1, 1, 1)):
+    """
+    Plotting method for rasterized images. One imshow, however many particles went into the image.
+
+    Parameters:
+        image_obj: ImagePlot object containing data to plot.
+        fig: matplotlib figure object to put subplots into.
+        pos: positional arguments for subplot. Default is (1, 1, 1)
+
+    Return:
+        fig: returns updated figure object
+    """
+    ax = fig.add_subplot(*pos)
+
+    # set subplot params
+    ax.set_title(image_obj.title, fontsize=24)
+    ax.set_xlabel(image_obj.xlabel, fontsize=24)
+    ax.set_ylabel(image_obj.ylabel, fontsize=24)
+    ax.tick_params(labelsize=20)
+
+    im = ax.imshow(image_obj.image, extent=image_obj.extent, origin='lower', aspect='auto',
+                   interpolation='nearest', cmap=image_obj.cmap, vmin=0.0, vmax=1.0)
+
+    if image_obj.image.ndim == 2:
+        cb = fig.colorbar(im, ax=ax)
+        cb.set_label(image_obj.clabel)
+        cb.ax.tick_params(labelsize=12)
+    elif image_obj.labels:
+        ax.legend(handles=[Patch(color=c, label=l) for l, c in zip(image_obj.labels, image_obj.colors)])
+
+    return fig
+
+
+@profiled()
 def make_subplots(*args, nrows=1, ncols=1, fig_title=None, figsize=None, save_fig=False, save_name=None):
     """
     Creates and displays subplot containing histograms.
 
     Parameters:
-        *args:     Arbitrary number of HistPlot/LinePlot/ContourPlot objects.
+        *args:     Arbitrary number of HistPlot/LinePlot/ContourPlot/ImagePlot objects.
         nrows:     Number of subplot rows.
         ncols:     Number of subplot columns.
         fig_title: Title for whole plot figure.
@@ -168,6 +229,9 @@ def make_subplots(*args, nrows=1, ncols=1, fig_title=None, figsize=None, save_fi
         elif isinstance(args[i], ContourPlot):
             # Contour Plots
             fig = plot_contour(args[i], fig, pos=position)
+        elif isinstance(args[i], ImagePlot):
+            # Rasterized images
+            fig = plot_image(args[i], fig, pos=position)
         else:
             raise Exception('Invalid Plotting Class.')
 
@@ -179,10 +243,244 @@ def make_subplots(*args, nrows=1, ncols=1, fig_title=None, figsize=None, save_fi
     plt.show()
 
 
+# Coordinate meshes shared by every contour panel drawn on the same grid
+_MESHES = collections.OrderedDict()
+MESH_CACHE_SIZE = 16
+
+
+def grid_mesh(xdata, ydata):
+    """
+    Returns the read-only np.meshgrid of 1D coordinates, built once per grid and reused by every later call.
+    """
+    x = np.asarray(xdata, dtype=np.float64)
+    y = np.asarray(ydata, dtype=np.float64)
+    if x.ndim != 1 or y.ndim != 1:
+        return x, y
+
+    key = (x.tobytes(), y.tobytes())
+    if key in _MESHES:
+        _MESHES.move_to_end(key)
+        return _MESHES[key]
+
+    mesh = np.meshgrid(x, y)
+    for m in mesh:
+        m.flags.writeable = False
+    _MESHES[key] = mesh
+    if len(_MESHES) > MESH_CACHE_SIZE:
+        _MESHES.popitem(last=False)
+    return mesh
+
+
+# Panel planes name the horizontal then the vertical axis, e.g. 'zx' plots x against z at the y midplane
+PLANE_AXES = {'x': 0, 'y': 1, 'z': 2}
+
+
+def midplane(arr, plane):
+    """
+    Returns the (vertical, horizontal) midplane slice of an (nx, ny, nz) array for a plane such as 'zx'.
+    """
+    h, v = PLANE_AXES[plane[0]], PLANE_AXES[plane[1]]
+    cut = 3 - h - v
+    sl = np.take(arr, arr.shape[cut] // 2, axis=cut)
+    return sl if v < h else sl.T
+
+
+def midplane_panels(reader, frame, components=('Ex', 'Ey', 'Ez', 'Bx', 'By', 'Bz'), planes=('zx',), limits=None,
+                    levels=100, cmap=None):
+    """
+    ContourPlots of the midplane of every component on every plane, component major, for FigureTemplate or
+    make_subplots.
+
+    Parameters:
+        reader:     Field/chaining reader, for the grid coordinates.
+        frame:      FieldFrame or ChainFrame.
+        components: Frame attributes to plot.
+        planes:     Planes such as 'zx', 'zy' and 'xy' (horizontal axis first).
+        limits:     Optional {component: (vmin, vmax)}.
+    """
+    coords = reader.grid_coords()
+    cmap = get_hot_desaturated() if cmap is None else cmap
+    limits = limits or {}
+
+    panels = []
+    for c in components:
+        arr = getattr(frame, c)
+        vmin, vmax = limits.get(c, (None, None))
+        for plane in planes:
+            panels.append(ContourPlot(xdata=coords[PLANE_AXES[plane[0]]], ydata=coords[PLANE_AXES[plane[1]]],
+                                      zdata=midplane(arr, plane), ind=len(panels) + 1, title=f'{c} {plane}',
+                                      xlabel=f'{plane[0]} (m)', ylabel=f'{plane[1]} (m)', cmap=cmap,
+                                      vmin=vmin, vmax=vmax, levels=levels))
+    return panels
+
+
+class FigureTemplate:
+    """
+    Multi panel figure laid out once and re-rendered with new panel data, for producing the same panel set for
+    every frame of a run. The Figure is a bare Agg figure that never touches pyplot, axes and colorbar axes are
+    created once, the layout is solved once, and contour panels reuse cached coordinate meshes.
+
+    Methods:
+        __init__(self, *panels, nrows=1, ncols=1, fig_title=None, figsize=None, dpi=None, fast=False)
+        update(self, *panels, fig_title=None)
+        save(self, filename)
+        render(self, *panels, filename=None, fig_title=None)
+
+    Parameters:
+        *panels:   ContourPlot/ImagePlot/LinePlot objects of the first frame. They fix the panel order and types.
+        nrows:     Number of subplot rows.
+        ncols:     Number of subplot columns.
+        fig_title: Title for whole plot figure. Room for it is only kept when one is given here, so pass the
+                   first frame's title when update()/render() will set one later.
+        figsize:   Tuple for size of figure.
+        dpi:       Resolution of saved images.
+        fast:      Draw ContourPlots as one pcolormesh per panel whose values are swapped in place, instead of
+                   recomputing filled contours every frame. Default is False.
+
+    Usage:
+        template = FigureTemplate(*midplane_panels(data, data.read_frame(0), planes=('zy', 'zx', 'xy')), nrows=6, ncols=3,
+                                  fig_title='0.000 ns', figsize=(12, 20))
+        for i, frame in enumerate(data.iter_frames()):
+            template.render(*midplane_panels(data, frame, planes=('zy', 'zx', 'xy')),
+                            filename=f'panels_{i:04d}.png', fig_title=f'{1e9 * frame.time:.3f} ns')
+    """
+    def __init__(self, *panels, nrows=1, ncols=1, fig_title=None, figsize=None, dpi=None, fast=False):
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.fast = fast
+        self.suptitle = self.fig.suptitle(fig_title or '')
+
+        self.axes = []
+        self.caxes = []
+        for k, panel in enumerate(panels):
+            if isinstance(panel, HistPlot):
+                raise Exception('FigureTemplate: HistPlot panels are not supported.')
+            ax = self.fig.add_subplot(nrows, ncols, k + 1)
+            self.axes.append(ax)
+            needs_bar = isinstance(panel, ContourPlot) or (isinstance(panel, ImagePlot) and panel.image.ndim == 2)
+            self.caxes.append(make_axes_locatable(ax).append_axes('right', '5%', '5%') if needs_bar else None)
+
+        self.artists = [None] * len(panels)
+        self.colorbars = [None] * len(panels)
+
+        # Titles and tick labels keep their size from frame to frame, so the layout is solved once.
+        # tight_layout ignores the figure title, so the lines it takes are kept free above the panels
+        self.update(*panels)
+        top = 1.0
+        if fig_title:
+            nlines = fig_title.count('\n') + 1
+            top -= (1.4 * nlines + 0.6) * self.suptitle.get_fontsize() / 72 / self.fig.get_figheight()
+        self.fig.tight_layout(rect=(0, 0, 1, top))
+
+    @profiled('FigureTemplate.update')
+    def update(self, *panels, fig_title=None):
+        """
+        Swaps in the data of new panels, in the same order and of the same types as the template's.
+        """
+        if len(panels) != len(self.axes):
+            raise Exception(f'FigureTemplate.update(): Expected {len(self.axes)} panels, got {len(panels)}.')
+
+        if fig_title is not None:
+            self.suptitle.set_text(fig_title)
+
+        for k, panel in enumerate(panels):
+            ax = self.axes[k]
+            ax.set_title(panel.title)
+            ax.set_xlabel(panel.xlabel)
+            ax.set_ylabel(panel.ylabel)
+
+            if isinstance(panel, ContourPlot):
+                self._update_contour(k, panel)
+            elif isinstance(panel, ImagePlot):
+                self._update_image(k, panel)
+            elif isinstance(panel, LinePlot):
+                self._update_lines(k, panel)
+            else:
+                raise Exception('FigureTemplate.update(): Invalid Plotting Class.')
+
+    def _colorbar(self, k, mappable):
+        if self.colorbars[k] is None:
+            self.colorbars[k] = self.fig.colorbar(mappable, cax=self.caxes[k])
+        else:
+            self.colorbars[k].update_normal(mappable)
+
+    def _update_contour(self, k, panel):
+        ax = self.axes[k]
+        xdata, ydata, zdata = select_level(panel.xdata, panel.ydata, panel.zdata, ax)
+        zdata = np.asarray(zdata)
+        artist = self.artists[k]
+
+        if self.fast:
+            vmin = np.min(zdata) if panel.vmin is None else panel.vmin
+            vmax = np.max(zdata) if panel.vmax is None else panel.vmax
+            if artist is None or artist.get_array().shape != zdata.shape:
+                if artist is not None:
+                    artist.remove()
+                artist = ax.pcolormesh(xdata, ydata, zdata, cmap=panel.cmap, vmin=vmin, vmax=vmax, shading='nearest')
+            else:
+                artist.set_array(zdata)
+                artist.set_clim(vmin, vmax)
+        else:
+            if artist is not None:
+                artist.remove()
+            artist = ax.contourf(*grid_mesh(xdata, ydata), zdata,
+                                 cmap=panel.cmap, vmin=panel.vmin, vmax=panel.vmax, levels=panel.levels)
+
+        self.artists[k] = artist
+        self._colorbar(k, artist)
+
+    def _update_image(self, k, panel):
+        artist = self.artists[k]
+        if artist is None:
+            artist = self.axes[k].imshow(panel.image, extent=panel.extent, origin='lower', aspect='auto',
+                                         interpolation='nearest', cmap=panel.cmap, vmin=0.0, vmax=1.0)
+            if self.caxes[k] is not None:
+                self._colorbar(k, artist)
+                self.colorbars[k].set_label(panel.clabel)
+            elif panel.labels:
+                self.axes[k].legend(handles=[Patch(color=c, label=l) for l, c in zip(panel.labels, panel.colors)])
+        else:
+            artist.set_data(panel.image)
+            artist.set_extent(panel.extent)
+        self.artists[k] = artist
+
+    def _update_lines(self, k, panel):
+        ax = self.axes[k]
+        lines = self.artists[k]
+        if lines is None or len(lines) != len(panel.ydata):
+            for line in lines or []:
+                line.remove()
+            lines = [ax.plot(panel.xdata, y, label=label)[0] for y, label in zip(panel.ydata, panel.labels)]
+            ax.legend()
+        else:
+            for line, y in zip(lines, panel.ydata):
+                line.set_data(panel.xdata, y)
+
+        if panel.init_ylims is not None:
+            ax.set_ylim(panel.init_ylims)
+        ax.relim()
+        ax.autoscale_view(scaley=panel.init_ylims is None and not panel.hold_yscale)
+        self.artists[k] = lines
+
+    def save(self, filename):
+        self.fig.savefig(filename)
+
+    def render(self, *panels, filename=None, fig_title=None):
+        """
+        update() then save(), when filename is given.
+        """
+        self.update(*panels, fig_title=fig_title)
+        if filename is not None:
+            self.save(filename)
+
+
+@profiled()
 def animate_contour(xdata=None, ydata=None, zdata=None, times=None, timescale='s', title='', xlabel='', ylabel='',
-                    cmap=cm_hot_desaturated, zlims=None, levels=100, save=False, filename=None):
+                    cmap=None, zlims=None, levels=100, save=False, filename=None, writer='ffmpeg'):
     nt = len(zdata)
 
+    if cmap is None:
+        cmap = get_hot_desaturated()
+
     if xdata is None:
         m = zdata[0].shape[1]
         xdata = [i for i in range(m)]
@@ -190,11 +488,6 @@ def animate_contour(xdata=None, ydata=None, zdata=None, times=None, timescale='s
         n = zdata[0].shape[0]
         ydata = [j for j in range(n)]
 
-    vmin = zlims[0] if zlims is not None else np.min(zdata)
-    vmax = zlims[1] if zlims is not None else np.max(zdata)
-
-    norm = Normalize(vmin=vmin, vmax=vmax)
-
     if times is None:
         title_str = title + f'\n0/{nt}'
     else:
@@ -209,11 +502,24 @@ def animate_contour(xdata=None, ydata=None, zdata=None, times=None, timescale='s
 
     cax = make_axes_locatable(ax).append_axes('right', '5%', '5%')
 
+    # Use one preview level for every frame so the contours line up
+    if isinstance(zdata[0], LODPyramid):
+        factor, _ = zdata[0].select(axes_pixel_shape(ax))
+        zdata = [z.level(factor) for z in zdata]
+        xdata = LODPyramid.coords(xdata, factor)
+        ydata = LODPyramid.coords(ydata, factor)
+
+    vmin = zlims[0] if zlims is not None else np.min(zdata)
+    vmax = zlims[1] if zlims is not None else np.max(zdata)
+
+    norm = Normalize(vmin=vmin, vmax=vmax)
+
     im = ax.contourf(xdata, ydata, zdata[0], cmap=cmap, levels=levels, norm=norm)
 
     if zlims is not None:
         fig.colorbar(ScalarMappable(norm=norm, cmap=cmap), cax=cax)
 
+    @profiled('animate_contour.frame')
     def animate(i):
         if zlims is None:
             im = ax.contourf(xdata, ydata, zdata[i], cmap=cmap, levels=levels)
@@ -233,12 +539,13 @@ def animate_contour(xdata=None, ydata=None, zdata=None, times=None, timescale='s
     anim = FuncAnimation(fig, animate, frames=len(zdata), interval=100, blit=False)
 
     if save:
-        anim.save(filename, writer='ffmpeg')
+        anim.save(filename, writer=writer)
         print(f'Animation saved as {filename}.')
     else:
         plt.show()
 
 
+@profiled()
 def animate_line(arrs, title='', xlabel='', ylabel='', ylims=None, save=False, filename=None):
     nt = len(arrs)
 
@@ -253,6 +560,7 @@ def animate_line(arrs, title='', xlabel='', ylabel='', ylims=None, save=False, f
 
     line, = ax.plot(arrs[0])
 
+    @profiled('animate_line.frame')
     def animate(i):
         line.set_ydata(arrs[i])
 
@@ -266,3 +574,321 @@ def animate_line(arrs, title='', xlabel='', ylabel='', ylims=None, save=False, f
         print(f'Animation saved as {filename}.')
     else:
         plt.show()
+
+
+def quiver_stride(shape, ax, spacing=20):
+    """
+    Returns the (row, column) step that keeps quiver arrows at least spacing pixels apart on ax.
+    """
+    rows, cols = axes_pixel_shape(ax)
+    return max(1, int(np.ceil(shape[0] * spacing / rows))), max(1, int(np.ceil(shape[1] * spacing / cols)))
+
+
+@profiled()
+def animate_quiver(xdata=None, ydata=None, udata=None, vdata=None, times=None, timescale='s', title='', xlabel='', ylabel='',
+                   cmap=None, clims=None, mask=None, spacing=20, artists=None, facecolor=None, save=False, filename=None,
+                   writer='ffmpeg', fps=None, **quiver_kw):
+    """
+    Animates a 2D vector field with a single Quiver artist updated in place through set_UVC.
+
+    Parameters:
+        xdata, ydata: 1D coordinates of the columns and rows of each frame.
+        udata, vdata: Sequence or (nt, ny, nx) array of vector components, rows along y as in animate_contour.
+        clims:        (min, max) of the arrow colour. Default is the magnitude range over all frames.
+        mask:         Optional boolean (ny, nx) array, arrows where it is False are zeroed.
+        spacing:      Minimum pixels between arrows. Frames are subsampled to this density before anything else.
+        artists:      Patches drawn once under the arrows, e.g. [plt.Circle((0, 0), r, fill=False)].
+        facecolor:    Axes background colour.
+        quiver_kw:    Passed to ax.quiver. Default is pivot='mid'.
+    """
+    nt = len(udata)
+
+    if cmap is None:
+        cmap = get_hot_desaturated()
+
+    ny, nx = np.shape(udata[0])
+    xdata = np.arange(nx) if xdata is None else np.asarray(xdata)
+    ydata = np.arange(ny) if ydata is None else np.asarray(ydata)
+
+    if times is None:
+        title_str = title + f'\n0/{nt}'
+    else:
+        title_str = title + f'\n{times[0]:4.3f}{timescale}'
+
+    fig, ax = plt.subplots(1, 1)
+
+    fig_title = ax.set_title(title_str)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_aspect('equal')
+    if facecolor is not None:
+        ax.set_facecolor(facecolor)
+    for artist in artists or []:
+        ax.add_artist(artist)
+
+    # Only keep the arrows that can be told apart at this axes size
+    sy, sx = quiver_stride((ny, nx), ax, spacing)
+    U = np.stack([np.asarray(u)[::sy, ::sx] for u in udata])
+    V = np.stack([np.asarray(v)[::sy, ::sx] for v in vdata])
+
+    if mask is not None:
+        keep = np.asarray(mask)[::sy, ::sx]
+        U *= keep
+        V *= keep
+
+    # Every frame's magnitude in one call
+    M = np.hypot(U, V)
+
+    vmin = clims[0] if clims is not None else M.min()
+    vmax = clims[1] if clims is not None else M.max()
+    norm = Normalize(vmin=vmin, vmax=vmax)
+
+    cax = make_axes_locatable(ax).append_axes('right', '5%', '5%')
+    fig.colorbar(ScalarMappable(norm=norm, cmap=cmap), cax=cax)
+
+    quiver_kw.setdefault('pivot', 'mid')
+    q = ax.quiver(xdata[::sx], ydata[::sy], U[0], V[0], M[0], cmap=cmap, norm=norm, **quiver_kw)
+
+    @profiled('animate_quiver.frame')
+    def animate(i):
+        q.set_UVC(U[i], V[i], M[i])
+
+        if times is None:
+            title_str = title + f'\n{i}/{nt}'
+        else:
+            title_str = title + f'\n{times[i]:4.3f}{timescale}'
+
+        fig_title.set_text(title_str)
+        return q,
+
+    anim = FuncAnimation(fig, animate, frames=nt, interval=100, blit=False)
+
+    if save:
+        anim.save(filename, writer=writer, fps=fps)
+        print(f'Animation saved as {filename}.')
+    else:
+        plt.show()
+
+
+# Particle coordinates available to the rasterizer: name -> (array, column)
+PARTICLE_AXES = {'x': ('location', 0), 'y': ('location', 1), 'z': ('location', 2),
+                 'vx': ('velocity', 0), 'vy': ('velocity', 1), 'vz': ('velocity', 2)}
+
+SCALINGS = ('linear', 'log', 'eq_hist')
+
+
+def particle_axis(frame, name):
+    """
+    Returns one coordinate of the active particles of a ParticleFrame: x/y/z, vx/vy/vz, r (cylindrical radius)
+    or v (speed).
+    """
+    n = frame.particles_active
+    if name == 'r':
+        return np.hypot(frame.location[:n, 0], frame.location[:n, 1])
+    if name == 'v':
+        return np.linalg.norm(frame.velocity[:n], axis=1)
+    if name not in PARTICLE_AXES:
+        raise Exception(f'particle_axis(): Unknown axis "{name}". Use one of {list(PARTICLE_AXES) + ["r", "v"]}.')
+    array, column = PARTICLE_AXES[name]
+    return getattr(frame, array)[:n, column]
+
+
+@profiled()
+def rasterize(x, y, shape=(400, 600), xlim=None, ylim=None, groups=None, ngroups=1, weights=None):
+    """
+    Bins points straight into a pixel grid with one bincount, so the cost is a few passes over the points
+    and nothing is drawn per point.
+
+    Parameters:
+        x, y:    Point coordinates.
+        shape:   (ny, nx) pixels.
+        xlim:    (x0, x1) covered by the columns. Default is the data range. Points outside are dropped.
+        ylim:    (y0, y1) covered by the rows.
+        groups:  Optional integer group (0..ngroups-1) of every point, e.g. species, binned into separate layers.
+        weights: Optional weight of every point.
+
+    Return:
+        (ngroups, ny, nx) counts, or (ny, nx) without groups, and the extent (x0, x1, y0, y1).
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    ny, nx = shape
+    if x.size == 0:
+        # No points (e.g. a frame without active particles), nothing to take a data range from
+        counts = np.zeros((ngroups, ny, nx))
+        extent = tuple(xlim or (0.0, 1.0)) + tuple(ylim or (0.0, 1.0))
+        return (counts if groups is not None else counts[0]), extent
+
+    x0, x1 = (float(x.min()), float(x.max())) if xlim is None else xlim
+    y0, y1 = (float(y.min()), float(y.max())) if ylim is None else ylim
+    # Keep the maximum inside the last pixel
+    sx = nx / ((x1 - x0) or 1.0) * (1 - 1e-12)
+    sy = ny / ((y1 - y0) or 1.0) * (1 - 1e-12)
+
+    ix = ((x - x0) * sx).astype(np.int64)
+    iy = ((y - y0) * sy).astype(np.int64)
+    keep = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny) & (x >= x0) & (y >= y0)
+
+    pixel = iy
+    pixel *= nx
+    pixel += ix
+    if groups is not None:
+        pixel += np.asarray(groups, dtype=np.int64) * (nx * ny)
+
+    w = None if weights is None else np.asarray(weights)[keep]
+    counts = np.bincount(pixel[keep], weights=w, minlength=ngroups * nx * ny)
+
+    counts = counts.reshape(ngroups, ny, nx)
+    return (counts if groups is not None else counts[0]), (x0, x1, y0, y1)
+
+
+def scale_image(counts, how='eq_hist'):
+    """
+    Maps a density image to [0, 1] with NaN for empty pixels.
+
+    Parameters:
+        how: 'linear', 'log' (log1p) or 'eq_hist', which spreads the occupied pixels evenly over the colormap so
+             both sparse halos and dense cores stay visible.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    filled = counts > 0
+    out = np.full(counts.shape, np.nan)
+    if not filled.any():
+        return out
+
+    values = counts[filled]
+    if how == 'linear':
+        out[filled] = values / values.max()
+    elif how == 'log':
+        top = np.log1p(values.max())
+        out[filled] = np.log1p(values) / top if top > 0 else 1.0
+    elif how == 'eq_hist':
+        # Rank of every distinct value in the cumulative distribution of occupied pixels
+        levels, inverse, repeats = np.unique(values, return_inverse=True, return_counts=True)
+        cdf = np.cumsum(repeats) / len(values)
+        out[filled] = cdf[inverse] if len(levels) > 1 else 1.0
+    else:
+        raise Exception(f'scale_image(): Unknown scaling "{how}". Use one of {SCALINGS}.')
+    return out
+
+
+def shade(layers, colors, how='eq_hist', min_alpha=0.15):
+    """
+    Combines per group density layers into one RGBA image. Each pixel takes the count weighted mix of the group
+    colours and an opacity from the scaled total density.
+
+    Parameters:
+        layers:    (ngroups, ny, nx) counts from rasterize().
+        colors:    One matplotlib colour per group.
+        how:       Scaling of the total density, see scale_image().
+        min_alpha: Opacity of the least dense occupied pixels.
+    """
+    layers = np.asarray(layers, dtype=np.float64)
+    rgb = np.array([to_rgba(c)[:3] for c in colors])
+    total = layers.sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mix = np.tensordot(layers, rgb, axes=(0, 0)) / total[..., None]
+
+    alpha = scale_image(total, how)
+    image = np.zeros(total.shape + (4,))
+    image[..., :3] = np.nan_to_num(mix)
+    image[..., 3] = np.where(np.isnan(alpha), 0.0, min_alpha + (1 - min_alpha) * np.nan_to_num(alpha))
+    return image
+
+
+@profiled()
+def particle_raster(frame, x='x', y='vx', shape=(400, 600), xlim=None, ylim=None, species=None, colors=None,
+                    how='eq_hist', labels=None, ind=1, title=None, cmap=None):
+    """
+    Rasterized scatter or phase space plot of one ParticleFrame, for any number of particles.
+
+    Parameters:
+        x, y:    Particle axes, see particle_axis(), e.g. ('x', 'vx') for phase space or ('x', 'y') for positions.
+        shape:   (ny, nx) pixels.
+        species: spid values to colour separately. Default draws every particle as one density through cmap.
+        colors:  Colours of species. Default is the tab10 cycle.
+        how:     'linear', 'log' or 'eq_hist' scaling.
+        labels:  Legend names of species. Default is 'spid <n>'.
+
+    Return:
+        ImagePlot for make_subplots().
+    """
+    xs = particle_axis(frame, x)
+    ys = particle_axis(frame, y)
+    title = f'{y} vs {x}, t={1e9 * frame.time:.4f} ns' if title is None else title
+
+    if species is None:
+        counts, extent = rasterize(xs, ys, shape, xlim, ylim)
+        return ImagePlot(image=scale_image(counts, how), extent=extent, ind=ind, title=title, xlabel=x, ylabel=y,
+                         cmap=get_hot_desaturated() if cmap is None else cmap, clabel=f'{how} density')
+
+    spid = frame.spid[:frame.particles_active]
+    species = list(species)
+    # Map spid values to layers, particles of other species are dropped
+    lookup = {sp: k for k, sp in enumerate(species)}
+    groups = np.full(len(spid), -1, dtype=np.int64)
+    for sp, k in lookup.items():
+        groups[spid == sp] = k
+    chosen = groups >= 0
+
+    layers, extent = rasterize(xs[chosen], ys[chosen], shape, xlim, ylim, groups=groups[chosen], ngroups=len(species))
+    colors = [f'C{k}' for k in range(len(species))] if colors is None else colors
+    labels = [f'spid {sp}' for sp in species] if labels is None else labels
+    return ImagePlot(image=shade(layers, colors, how), extent=extent, ind=ind, title=title, xlabel=x, ylabel=y,
+                     labels=labels, colors=colors)
+
+
+@profiled()
+def animate_raster(reader, x='x', y='vx', shape=(400, 600), xlim=None, ylim=None, species=None, colors=None,
+                   how='eq_hist', labels=None, timescale='ns', title='', save=False, filename=None, writer='ffmpeg',
+                   fps=None):
+    """
+    Animates particle_raster() over every selected frame of a particle reader with one AxesImage updated
+    through set_data. Limits default to the first frame's range so every frame shares the axes, or (0, 1)
+    when the first frame has no active particles.
+    """
+    first = reader.read_frame(0)
+    if xlim is None:
+        xs = particle_axis(first, x)
+        xlim = (float(xs.min()), float(xs.max())) if xs.size else (0.0, 1.0)
+    if ylim is None:
+        ys = particle_axis(first, y)
+        ylim = (float(ys.min()), float(ys.max())) if ys.size else (0.0, 1.0)
+
+    def render(frame):
+        return particle_raster(frame, x, y, shape, xlim, ylim, species, colors, how, labels).image
+
+    # Frames are read and rendered as they are drawn, only the current image is held
+    image = render(first)
+    del first
+
+    scale = 1e9 if timescale == 'ns' else 1.0
+    times = [scale * t for t in reader.times]
+
+    fig, ax = plt.subplots(1, 1)
+    fig_title = ax.set_title(title + f'\n{times[0]:4.3f}{timescale}')
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+
+    cmap = get_hot_desaturated()
+    im = ax.imshow(image, extent=tuple(xlim) + tuple(ylim), origin='lower', aspect='auto', interpolation='nearest',
+                   cmap=cmap, vmin=0.0, vmax=1.0)
+    if species is not None:
+        colors = [f'C{k}' for k in range(len(species))] if colors is None else colors
+        labels = [f'spid {sp}' for sp in species] if labels is None else labels
+        ax.legend(handles=[Patch(color=c, label=label) for label, c in zip(labels, colors)])
+
+    @profiled('animate_raster.frame')
+    def animate(i):
+        im.set_data(render(reader.read_frame(i)))
+        fig_title.set_text(title + f'\n{times[i]:4.3f}{timescale}')
+        return im,
+
+    anim = FuncAnimation(fig, animate, frames=reader.nFrames, interval=100, blit=False)
+
+    if save:
+        anim.save(filename, writer=writer, fps=fps)
+        print(f'Animation saved as {filename}.')
+    else:
+        plt.show()
@@ -0,0 +1,223 @@
+import collections
+import concurrent.futures
+import os
+import threading
+
+import numpy as np
+
+import Diagnostics
+from HDF5Reader import HDF5Reader
+from MemoryReport import frame_nbytes
+from NaviBaseClasses import LinePlot
+
+
+def field_energy(frame, reader):
+    """ [W_E, W_B] in J """
+    return np.array(Diagnostics.getFieldEnergy(frame, reader.dxdydz))
+
+
+def species_temperature(frame, reader, species=(-1, 0)):
+    """ (nspecies, 4) rows of [T, vx, vy, vz] for the given spid values """
+    return Diagnostics.getSpeciesTemperatures(frame, species)
+
+
+def chain_mean(frame, reader, components=None):
+    """ Volume average of each quantity, default those of the run's first frame so every frame gives the same columns """
+    components = reader.chain_components() if components is None else components
+    return Diagnostics.getChainMeans(frame, components)
+
+
+REDUCERS = {'field_energy': field_energy,
+            'temperature': species_temperature,
+            'chain_mean': chain_mean}
+
+
+class FrameCache:
+    """
+    Least recently used frame cache with one byte budget shared by every run of a RunCollection.
+
+    Methods:
+        __init__(self, max_bytes)
+        get(self, key, load)
+        clear(self)
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.frames = collections.OrderedDict()
+        self.sizes = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        """
+        Returns the cached frame for key, calling load() and caching the result on a miss.
+        """
+        with self._lock:
+            if key in self.frames:
+                self.frames.move_to_end(key)
+                self.hits += 1
+                return self.frames[key]
+            self.misses += 1
+
+        frame = load()
+        # Lazy frames (ChainFrame) are sized as if fully read, they grow as quantities are accessed while cached
+        size = frame_nbytes(frame) + (frame.pending_nbytes() if hasattr(frame, 'pending_nbytes') else 0)
+
+        with self._lock:
+            if key not in self.frames and size <= self.max_bytes:
+                self.frames[key] = frame
+                self.sizes[key] = size
+                self.nbytes += size
+
+                while self.nbytes > self.max_bytes:
+                    old, _ = self.frames.popitem(last=False)
+                    self.nbytes -= self.sizes.pop(old)
+
+        return frame
+
+    def clear(self):
+        with self._lock:
+            self.frames.clear()
+            self.sizes.clear()
+            self.nbytes = 0
+
+
+def _reduce_run(path, reducer, kwargs):
+    """
+    Streams every frame of one run through reducer. Module level so process pools can pickle it.
+    """
+    reader = HDF5Reader(path, load_frames=False)
+    values = [reducer(frame, reader, **kwargs) for frame in reader.iter_frames()]
+    return np.asarray(reader.times), np.asarray(values)
+
+
+class RunCollection:
+    """
+    Opens the outputs of a parameter sweep together and computes the same diagnostic across every run.
+    Runs are opened index-only with a bounded thread pool; frames are decoded on demand through one shared cache.
+
+    Methods:
+        __init__(self, paths, max_workers=4, cache_bytes=2**30)
+        frame(self, name, i)
+        compute(self, reducer, executor='thread', **kwargs)
+        align(results, times=None)
+        overlay(self, results, column=0, ...)
+
+    Parameters:
+        paths:       List of hdf5/xdmf paths, or dict of {name: path}. List entries are named by file prefix.
+        max_workers: Size of the pool used to open runs and compute diagnostics. Default is 4.
+        cache_bytes: Byte budget of the frame cache shared by all runs. Default is 1 GiB.
+
+    Usage:
+        runs = RunCollection(glob.glob('sweep/*/pFRC_f.hdf5'))
+        energy = runs.compute('field_energy')
+        make_subplots(runs.overlay(energy, column=1, ylabel='W_B (J)'))
+    """
+    def __init__(self, paths, max_workers=4, cache_bytes=2**30):
+        if not isinstance(paths, dict):
+            paths = {self._run_name(p): p for p in paths}
+
+        self.paths = dict(paths)
+        self.max_workers = max_workers
+        self.cache = FrameCache(cache_bytes)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+            opened = pool.map(lambda p: HDF5Reader(p, load_frames=False), self.paths.values())
+            self.readers = dict(zip(self.paths, opened))
+
+        # One metadata index for the whole sweep
+        self.index = {name: {'file_type': r.file_type,
+                             'nFrames': r.nFrames,
+                             'times': np.asarray(r.times),
+                             'dims': r.dims,
+                             'origin': r.origin,
+                             'dxdydz': r.dxdydz,
+                             'nParticles': r.nParticles}
+                      for name, r in self.readers.items()}
+
+    @staticmethod
+    def _run_name(path):
+        # .../sweep/run_a/pFRC_f.hdf5 -> run_a/pFRC_f
+        path = os.path.splitext(os.path.abspath(path))[0]
+        return os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+
+    def __len__(self):
+        return len(self.readers)
+
+    def __iter__(self):
+        return iter(self.readers)
+
+    def frame(self, name, i):
+        """
+        Returns frame i of run name through the shared cache.
+        """
+        return self.cache.get((name, i), lambda: self.readers[name].read_frame(i))
+
+    def compute(self, reducer, executor='thread', **kwargs):
+        """
+        Applies reducer(frame, reader, **kwargs) to every frame of every run in parallel.
+
+        Parameters:
+            reducer:  Name in REDUCERS or a module level function of (frame, reader, **kwargs).
+            executor: 'thread' (default) reads every frame through the shared cache. 'process' streams each run in
+                      its own worker process, which bypasses the cache, so frames are decoded again on every call.
+            kwargs:   Passed to reducer, e.g. species=(-1, 0) for 'temperature'.
+
+        Return:
+            Dict of {name: (times, values)} with values shaped (nFrames, ...).
+        """
+        func = REDUCERS[reducer] if isinstance(reducer, str) else reducer
+
+        if executor == 'process':
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {name: pool.submit(_reduce_run, self.paths[name], func, kwargs) for name in self.readers}
+                return {name: f.result() for name, f in futures.items()}
+
+        if executor != 'thread':
+            raise Exception(f'RunCollection.compute(): Unknown executor "{executor}".')
+
+        def run(name):
+            reader = self.readers[name]
+            values = [func(self.frame(name, i), reader, **kwargs) for i in range(reader.nFrames)]
+            return self.index[name]['times'], np.asarray(values)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return dict(zip(self.readers, pool.map(run, self.readers)))
+
+    @staticmethod
+    def align(results, times=None):
+        """
+        Interpolates every run of a compute() result onto one time axis.
+
+        Parameters:
+            results: Dict from compute().
+            times:   Common time axis. Default is the densest run's times clipped to the overlapping range.
+
+        Return:
+            times, dict of {name: values} with values shaped (len(times), ...).
+        """
+        if times is None:
+            t0 = max(t[0] for t, _ in results.values())
+            t1 = min(t[-1] for t, _ in results.values())
+            densest = max((t for t, _ in results.values()), key=len)
+            times = densest[(densest >= t0) & (densest <= t1)]
+
+        aligned = {}
+        for name, (t, values) in results.items():
+            flat = values.reshape(len(t), -1)
+            cols = [np.interp(times, t, flat[:, k]) for k in range(flat.shape[1])]
+            aligned[name] = np.stack(cols, axis=-1).reshape((len(times),) + values.shape[1:])
+
+        return times, aligned
+
+    def overlay(self, results, column=0, title='', xlabel='Time (ns)', ylabel='', ind=1):
+        """
+        Builds a LinePlot overlaying one column of a compute() result for every run.
+        column may be an int or a tuple index into each frame's value, e.g. (0, 0) for the first species temperature.
+        """
+        times, aligned = self.align(results)
+        ydata = [values[(slice(None),) + np.index_exp[column]] for values in aligned.values()]
+        return LinePlot(xdata=1e9 * times, ydata=ydata, labels=list(aligned), ind=ind,
+                        title=title, xlabel=xlabel, ylabel=ylabel)
@@ -0,0 +1,149 @@
+"""
+Generators for synthetic TriForce style HDF5/XDMF output pairs. Used by the benchmarks to
+exercise HDF5Reader and the diagnostics without a real simulation run.
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import os
+import h5py
+import numpy as np
+
+from XDMFWriter import frame_name, field_grid_xml, write_xdmf
+
+# constants (mks), kept local so generating data does not pull in the plotting stack
+Mi = 1.67262192e-27
+Me = 9.10938356e-31
+qe = 1.60217663e-19
+Kb = 1.38064852e-23
+
+# (spid, mass, charge) for the species written by write_particle_data
+SPECIES = ((-1, Me, -qe), (0, Mi, qe), (1, 6 * Mi, 6 * qe))
+
+CHAIN_QUANTITIES = ('Cu.nDensity', 'Cu.temperature', 'e.nDensity', 'e.temperature')
+
+
+def write_field_data(prefix, dims=(64, 64, 128), nframes=10, dt=1e-10,
+                     origin=(-0.125, -0.125, -0.225), dxdydz=None, seed=0):
+    """
+    Writes a synthetic <prefix>.hdf5/<prefix>.xdmf field pair. prefix should end in "_f".
+
+    Parameters:
+        prefix:  Output path without extension.
+        dims:    Grid node counts (nx, ny, nz).
+        nframes: Number of frames to write.
+        dt:      Time between frames in seconds.
+        origin:  Grid origin (x, y, z).
+        dxdydz:  Grid spacing. Default spans 0.25 x 0.25 x 0.45 m.
+        seed:    Random seed for the noise added to the fields.
+
+    Return:
+        Path to the hdf5 file.
+    """
+    nx, ny, nz = dims
+    if dxdydz is None:
+        dxdydz = (0.25 / (nx - 1), 0.25 / (ny - 1), 0.45 / (nz - 1))
+
+    rng = np.random.default_rng(seed)
+
+    # Smooth FRC-like background, x fastest to match the TriForce layout
+    z, y, x = np.meshgrid(*[origin[k] + dxdydz[k] * np.arange(dims[k]) for k in (2, 1, 0)], indexing='ij')
+    r2 = (x ** 2 + y ** 2) / 0.045 ** 2
+    envelope = np.exp(-r2 - (z / 0.2) ** 2).reshape(-1)
+
+    h5name = os.path.basename(prefix) + '.hdf5'
+    grids = []
+    with h5py.File(prefix + '.hdf5', 'w') as f:
+        data = f.create_group('H5fio_3DRectMesh')
+        for i in range(nframes):
+            frame = data.create_group(frame_name(i))
+            phase = np.cos(2 * np.pi * i / max(nframes, 1))
+            for name, scale in (('E', 6e5), ('B', 2e-2), ('J', 1e6)):
+                vec = scale * (phase * envelope[:, None] + 0.05 * rng.standard_normal((envelope.size, 3)))
+                frame.create_dataset(name, data=vec)
+
+            grids.append(field_grid_xml(i, dims, origin, dxdydz, i * dt,
+                                         [(n, 'Vector', 'Node', f'{nz} {ny} {nx} 3') for n in 'EBJ'], h5name))
+
+    write_xdmf(prefix + '.xdmf', grids)
+    return prefix + '.hdf5'
+
+
+def write_chain_data(prefix, dims=(64, 64, 128), nframes=10, dt=1e-10,
+                     origin=(-0.125, -0.125, -0.225), dxdydz=None, seed=0):
+    """
+    Writes a synthetic <prefix>.hdf5/<prefix>.xdmf chaining pair. prefix should end in "_c".
+    dims are node counts, the species quantities are cell centred with dims - 1 cells per axis.
+    """
+    nx, ny, nz = dims
+    if dxdydz is None:
+        dxdydz = (0.25 / (nx - 1), 0.25 / (ny - 1), 0.45 / (nz - 1))
+
+    rng = np.random.default_rng(seed)
+    ncells = (nx - 1) * (ny - 1) * (nz - 1)
+
+    h5name = os.path.basename(prefix) + '.hdf5'
+    grids = []
+    with h5py.File(prefix + '.hdf5', 'w') as f:
+        data = f.create_group('H5fio_3DRectMesh')
+        for i in range(nframes):
+            frame = data.create_group(frame_name(i))
+            for name in CHAIN_QUANTITIES:
+                scale = 1e20 if name.endswith('nDensity') else 1e4
+                frame.create_dataset(name, data=scale * (1.0 + 0.1 * rng.random(ncells)))
+
+            grids.append(field_grid_xml(i, dims, origin, dxdydz, i * dt,
+                                         [(n, 'Scalar', 'Cell', f'{nz - 1} {ny - 1} {nx - 1}') for n in CHAIN_QUANTITIES],
+                                         h5name))
+
+    write_xdmf(prefix + '.xdmf', grids)
+    return prefix + '.hdf5'
+
+
+def write_particle_data(prefix, nparticles=100000, nframes=10, dt=1e-10, temperature=1e5,
+                        extent=((-0.125, 0.125), (-0.125, 0.125), (-0.225, 0.225)), seed=0):
+    """
+    Writes a synthetic <prefix>.hdf5/<prefix>.xdmf particle pair. prefix should end in "_p".
+    Particles are split evenly between the species in SPECIES with Maxwellian velocities at temperature (K).
+    """
+    rng = np.random.default_rng(seed)
+
+    spid = np.repeat([s[0] for s in SPECIES], -(-nparticles // len(SPECIES)))[:nparticles]
+    mass = np.choose(spid + 1, [s[1] for s in SPECIES])
+    charge = np.choose(spid + 1, [s[2] for s in SPECIES])
+
+    lo = np.array([e[0] for e in extent])
+    hi = np.array([e[1] for e in extent])
+    location = lo + (hi - lo) * rng.random((nparticles, 3))
+    vth = np.sqrt(Kb * temperature / mass)[:, None]
+
+    h5name = os.path.basename(prefix) + '.hdf5'
+    grids = []
+    with h5py.File(prefix + '.hdf5', 'w') as f:
+        data = f.create_group('H5pio')
+        for i in range(nframes):
+            velocity = vth * rng.standard_normal((nparticles, 3))
+            location = lo + np.mod(location + dt * velocity - lo, hi - lo)
+
+            frame = data.create_group(frame_name(i))
+            frame.attrs['nParticles_active'] = np.array([nparticles])
+            frame.create_dataset('charge', data=charge)
+            frame.create_dataset('mass', data=mass)
+            frame.create_dataset('location', data=location)
+            frame.create_dataset('velocity', data=velocity)
+            frame.create_dataset('spid', data=spid)
+
+            path = f'{h5name}:/H5pio/{frame_name(i)}'
+            grids.append(f'<Grid Name="{frame_name(i)}" GridType="Uniform">'
+                         f'<Time Value="{i * dt}"/>'
+                         f'<Topology TopologyType="Polyvertex" NumberOfElements="{nparticles}"/>'
+                         f'<Geometry GeometryType="XYZ">'
+                         f'<DataItem Dimensions="{nparticles} 3" NumberType="Float" Precision="8" Format="HDF">'
+                         f'{path}/location</DataItem></Geometry>'
+                         f'<Attribute Name="velocity" AttributeType="Vector" Center="Node">'
+                         f'<DataItem Dimensions="{nparticles} 3" NumberType="Float" Precision="8" Format="HDF">'
+                         f'{path}/velocity</DataItem></Attribute>'
+                         f'</Grid>')
+
+    write_xdmf(prefix + '.xdmf', grids)
+    return prefix + '.hdf5'
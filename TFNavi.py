@@ -1,5 +1,58 @@
-from NaviAnimationClass import *
-from PlottingFuncs import *
-from HDF5Reader import *
-from PlottingFuncs import *
-from FileReaders import *
+"""
+TFNavi package entry point. Names are imported from their modules on first use, so
+reader-only jobs never pay for matplotlib or a GUI backend.
+
+    import TFNavi as navi
+    data = navi.HDF5Reader(path)      # imports HDF5Reader only
+    navi.make_subplots(...)           # first use imports matplotlib
+"""
+import importlib
+
+# module -> public names it provides
+_MODULES = {
+    'NaviBaseClasses': ('SubplotInfo', 'HistPlot', 'LinePlot', 'ContourPlot', 'ImagePlot'),
+    'NaviAnimationClass': ('AnimatedSubplot', 'make_mp4'),
+    'PlottingFuncs': ('rgb_to_dec', 'get_continuous_cmap', 'get_hot_desaturated', 'cm_hot_desaturated',
+                      'plot_lines', 'plot_histogram', 'plot_contour', 'make_subplots',
+                      'animate_contour', 'animate_line', 'quiver_stride', 'animate_quiver', 'plot_image',
+                      'particle_axis', 'rasterize', 'scale_image', 'shade', 'particle_raster', 'animate_raster',
+                      'grid_mesh', 'midplane', 'midplane_panels', 'FigureTemplate'),
+    'HDF5Reader': ('HDF5Reader', 'ParticleFrame', 'FieldFrame', 'ChainFrame'),
+    'FileReaders': ('reset_output_dirs', 'load_field_npy', 'load_field_csv', 'read_field_npy', 'read_field_csv',
+                    'convert_legacy_fields'),
+    'FieldPyramid': ('PYRAMID_FACTORS', 'block_average', 'LODPyramid', 'axes_pixel_shape', 'select_level'),
+    'Timer': ('Timer', 'Timers', 'ProfileNode', 'Profiler', 'profiler', 'profiled'),
+    'MemoryReport': ('array_owner', 'frame_nbytes', 'MemoryReport', 'LoadTracker'),
+    'RunCollection': ('RunCollection', 'FrameCache', 'REDUCERS'),
+    'VolumeReduction': ('frame_quantity', 'project', 'projection_plot', 'marching_tetrahedra', 'Isosurface', 'isosurface'),
+    'PlasmaParameters': ('plasma_frequency', 'debye_length', 'debye_length_two_species', 'thermal_speed', 'gyro_frequency',
+                         'gyro_radius', 'plasma_beta', 'node_to_cell', 'field_magnitude', 'parameter_maps',
+                         'resolution_check', 'check_run_resolution'),
+    'ParticleTracks': ('ParticleIndex', 'track_particles', 'make_ids', 'split_ids'),
+    'ParticleBins': ('CellIndex', 'grid_geometry'),
+    'DiagnosticStore': ('DiagnosticStore', 'diagnostic_name', 'params_key'),
+    'FrameServer': ('FrameClient', 'FrameServer', 'SharedFrame', 'socket_path'),
+    'CylindricalRemap': ('CylindricalRemap', 'CYLINDRICAL'),
+    'NaviKernels': ('velocity_moments', 'cell_ids', 'radius_mask', 'backend_info', 'set_backend',
+                    'available_backends'),
+    'ParallelAnalysis': ('ParallelReader', 'run_local', 'get_comm', 'SerialComm', 'MPIComm', 'QueueComm'),
+}
+
+_EXPORTS = {name: module for module, names in _MODULES.items() for name in names}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'TFNavi' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module(module), name)
+    # Cache so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,3 +1,7 @@
+import functools
+import json
+import os
+import threading
 import time
 
 
@@ -6,7 +10,7 @@ class Timer:
         self.name = name
 
         cpu_time = time.process_time()
-        wall_time = time.time()
+        wall_time = time.perf_counter()
 
         self.t0 = [cpu_time, wall_time]
         self.t = [cpu_time, wall_time]
@@ -18,17 +22,19 @@ class Timer:
     def update_time(self, new_time):
         self.t = new_time
 
-    def elapsed(self):
+    def elapsed(self, since=None):
         cpu_time = time.process_time()
-        wall_time = time.time()
+        wall_time = time.perf_counter()
 
-        self.splits.append((cpu_time - self.t[0], wall_time - self.t[1]))
+        # since lets Timers share one lap start instead of updating every timer
+        t = self.t if since is None else since
+        self.splits.append((cpu_time - t[0], wall_time - t[1]))
 
         return [cpu_time, wall_time]
 
     def reset(self):
         cpu_time = time.process_time()
-        wall_time = time.time()
+        wall_time = time.perf_counter()
 
         self.t0 = [cpu_time, wall_time]
         self.t = [cpu_time, wall_time]
@@ -55,17 +61,16 @@ class Timers:
     def __init__(self, *args):
         self.timers = {name: Timer(name) for name in args}
         self.total_timer = Timer('Total')
+        self.t = list(self.total_timer.t)
 
     def elapsed(self, name):
-        new_t = self.timers[name].elapsed()
-
-        for name, timer in self.timers.items():
-            timer.update_time(new_t)
+        self.t = self.timers[name].elapsed(since=self.t)
 
     def reset(self, *names):
-        # If no names supplied, reset ALL timers
+        # If no names supplied, reset ALL timers and the shared lap
         if not names:
             names = self.timers.keys()
+            self.t = [time.process_time(), time.perf_counter()]
 
         for name in names:
             self.timers[name].reset()
@@ -87,7 +92,7 @@ class Timers:
             print(self.timers[name])
 
         total_cpu = time.process_time() - self.total_timer.t0[0]
-        total_wall = time.time() - self.total_timer.t0[1]
+        total_wall = time.perf_counter() - self.total_timer.t0[1]
         print(f'{self.total_timer.name:<15.20s} {total_cpu:^12.6f} {total_wall:^12.6f}')
         print("#" * 50)
 
@@ -106,6 +111,224 @@ class Timers:
             print(self.timers[name], file=f)
 
         total_cpu = time.process_time() - self.total_timer.t0[0]
-        total_wall = time.time() - self.total_timer.t0[1]
+        total_wall = time.perf_counter() - self.total_timer.t0[1]
         print(f'{self.total_timer.name:<15.20s} {total_cpu:^12.6f} {total_wall:^12.6f}', file=f)
 
+
+class ProfileNode(Timer):
+    """
+    One region in the Profiler call tree. Accumulates totals instead of storing splits so hot regions stay small.
+    """
+    def __init__(self, name):
+        super().__init__(name)
+        self.calls = 0
+        self.bytes_read = 0
+        self.children = {}
+
+    def child(self, name):
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = ProfileNode(name)
+        return node
+
+    def sum_children(self):
+        cpu_tot = sum(c.cpu_tot for c in self.children.values())
+        wall_tot = sum(c.wall_tot for c in self.children.values())
+        return cpu_tot, wall_tot
+
+    def to_dict(self):
+        return {'name': self.name,
+                'calls': self.calls,
+                'cpu': self.cpu_tot,
+                'wall': self.wall_tot,
+                'bytes_read': self.bytes_read,
+                'children': [c.to_dict() for c in self.children.values()]}
+
+
+class _NullRegion:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_REGION = _NullRegion()
+
+
+class _Region:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit()
+        return False
+
+
+class Profiler:
+    """
+    Hierarchical profiler built on Timer. Off by default, disabled regions cost one attribute check.
+
+    Methods:
+        enable(self, trace=False)
+        disable(self)
+        reset(self)
+        region(self, name)
+        add_bytes(self, nbytes)
+        to_dict(self)
+        print(self)
+        dump_json(self, filename)
+        dump_chrome_trace(self, filename)
+
+    Usage:
+        profiler.enable()
+        with profiler.region('my analysis'):
+            data = HDF5Reader(path)
+        profiler.print()
+        profiler.dump_chrome_trace('trace.json')  # open in chrome://tracing or ui.perfetto.dev
+    """
+    def __init__(self):
+        self.enabled = False
+        self.trace = False
+        self.root = ProfileNode('Total')
+        self.events = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enable(self, trace=False):
+        """
+        Starts recording. trace=True also keeps every region call for dump_chrome_trace().
+        """
+        self.enabled = True
+        self.trace = trace
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """
+        Drops everything recorded so far. Regions still open when reset is called are not recorded.
+        """
+        self.root = ProfileNode('Total')
+        self.events = []
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = [self.root]
+            # Nodes can be re-entered recursively, so start times live on their own stack
+            self._local.starts = []
+        return stack
+
+    def region(self, name):
+        """
+        Context manager timing everything inside it as a child of the enclosing region.
+        """
+        if not self.enabled:
+            return _NULL_REGION
+        return _Region(self, name)
+
+    def _enter(self, name):
+        stack = self._stack()
+        with self._lock:
+            node = stack[-1].child(name)
+        stack.append(node)
+        self._local.starts.append((time.process_time(), time.perf_counter()))
+
+    def _exit(self):
+        cpu_time = time.process_time()
+        wall_time = time.perf_counter()
+
+        stack = self._stack()
+        # reset() inside an open region dropped its entry, there is nothing left to record
+        if len(stack) == 1:
+            return
+
+        node = stack.pop()
+        t = self._local.starts.pop()
+
+        with self._lock:
+            node.calls += 1
+            node.cpu_tot += cpu_time - t[0]
+            node.wall_tot += wall_time - t[1]
+
+            if self.trace:
+                self.events.append({'name': node.name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                                    'ts': t[1] * 1e6, 'dur': (wall_time - t[1]) * 1e6,
+                                    'args': {'cpu': cpu_time - t[0]}})
+
+    def add_bytes(self, nbytes):
+        """
+        Counts nbytes read against every open region.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            for node in self._stack():
+                node.bytes_read += nbytes
+
+    def to_dict(self):
+        self.root.calls = 1
+        self.root.cpu_tot, self.root.wall_tot = self.root.sum_children()
+        return self.root.to_dict()
+
+    def print(self, file=None):
+        tree = self.to_dict()
+
+        print("#" * 72, file=file)
+        print(f'{"Region":<32.32s} {"Calls":>8s} {"CPU sec":^12.10s} {"Wall sec":^12.10s} {"MB read":>8s}', file=file)
+        print("-" * 72, file=file)
+
+        def walk(node, depth):
+            name = '  ' * depth + node['name']
+            print(f'{name:<32.32s} {node["calls"]:>8d} {node["cpu"]:^12.6f} {node["wall"]:^12.6f} '
+                  f'{node["bytes_read"] / 2**20:>8.1f}', file=file)
+            for child in node['children']:
+                walk(child, depth + 1)
+
+        walk(tree, 0)
+        print("#" * 72, file=file)
+
+    def dump_json(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def dump_chrome_trace(self, filename):
+        """
+        Writes the recorded region calls in Chrome trace event format. Requires enable(trace=True).
+        """
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+
+# Shared profiler used by the TFNavi readers and plotting functions
+profiler = Profiler()
+
+
+def profiled(name=None):
+    """
+    Decorator timing every call of the wrapped function as a profiler region.
+
+    Parameters:
+        name: Region name. Default is the function's qualified name.
+    """
+    def decorator(func):
+        region_name = name if name is not None else func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with _Region(profiler, region_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
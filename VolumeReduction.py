@@ -0,0 +1,333 @@
+"""
+3D reductions of field and chaining frames: isosurfaces and axis aligned projections.
+
+Frames are read in slabs of z planes through HDF5Reader.read_frame(i, zrange=...), so a full cube is
+never held in memory. Projections come back as ContourPlot objects and isosurfaces as compact
+vertex/face meshes that can be saved for other tools or flattened into a ContourPlot height map.
+
+Usage:
+    data = HDF5Reader('pFRC_f.hdf5', load_frames=False)
+    make_subplots(projection_plot(data, 40, 'Bmag', axis='y', op='max'),
+                  isosurface(data, 40, 'Bmag', level=0.01).height_map('z'), ncols=2)
+
+Edits:
+ - 10/19/26. Created File.
+"""
+import numpy as np
+
+from NaviBaseClasses import ContourPlot
+
+
+AXES = {'x': 0, 'y': 1, 'z': 2}
+
+# Vector magnitudes available as quantities alongside every frame component
+MAGNITUDES = {'Emag': ('Ex', 'Ey', 'Ez'),
+              'Bmag': ('Bx', 'By', 'Bz'),
+              'Jmag': ('Jx', 'Jy', 'Jz')}
+
+PROJECTIONS = ('max', 'min', 'sum', 'mean')
+
+
+def frame_quantity(frame, name):
+    """
+    Returns a component of a frame, or the magnitude of E, B or J for 'Emag', 'Bmag' or 'Jmag'.
+    """
+    if name in MAGNITUDES:
+        x, y, z = (getattr(frame, c) for c in MAGNITUDES[name])
+        return np.sqrt(x ** 2 + y ** 2 + z ** 2)
+    return getattr(frame, name)
+
+
+def slab_ranges(nz, slab, overlap=0):
+    """
+    Yields (z0, z1) slabs of at most slab planes covering range(nz). overlap extra planes are added to
+    the top of every slab but the last.
+    """
+    for z0 in range(0, nz, slab):
+        yield z0, min(z0 + slab + overlap, nz)
+
+
+def _axis(axis):
+    return AXES[axis] if isinstance(axis, str) else axis
+
+
+def project(reader, i, quantity, axis='z', op='max', slab=16):
+    """
+    Reduces frame i of a field/chaining reader along one axis, reading slab z planes at a time.
+
+    Parameters:
+        reader:   HDF5Reader, ideally opened with load_frames=False.
+        i:        Frame index.
+        quantity: Frame component or 'Emag'/'Bmag'/'Jmag'.
+        axis:     'x', 'y' or 'z' (or 0, 1, 2).
+        op:       'max', 'min', 'sum' or 'mean'.
+        slab:     z planes read at once.
+
+    Return:
+        2D array over the two remaining axes in (x, y, z) order, e.g. (nx, nz) for axis='y'.
+    """
+    if op not in PROJECTIONS:
+        raise Exception(f'project(): Unknown projection "{op}". Use one of {PROJECTIONS}.')
+
+    ax = _axis(axis)
+    reduce = np.sum if op in ('sum', 'mean') else getattr(np, op)
+
+    result = None
+    parts = []
+    for z0, z1 in slab_ranges(reader.dims[2], slab):
+        part = reduce(frame_quantity(reader.read_frame(i, zrange=(z0, z1)), quantity), axis=ax)
+
+        if ax != 2:
+            # Slab covers a z range of the output map
+            parts.append(part)
+        elif result is None:
+            result = part
+        elif op in ('sum', 'mean'):
+            result = result + part
+        else:
+            result = reduce(np.stack([result, part]), axis=0)
+
+    if ax != 2:
+        result = np.concatenate(parts, axis=-1)
+
+    if op == 'mean':
+        result = result / reader.dims[ax]
+
+    return result
+
+
+def projection_plot(reader, i, quantity, axis='z', op='max', slab=16, ind=1, title=None, cmap='viridis', levels=100):
+    """
+    Builds a ContourPlot of project() with physical coordinates. The lower remaining axis runs vertically,
+    e.g. x vs z for axis='y' as in FilePlot.
+    """
+    ax = _axis(axis)
+    rows, cols = [k for k in range(3) if k != ax]
+    coords = reader.grid_coords()
+    names = 'xyz'
+
+    if title is None:
+        title = f'{op}({quantity}) along {names[ax]}, t={1e9 * reader.times[i]:.4f} ns'
+
+    return ContourPlot(xdata=coords[cols], ydata=coords[rows], zdata=project(reader, i, quantity, ax, op, slab),
+                       ind=ind, title=title, xlabel=f'{names[cols]} (m)', ylabel=f'{names[rows]} (m)',
+                       cmap=cmap, levels=levels)
+
+
+# Six tetrahedra sharing the 0-7 diagonal of a cube. Corner c sits at offset (c & 1, c >> 1 & 1, c >> 2 & 1).
+_CORNERS = np.array([(c & 1, c >> 1 & 1, c >> 2 & 1) for c in range(8)])
+_TETRAHEDRA = ((0, 1, 3, 7), (0, 1, 5, 7), (0, 2, 3, 7), (0, 2, 6, 7), (0, 4, 5, 7), (0, 4, 6, 7))
+
+
+def _tetrahedron_cases():
+    """
+    Triangles crossing a tetrahedron for each of the 16 inside/outside corner patterns, as triples of edges (a, b).
+    """
+    cases = []
+    for case in range(16):
+        inside = [v for v in range(4) if case >> v & 1]
+        outside = [v for v in range(4) if not case >> v & 1]
+
+        if len(inside) in (1, 3):
+            lone, rest = (inside[0], outside) if len(inside) == 1 else (outside[0], inside)
+            cases.append([[(lone, r) for r in rest]])
+        elif len(inside) == 2:
+            (a, b), (c, d) = inside, outside
+            cases.append([[(a, c), (a, d), (b, d)], [(a, c), (b, d), (b, c)]])
+        else:
+            cases.append([])
+    return cases
+
+
+_CASES = _tetrahedron_cases()
+
+
+def marching_tetrahedra(values, level, zoffset=0, shape=None):
+    """
+    Extracts the level isosurface of a 3D block by marching tetrahedra, vectorized over every cube the surface crosses.
+
+    Parameters:
+        values:  3D (nx, ny, nz) block.
+        level:   Isovalue. The surface separates values > level from the rest.
+        zoffset: z index of the block's first plane in the whole grid.
+        shape:   Shape of the whole grid. Default is the block's shape.
+
+    Return:
+        keys, points, faces. keys are global ids of the grid edges each vertex lies on, so blocks can be merged
+        without duplicating shared vertices. points are (n, 3) fractional grid indices, faces index into them.
+    """
+    values = np.asarray(values, dtype=float)
+    nx, ny, nz = values.shape
+    shape = values.shape if shape is None else shape
+
+    # Only cubes the surface passes through
+    corner_vals = np.stack([values[cx:nx - 1 + cx, cy:ny - 1 + cy, cz:nz - 1 + cz] for cx, cy, cz in _CORNERS], axis=-1)
+    above = corner_vals > level
+    crossed = np.any(above, axis=-1) & ~np.all(above, axis=-1)
+    cubes = np.argwhere(crossed)
+    corner_vals = corner_vals[crossed]
+    above = above[crossed]
+
+    edge_a, edge_b, tri_cubes = [], [], []
+    for tet in _TETRAHEDRA:
+        tet = np.array(tet)
+        case = np.sum(above[:, tet] << np.arange(4), axis=1)
+
+        for c, triangles in enumerate(_CASES):
+            sel = np.flatnonzero(case == c)
+            if sel.size == 0:
+                continue
+            for tri in triangles:
+                edge_a.append(np.stack([np.full(sel.size, tet[a]) for a, _ in tri], axis=1))
+                edge_b.append(np.stack([np.full(sel.size, tet[b]) for _, b in tri], axis=1))
+                tri_cubes.append(sel)
+
+    if not tri_cubes:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+
+    edge_a = np.concatenate(edge_a)
+    edge_b = np.concatenate(edge_b)
+    tri_cubes = np.concatenate(tri_cubes)
+
+    # Interpolate each vertex along its edge
+    base = cubes[tri_cubes][:, None, :]
+    pa = base + _CORNERS[edge_a]
+    pb = base + _CORNERS[edge_b]
+    va = np.take_along_axis(corner_vals[tri_cubes], edge_a, axis=1)
+    vb = np.take_along_axis(corner_vals[tri_cubes], edge_b, axis=1)
+    t = ((level - va) / np.where(vb == va, 1.0, vb - va))[..., None]
+    points = pa + t * (pb - pa)
+    points[..., 2] += zoffset
+
+    # Orient every triangle so its normal points towards the values above level
+    inside = np.where(np.take_along_axis(above[tri_cubes], edge_a, axis=1)[..., None], pa, pb)
+    normal = np.cross(points[:, 1] - points[:, 0], points[:, 2] - points[:, 0])
+    flip = np.einsum('ij,ij->i', normal, inside.mean(axis=1) + [0, 0, zoffset] - points.mean(axis=1)) < 0
+    points[flip] = points[flip][:, ::-1]
+    edge_a[flip] = edge_a[flip][:, ::-1]
+    edge_b[flip] = edge_b[flip][:, ::-1]
+
+    # Global grid edge ids, so slabs share the vertices on their common plane
+    offset = np.array([0, 0, zoffset])
+    lin_a = np.ravel_multi_index(tuple(np.moveaxis(base + _CORNERS[edge_a] + offset, -1, 0)), shape)
+    lin_b = np.ravel_multi_index(tuple(np.moveaxis(base + _CORNERS[edge_b] + offset, -1, 0)), shape)
+    npoints = np.prod(shape, dtype=np.int64)
+    keys = np.minimum(lin_a, lin_b) * npoints + np.maximum(lin_a, lin_b)
+
+    keys, first, faces = np.unique(keys.reshape(-1), return_index=True, return_inverse=True)
+    return keys, points.reshape(-1, 3)[first], faces.reshape(-1, 3)
+
+
+class Isosurface:
+    """
+    Triangle mesh of one isosurface in physical coordinates.
+
+    Methods:
+        __init__(self, vertices, faces, quantity='', level=0.0, time=None)
+        height_map(self, axis='z', bins=None, op='max', ind=1, cmap='viridis', levels=100)
+        save(self, filename)
+
+    Attributes:
+        vertices: (n, 3) float32 (x, y, z) positions in m.
+        faces:    (m, 3) int32 vertex indices, wound so normals point towards values above level.
+    """
+    def __init__(self, vertices, faces, quantity='', level=0.0, time=None):
+        self.vertices = np.asarray(vertices, dtype=np.float32)
+        self.faces = np.asarray(faces, dtype=np.int32)
+        self.quantity = quantity
+        self.level = level
+        self.time = time
+
+    def __len__(self):
+        return len(self.faces)
+
+    def height_map(self, axis='z', bins=None, op='max', ind=1, cmap='viridis', levels=100):
+        """
+        Flattens the surface into a ContourPlot: the max (or min) vertex coordinate along axis in each bin of the
+        two remaining axes. Bins the surface never crosses are NaN. Default bins keep a few vertices per bin.
+        """
+        ax = _axis(axis)
+        rows, cols = [k for k in range(3) if k != ax]
+        names = 'xyz'
+
+        v = self.vertices
+        if bins is None:
+            n = max(8, int(np.sqrt(len(v) / 8)))
+            bins = (n, n)
+
+        redges = np.linspace(v[:, rows].min(), v[:, rows].max(), bins[0] + 1)
+        cedges = np.linspace(v[:, cols].min(), v[:, cols].max(), bins[1] + 1)
+        r = np.clip(np.searchsorted(redges, v[:, rows], side='right') - 1, 0, bins[0] - 1)
+        c = np.clip(np.searchsorted(cedges, v[:, cols], side='right') - 1, 0, bins[1] - 1)
+
+        height = np.full(bins, -np.inf if op == 'max' else np.inf)
+        (np.maximum if op == 'max' else np.minimum).at(height, (r, c), v[:, ax])
+        height[np.isinf(height)] = np.nan
+
+        title = f'{self.quantity} = {self.level:g} surface, {op} {names[ax]}'
+        if self.time is not None:
+            title += f', t={1e9 * self.time:.4f} ns'
+
+        return ContourPlot(xdata=0.5 * (cedges[1:] + cedges[:-1]), ydata=0.5 * (redges[1:] + redges[:-1]), zdata=height,
+                           ind=ind, title=title, xlabel=f'{names[cols]} (m)', ylabel=f'{names[rows]} (m)',
+                           cmap=cmap, levels=levels)
+
+    def save(self, filename):
+        """
+        Writes the mesh as binary little endian PLY (.ply) or Wavefront OBJ (any other extension).
+        """
+        if filename.endswith('.ply'):
+            header = (f'ply\nformat binary_little_endian 1.0\nelement vertex {len(self.vertices)}\n'
+                      f'property float x\nproperty float y\nproperty float z\nelement face {len(self.faces)}\n'
+                      f'property list uchar int vertex_indices\nend_header\n')
+            faces = np.empty(len(self.faces), dtype=[('n', 'u1'), ('v', '<i4', 3)])
+            faces['n'] = 3
+            faces['v'] = self.faces
+
+            with open(filename, 'wb') as f:
+                f.write(header.encode('ascii'))
+                f.write(self.vertices.astype('<f4').tobytes())
+                f.write(faces.tobytes())
+        else:
+            with open(filename, 'w') as f:
+                np.savetxt(f, self.vertices, fmt='v %.7g %.7g %.7g')
+                np.savetxt(f, self.faces + 1, fmt='f %d %d %d')
+
+
+def isosurface(reader, i, quantity, level, slab=16):
+    """
+    Extracts the level isosurface of a quantity in frame i, reading slab z planes (plus one shared plane) at a time.
+
+    Parameters:
+        reader:   HDF5Reader, ideally opened with load_frames=False.
+        i:        Frame index.
+        quantity: Frame component or 'Emag'/'Bmag'/'Jmag', e.g. 'Bmag' or 'e_nDensity'.
+        level:    Isovalue.
+        slab:     z planes read at once.
+
+    Return:
+        Isosurface
+    """
+    keys, points, faces = [], [], []
+    for z0, z1 in slab_ranges(reader.dims[2], slab, overlap=1):
+        if z1 - z0 < 2:
+            continue
+        block = frame_quantity(reader.read_frame(i, zrange=(z0, z1)), quantity)
+        k, p, f = marching_tetrahedra(block, level, zoffset=z0, shape=reader.dims)
+        faces.append(f + sum(len(x) for x in keys))
+        keys.append(k)
+        points.append(p)
+
+    if not keys:
+        return Isosurface(np.zeros((0, 3)), np.zeros((0, 3)), quantity, level, reader.times[i])
+
+    # Merge the vertices slabs share on their common planes
+    keys, first, inverse = np.unique(np.concatenate(keys), return_index=True, return_inverse=True)
+    points = np.concatenate(points)[first]
+    faces = inverse[np.concatenate(faces)]
+
+    coords = reader.grid_coords()
+    origin = np.array([c[0] for c in coords])
+    vertices = origin + points * np.asarray(reader.dxdydz)
+
+    return Isosurface(vertices, faces, quantity, level, reader.times[i])
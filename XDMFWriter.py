@@ -0,0 +1,40 @@
+"""
+Writers for the TriForce style XDMF index that pairs with an HDF5 output: frame group names, one uniform grid
+per field/chaining frame and the temporal collection wrapping them. Shared by the legacy converter in FileReaders
+and the synthetic data generators.
+
+Edits:
+ - 10/19/26. Created File.
+"""
+
+
+def frame_name(i):
+    return f'Step_{i:06d}'
+
+
+def field_grid_xml(i, dims, origin, dxdydz, time, attributes, h5name):
+    nx, ny, nz = dims
+    ox, oy, oz = origin
+    dx, dy, dz = dxdydz
+    attr_xml = ''.join(
+        f'<Attribute Name="{name}" AttributeType="{kind}" Center="{center}">'
+        f'<DataItem Dimensions="{shape}" NumberType="Float" Precision="8" Format="HDF">'
+        f'{h5name}:/H5fio_3DRectMesh/{frame_name(i)}/{name}</DataItem></Attribute>'
+        for name, kind, center, shape in attributes)
+
+    return (f'<Grid Name="{frame_name(i)}" GridType="Uniform">'
+            f'<Topology TopologyType="3DCoRectMesh" Dimensions="{nz} {ny} {nx}"/>'
+            f'<Geometry GeometryType="ORIGIN_DXDYDZ">'
+            f'<DataItem Dimensions="3" NumberType="Float" Format="XML">{oz} {oy} {ox}</DataItem>'
+            f'<DataItem Dimensions="3" NumberType="Float" Format="XML">{dz} {dy} {dx}</DataItem>'
+            f'</Geometry>'
+            f'<Time Value="{time}"/>'
+            f'{attr_xml}</Grid>')
+
+
+def write_xdmf(path, grids):
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0" ?>\n<Xdmf Version="3.0"><Domain>'
+                '<Grid Name="TimeSeries" GridType="Collection" CollectionType="Temporal">')
+        f.write(''.join(grids))
+        f.write('</Grid></Domain></Xdmf>\n')